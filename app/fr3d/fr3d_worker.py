@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# Persistent FR3D worker. It keeps NumPy, the pdbx reader and FR3D classifiers
+# imported and runs NA_pairwise_interactions.py (path given as the only argument)
+# for jobs read from stdin, one JSON object per line: {"args": [...], "cwd": "..."}.
+# Each job is answered with a single line "@@adapters-worker <JSON>" on stdout.
+
+import json
+import os
+import runpy
+import sys
+import traceback
+
+RESPONSE_PREFIX = "@@adapters-worker "
+
+
+def respond(response):
+    sys.stdout.write(RESPONSE_PREFIX + json.dumps(response) + "\n")
+    sys.stdout.flush()
+
+
+def run(script, job):
+    os.chdir(job["cwd"])
+    sys.argv = [script] + job["args"]
+    try:
+        # modules imported by the script stay in sys.modules between runs
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise RuntimeError("FR3D exited with code %s" % e.code)
+
+
+def serve(script):
+    # Import NumPy, the pdbx reader and FR3D classifiers before answering the
+    # startup ping: the module body runs without its "__main__" part
+    runpy.run_path(script, run_name="fr3d_worker_warmup")
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        try:
+            job = json.loads(line)
+            if job.get("command") != "ping":
+                run(script, job)
+            respond({"ok": True})
+        except Exception as e:
+            traceback.print_exc(file=sys.stdout)
+            respond({"ok": False, "error": str(e)})
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python fr3d_worker.py <NA_pairwise_interactions.py>")
+        exit(1)
+    serve(sys.argv[1])
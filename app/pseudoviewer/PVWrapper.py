@@ -1,6 +1,7 @@
 # pylint: skip-file
 # flake8: noqa
 # type: ignore
+import json
 import sys
 
 import clr
@@ -99,9 +100,39 @@ def saveImageFromPVFile2(pvFileSequence, pvFileStructure, outpath, eps=True):
         saveImageSvg(pvInput, outpath)
 
 
+RESPONSE_PREFIX = "@@adapters-worker "
+
+
+def respond(response):
+    sys.stdout.write(RESPONSE_PREFIX + json.dumps(response) + "\n")
+    sys.stdout.flush()
+
+
+def serve():
+    # Keep the assembly loaded and draw jobs read from stdin (one JSON per line)
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        try:
+            job = json.loads(line)
+            if job.get("command") != "ping":
+                saveImageFromPVFile2(
+                    job["sequence"], job["structure"], job["output"], False
+                )
+            respond({"ok": True})
+        except Exception as e:
+            respond({"ok": False, "error": str(e)})
+
+
 if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == "--server":
+        serve()
+        exit(0)
+
     if len(sys.argv) != 4:
         print("Usage: wine ipy.exe pvwrap.py <INPUT-SEQ> <INPUT-STR> <OUTPUT-FILE>")
+        print("       wine ipy.exe pvwrap.py --server")
         exit(1)
 
     f = open(sys.argv[1])
@@ -1,7 +1,18 @@
 #!/bin/bash
 set -e
 
+# Import all adapters once in the master process, before forking workers
+preload=""
+if [ "${ADAPTERS_PRELOAD}" = "1" ]; then
+    preload="--preload"
+fi
+
+# Asynchronous jobs run in a separate process, independent of (recycled) HTTP workers.
+# Job workers exit together with the runner, so restarting it leaves nothing behind.
+(while true; do python -m adapters.job_runner; sleep 1; done) &
+
 exec gunicorn \
+    ${preload} \
     --worker-tmp-dir /dev/shm \
     --workers ${ADAPTERS_WORKERS} \
     --threads ${ADAPTERS_THREADS} \
@@ -4,12 +4,15 @@
 import logging
 import re
 import sys
-import tempfile
 from collections import defaultdict
-from typing import Any, DefaultDict, Dict, List, Optional, Set, Tuple
+from typing import Any, DefaultDict, Dict, List, Optional, Tuple
 
 import barnaba
+import mdtraj as md
+import numpy as np
 import orjson
+import pandas as pd
+from mdtraj.formats.pdb import PDBTrajectoryFile
 from rnapolis.common import (
     BaseInteractions,
     BasePair,
@@ -22,20 +25,37 @@ from rnapolis.common import (
 )
 
 from adapters.exceptions import RegexError, ThirdPartySoftwareError
+from adapters.tools.pdb_table import AtomTable
+from adapters.tools.structure import Structure
+from adapters.tools.tracing import trace
 from adapters.tools.utils import suppress_stdout_stderr
+from adapters.tools.workspace import materialize, temporary_directory
 
 logger = logging.getLogger(__name__)
 
+# Residue name replacements and atom name replacements (per residue name)
+NameReplacements = Tuple[Dict[str, str], Dict[str, Dict[str, str]]]
+
+
+def pdb_name_replacements() -> Optional[NameReplacements]:
+    """Get tables used by mdtraj to rename residues and atoms read from PDB files.
+    They are private members of `PDBTrajectoryFile` (as is `_guess_element`, also
+    used here), so None is returned if this version of mdtraj does not have them."""
+    # pylint: disable=protected-access
+    if not hasattr(PDBTrajectoryFile, "_guess_element"):
+        return None
+    try:
+        PDBTrajectoryFile._loadNameReplacementTables()
+        return (
+            PDBTrajectoryFile._residueNameReplacements,
+            PDBTrajectoryFile._atomNameReplacements,
+        )
+    except AttributeError:
+        return None
 
-class BarnabaAdapter:
-    # Positions of resiudes info in PDB files
-    CHAIN_INDEX = 21
-    NUMBER_INDEX = slice(22, 26)
-    ICODE_INDEX = 26
 
+class BarnabaAdapter:
     # Tokens used in PDB files
-    ATOM = "ATOM"
-    HETATM = "HETATM"
     TER = "TER"
 
     # BaRNAba uses different symbols for topology
@@ -93,14 +113,10 @@ class BarnabaAdapter:
 
         return LeontisWesthof[f"{interaction[2]}{interaction[:2]}"]
 
-    def append_chains(self, file_content: str) -> None:
-        previous_chain: Optional[str] = None
-        for line in file_content.splitlines():
-            if line.startswith(self.ATOM) or line.startswith(self.HETATM):
-                chain = line[self.CHAIN_INDEX]
-                if chain != previous_chain:
-                    self.chains.append(chain)
-                    previous_chain = chain
+    def append_chains(self, table: AtomTable) -> None:
+        chain = table.chain
+        starts = np.flatnonzero(chain[1:] != chain[:-1]) + 1
+        self.chains.extend(chain[np.concatenate(([0], starts))[: len(chain)]].tolist())
 
     def append_interactions(self, pairings: List[Any], residues: List[Any]) -> None:
         for p, pairing in enumerate(pairings[0][0]):
@@ -132,64 +148,165 @@ class BarnabaAdapter:
             self.analysis_output.stackings.append(Stacking(nt1, nt2, topology))
 
     # This function renumbers pdb and removes icode from file
-    def renumber_pdb(self, file_content: str) -> str:
+    # pylint: disable-next=too-many-locals
+    def renumber_pdb(self, file_content: str, table: AtomTable) -> str:
+        first, residue = table.residues()
+
         # Counter for each chain
         # usage: new_numbers[chain] = new_number
         new_numbers: DefaultDict[str, int] = defaultdict(int)
+        residue_numbers = []
+        for chain, old_number, icode in zip(
+            table.chain[first].tolist(),
+            table.number[first].tolist(),
+            table.icode[first].tolist(),
+        ):
+            new_numbers[chain] += 1
+            residue_numbers.append(new_numbers[chain])
+            self.mapped_residues_info[chain][new_numbers[chain]] = (old_number, icode)
+
+        atom_numbers = dict(
+            zip(
+                table.line_numbers.tolist(),
+                zip(
+                    table.chain.tolist(),
+                    np.array(residue_numbers, dtype=np.int64)[residue].tolist(),
+                ),
+            )
+        )
         # For efficiency save content in list and use join()
         renumbered_content_list = []
-        present_residues: Set[Tuple[str, int, str]] = set()
-
-        for line in file_content.splitlines(True):
-            if line.startswith(self.ATOM) or line.startswith(self.HETATM):
-                old_number = int(line[self.NUMBER_INDEX].strip())
-                icode = line[self.ICODE_INDEX].strip()
-                chain = line[self.CHAIN_INDEX].strip()
-                if (chain, old_number, icode) not in present_residues:
-                    present_residues.add((chain, old_number, icode))
-                    new_numbers[chain] += 1
-                    self.mapped_residues_info[chain][new_numbers[chain]] = (
-                        old_number,
-                        icode,
-                    )
-                new_line = (
-                    f"{line[:22]}{str(new_numbers[chain]).rjust(4)[:4]} {line[27:]}"
-                )
-            elif line.startswith(self.TER):
-                new_line = (
-                    f"{line[:22]}{str(new_numbers[chain]).rjust(4)[:4]} {line[27:]}"
-                )
-            else:
-                new_line = line
+        # TER records get the last number in the chain of the preceding atom
+        last_numbers: DefaultDict[str, int] = defaultdict(int)
+        chain = None
 
-            renumbered_content_list.append(new_line)
+        for i, line in enumerate(file_content.splitlines(True)):
+            if i in atom_numbers:
+                chain, new_number = atom_numbers[i]
+                last_numbers[chain] = max(last_numbers[chain], new_number)
+            elif line.startswith(self.TER) and chain is not None:
+                new_number = last_numbers[chain]
+            else:
+                renumbered_content_list.append(line)
+                continue
+            renumbered_content_list.append(
+                f"{line[:22]}{str(new_number).rjust(4)[:4]} {line[27:]}"
+            )
 
         renumbered_content = "".join(renumbered_content_list)
         return renumbered_content
 
     @classmethod
     def run_barnaba(cls, file_content: str) -> Tuple[List[Any], List[Any], List[Any]]:
-        with tempfile.TemporaryDirectory() as directory_name:
-            with tempfile.NamedTemporaryFile(
-                "w+", dir=directory_name, suffix=".pdb"
-            ) as file:
-                file.write(file_content)
-                file.seek(0)
-                with suppress_stdout_stderr():
-                    try:
-                        barnaba_result = barnaba.annotate(file.name)
-                        logger.debug(f"BaRNAba result: {barnaba_result}")
-                    except SystemExit as exception:
-                        raise ThirdPartySoftwareError(
-                            "BaRNAba failed with system exit"
-                        ) from exception
+        with temporary_directory() as directory_name:
+            path = materialize(file_content, directory_name, "input.pdb", shared=True)
+            with suppress_stdout_stderr():
+                try:
+                    barnaba_result = barnaba.annotate(path)
+                    trace(logger, "BaRNAba result", barnaba_result)
+                except SystemExit as exception:
+                    raise ThirdPartySoftwareError(
+                        "BaRNAba failed with system exit"
+                    ) from exception
         return barnaba_result
 
+    # pylint: disable-next=too-many-locals
+    def build_trajectory(
+        self,
+        table: pd.DataFrame,
+        residue_names: Dict[str, str],
+        atom_names: Dict[str, Dict[str, str]],
+    ) -> md.Trajectory:
+        """Build mdtraj trajectory from `atom_site` table the same way as mdtraj
+        loads PDB files. Residues are renumbered within chains (BaRNAba ignores
+        insertion codes) and original numbers are remembered."""
+        table = table.replace({"?": "", ".": ""})
+        atoms = pd.DataFrame(
+            {
+                "chain": table["auth_asym_id"],
+                "number": pd.to_numeric(table["auth_seq_id"], errors="coerce"),
+                "icode": table.get("pdbx_PDB_ins_code", ""),
+                "residue": table["auth_comp_id"],
+                "atom": table["auth_atom_id"],
+                "element": table.get("type_symbol", ""),
+                "x": table["Cartn_x"].astype(float),
+                "y": table["Cartn_y"].astype(float),
+                "z": table["Cartn_z"].astype(float),
+            }
+        ).dropna(subset=["number"])
+        atoms["number"] = atoms["number"].astype(int)
+        # only the first alternate location of an atom is used
+        atoms = atoms.drop_duplicates(subset=["chain", "number", "icode", "atom"])
+
+        residue_keys = ["chain", "number", "icode"]
+        residues = atoms[residue_keys].drop_duplicates().copy()
+        residues["new_number"] = residues.groupby("chain", sort=False).cumcount() + 1
+        atoms = atoms.merge(residues, on=residue_keys, how="left", sort=False)
+        atoms["size"] = atoms.groupby(residue_keys, sort=False)["atom"].transform(
+            "size"
+        )
+        for row in residues.itertuples():
+            self.mapped_residues_info[row.chain][row.new_number] = (
+                row.number,
+                row.icode,
+            )
+
+        topology = md.Topology()
+        chain, residue, replacements = None, None, {}
+        for row in atoms.itertuples():
+            if chain is None or row.chain != self.chains[-1]:
+                self.chains.append(row.chain)
+                chain = topology.add_chain(row.chain)
+                residue = None
+            if residue is None or row.new_number != residue.resSeq:
+                name = residue_names.get(row.residue, row.residue)
+                residue = topology.add_residue(name, chain, row.new_number)
+                replacements = atom_names.get(name, {})
+            atom_name = replacements.get(row.atom, row.atom)
+            try:
+                element = md.element.get_by_symbol(row.element)
+            except KeyError:
+                # pylint: disable-next=protected-access
+                element = PDBTrajectoryFile._guess_element(
+                    atom_name, residue.name, row.size
+                )
+            topology.add_atom(atom_name, element, residue)
+        topology.create_standard_bonds()
+
+        # mdtraj uses nanometers
+        xyz = atoms[["x", "y", "z"]].to_numpy(dtype=np.float32) / 10
+        return md.Trajectory(xyz.reshape(1, -1, 3), topology)
+
+    def analyze_by_barnaba_structure(self, structure: Structure) -> BaseInteractions:
+        table = structure.atom_site_table()
+        if table is None or len(table) == 0:
+            return self.analysis_output
+        replacements = pdb_name_replacements()
+        if replacements is None:
+            logger.warning("Unsupported mdtraj version, BaRNAba reads a PDB file")
+            return self.analyze_by_barnaba(structure.to_pdb())
+        trajectory = self.build_trajectory(table, *replacements)
+
+        with suppress_stdout_stderr():
+            try:
+                stackings, pairings, res = barnaba.annotate_traj(trajectory)
+            except SystemExit as exception:
+                raise ThirdPartySoftwareError(
+                    "BaRNAba failed with system exit"
+                ) from exception
+        trace(logger, "BaRNAba result", (stackings, pairings, res))
+
+        self.append_interactions(pairings, res)
+        self.append_stackings(stackings, res)
+        return self.analysis_output
+
     def analyze_by_barnaba(
         self, file_content: str, **_: Dict[str, Any]
     ) -> BaseInteractions:
-        self.append_chains(file_content)
-        renumbered_pdb: str = self.renumber_pdb(file_content)
+        # The PDB file is read once, both steps use its atom table
+        table = AtomTable(file_content)
+        self.append_chains(table)
+        renumbered_pdb: str = self.renumber_pdb(file_content, table)
         stackings, pairings, res = self.run_barnaba(renumbered_pdb)
 
         self.append_interactions(pairings, res)
@@ -201,6 +318,10 @@ def analyze(file_content: str, **kwargs: Dict[str, Any]) -> BaseInteractions:
     return BarnabaAdapter().analyze_by_barnaba(file_content, **kwargs)
 
 
+def analyze_structure(structure: Structure, **_: Dict[str, Any]) -> BaseInteractions:
+    return BarnabaAdapter().analyze_by_barnaba_structure(structure)
+
+
 def main() -> None:
     structure = analyze(sys.stdin.read())
     print(orjson.dumps(structure).decode("utf-8"))
@@ -3,7 +3,6 @@ import enum
 import logging
 import os.path
 import sys
-from tempfile import NamedTemporaryFile, TemporaryDirectory
 from typing import Any, Dict
 
 import orjson
@@ -20,7 +19,10 @@ from rnapolis.common import (
 )
 
 from adapters.exceptions import CifParsingError
+from adapters.tools.output_filter import requested
+from adapters.tools.tracing import trace
 from adapters.tools.utils import run_external_cmd
+from adapters.tools.workspace import materialize, temporary_directory
 
 logger = logging.getLogger(__name__)
 
@@ -217,43 +219,47 @@ def residues_from_overlap_info(fields):
     return nt1, nt2
 
 
-def analyze(cif_content: str, **_: Dict[str, Any]) -> BaseInteractions:
-    with TemporaryDirectory() as directory:
-        with NamedTemporaryFile("w+", dir=directory, suffix=".cif") as file:
-            file.write(cif_content)
-            file.seek(0)
-            run_external_cmd(["bpnet.linux", file.name], cwd=directory)
-            run_external_cmd(["metbp.linux", "-mode=dev", file.name], cwd=directory)
+def analyze(cif_content: str, **kwargs: Dict[str, Any]) -> BaseInteractions:
+    # bpnet.linux finds base pairs, metbp.linux the overlaps (all other categories)
+    categories = kwargs.get("categories")
+    base_pairs = []
+    stackings, base_ribose_interactions = [], []
+    base_phosphate_interactions, other_interactions = [], []
+
+    with temporary_directory() as directory:
+        # bpnet writes its output files next to the input file
+        path = materialize(cif_content, directory, "input.cif", shared=True)
 
-            basepair_json = file.name.replace(".cif", "_basepair.json")
+        if requested(categories, "basePairs"):
+            run_external_cmd(["bpnet.linux", path], cwd=directory)
+            basepair_json = path.replace(".cif", "_basepair.json")
 
             if os.path.exists(basepair_json):
                 with open(basepair_json, encoding="utf-8") as bpnet_file:
                     bpnet_output = bpnet_file.read()
-                logger.debug(f"bpnet output: {bpnet_output}")
+                trace(logger, "bpnet output", bpnet_output)
                 base_pairs = parse_base_pairs(bpnet_output)
-            else:
-                base_pairs = []
 
-            if os.path.exists(file.name.replace(".cif", ".rob")):
-                with open(
-                    file.name.replace(".cif", ".rob"), encoding="utf-8"
-                ) as bpnet_file:
+        if requested(
+            categories,
+            "stackings",
+            "baseRiboseInteractions",
+            "basePhosphateInteractions",
+            "otherInteractions",
+        ):
+            run_external_cmd(["metbp.linux", "-mode=dev", path], cwd=directory)
+            rob = path.replace(".cif", ".rob")
+
+            if os.path.exists(rob):
+                with open(rob, encoding="utf-8") as bpnet_file:
                     bpnet_rob = bpnet_file.read()
-                logger.debug(f"bpnet rob: {bpnet_rob}")
+                trace(logger, "bpnet rob", bpnet_rob)
                 (
                     stackings,
                     base_ribose_interactions,
                     base_phosphate_interactions,
                     other_interactions,
                 ) = parse_overlaps(bpnet_rob)
-            else:
-                (
-                    stackings,
-                    base_ribose_interactions,
-                    base_phosphate_interactions,
-                    other_interactions,
-                ) = ([], [], [], [])
 
     return BaseInteractions(
         base_pairs,
@@ -3,8 +3,7 @@
 import logging
 import os
 import sys
-import tempfile
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import orjson
 from rnapolis.common import (
@@ -23,11 +22,44 @@ from rnapolis.common import (
 )
 
 from adapters.config import config
+from adapters.exceptions import ThirdPartySoftwareError
 from adapters.tools.maxit import cif2mmcif
-from adapters.tools.utils import run_external_cmd
+from adapters.tools.output_filter import CATEGORIES
+from adapters.tools.workers import SharedWorkerPool
+from adapters.tools.workspace import materialize, temporary_directory
 
 logger = logging.getLogger(__name__)
 
+# FR3D workers keep NumPy, the pdbx reader and FR3D classifiers loaded between requests,
+# they are shared by all processes of the host
+pool = SharedWorkerPool(
+    [
+        "/py27_env/bin/python",
+        "/py27_env/bin/fr3d_worker.py",
+        "/py27_env/lib/python2.7/site-packages/fr3d/classifiers/NA_pairwise_interactions.py",
+    ],
+    size=config["WORKER_POOL_SIZE"],
+    max_jobs=config["WORKER_MAX_JOBS"],
+    startup_timeout=config["WORKER_STARTUP_TIMEOUT"],
+    tool="fr3d",
+)
+
+# FR3D classifiers needed to find each category of interactions
+CLASSIFIERS = {
+    "basePairs": ("basepair", "basepair_detail"),
+    "stackings": ("stacking",),
+    "baseRiboseInteractions": ("backbone",),
+    "basePhosphateInteractions": ("backbone",),
+    "otherInteractions": ("basepair", "basepair_detail", "stacking", "backbone"),
+}
+
+
+def select_classifiers(categories: Optional[Tuple[str, ...]]) -> List[str]:
+    """FR3D classifiers to run for the selected categories (None means all)"""
+    selected = CATEGORIES if categories is None else categories
+    needed = {classifier for category in selected for classifier in CLASSIFIERS[category]}
+    return [classifier for classifier in CLASSIFIERS["otherInteractions"] if classifier in needed]
+
 
 def parse_unit_id(nt: str) -> Residue:
     fields = nt.split("|")
@@ -170,71 +202,52 @@ def _process_interaction_line(
         return False
 
 
-def run_fr3d_script(mmcif_content: str) -> Tuple[List[str], List[str], List[str]]:
+def run_fr3d_script(mmcif_content: str, classifiers: List[str]) -> Tuple[List[str], List[str], List[str]]:
     """
-    Run the FR3D Python 2.7 script to analyze RNA structure.
+    Run the FR3D Python 2.7 script in a persistent worker to analyze RNA structure.
 
     Args:
         mmcif_content: The mmCIF file content as a string
+        classifiers: FR3D classifiers to run (see select_classifiers)
 
     Returns:
         Tuple of (basepair_lines, stacking_lines, backbone_lines)
     """
-    with tempfile.TemporaryDirectory() as tmpdir:
-        # Write the mmCIF file to the temporary directory
-        cif_path = os.path.join(tmpdir, "fr3d.cif")
-        with open(cif_path, "w") as f:
-            f.write(mmcif_content)
-
-        # Run the FR3D script
-        cmd = [
-            "/py27_env/bin/python",
-            "/py27_env/lib/python2.7/site-packages/fr3d/classifiers/NA_pairwise_interactions.py",
-            "-i", tmpdir, "-o", tmpdir, "-c", "basepair,basepair_detail,stacking,backbone", "fr3d"
-        ]
-
-        try:
-            result = run_external_cmd(
-                cmd,
-                cwd=tmpdir,
-                timeout=config["SUBPROCESS_DEFAULT_TIMEOUT"],
-            )
-            logger.debug(f"FR3D script exit code: {result.returncode}")
-
-            # Read the output files
-            basepair_file = os.path.join(tmpdir, "fr3d_basepair_detail.txt")
-            stacking_file = os.path.join(tmpdir, "fr3d_stacking.txt")
-            backbone_file = os.path.join(tmpdir, "fr3d_backbone.txt")
+    with temporary_directory() as tmpdir:
+        # Make the mmCIF file available in the temporary directory
+        materialize(mmcif_content, tmpdir, "fr3d.cif", shared=True)
 
-            basepair_lines = []
-            stacking_lines = []
-            backbone_lines = []
+        # Run the FR3D script in a persistent worker
+        job = {"args": ["-i", tmpdir, "-o", tmpdir, "-c", ",".join(classifiers), "fr3d"], "cwd": tmpdir}
 
-            if os.path.exists(basepair_file):
-                with open(basepair_file, "r") as f:
-                    basepair_lines = f.read().splitlines()
+        # Failures (busy tool, timeout, crashed worker) propagate, so they are not cached
+        pool.run(job, timeout=config["SUBPROCESS_DEFAULT_TIMEOUT"])
 
-            if os.path.exists(stacking_file):
-                with open(stacking_file, "r") as f:
-                    stacking_lines = f.read().splitlines()
-
-            if os.path.exists(backbone_file):
-                with open(backbone_file, "r") as f:
-                    backbone_lines = f.read().splitlines()
+        # Read the output files, FR3D does not write files of classifiers which were not run
+        try:
+            return (
+                read_output_lines(os.path.join(tmpdir, "fr3d_basepair_detail.txt")),
+                read_output_lines(os.path.join(tmpdir, "fr3d_stacking.txt")),
+                read_output_lines(os.path.join(tmpdir, "fr3d_backbone.txt")),
+            )
+        except OSError as e:
+            raise ThirdPartySoftwareError(f"Cannot read FR3D output: {e}") from e
 
-            return basepair_lines, stacking_lines, backbone_lines
 
-        except Exception as e:
-            logger.error(f"Error running FR3D script: {e}")
-            return [], [], []
+def read_output_lines(path: str) -> List[str]:
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().splitlines()
 
 
-def analyze(file_content: str, **_: Dict[str, Any]) -> BaseInteractions:
+def analyze(file_content: str, **kwargs: Dict[str, Any]) -> BaseInteractions:
     # Convert to mmCIF format if needed
     mmcif_content = cif2mmcif(file_content)
 
-    # Run the FR3D script
-    basepair_lines, stacking_lines, backbone_lines = run_fr3d_script(mmcif_content)
+    # Run the FR3D script, only with classifiers needed for selected categories
+    classifiers = select_classifiers(kwargs.get("categories"))
+    basepair_lines, stacking_lines, backbone_lines = run_fr3d_script(mmcif_content, classifiers)
 
     # Initialize the interaction data dictionary
     interactions_data = {
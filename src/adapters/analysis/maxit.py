@@ -1,7 +1,6 @@
 #! /usr/bin/env python
 import logging
 import sys
-from tempfile import NamedTemporaryFile
 from typing import Any, Dict, List, Optional, Tuple
 
 import orjson
@@ -18,6 +17,7 @@ from rnapolis.common import (
 from rnapolis.metareader import read_metadata
 
 from adapters.tools.maxit import ensure_mmcif
+from adapters.tools.workspace import materialize, temporary_directory
 
 logger = logging.getLogger(__name__)
 
@@ -117,10 +117,10 @@ def parse_base_pairs(ndb_struct_na_base_pair: List[Dict]) -> Tuple[List, List]:
 
 
 def analyze(file_content: str, **_: Dict[str, Any]) -> BaseInteractions:
-    with NamedTemporaryFile("w+", suffix=".cif") as mmcif:
-        mmcif.write(file_content)
-        mmcif.seek(0)
-        metadata = read_metadata(mmcif, ["ndb_struct_na_base_pair"])
+    with temporary_directory() as directory:
+        path = materialize(file_content, directory, "input.cif", shared=True)
+        with open(path, encoding="utf-8") as mmcif:
+            metadata = read_metadata(mmcif, ["ndb_struct_na_base_pair"])
 
     base_pairs, other_interactions = parse_base_pairs(
         metadata["ndb_struct_na_base_pair"]
@@ -2,11 +2,9 @@
 
 import logging
 import re
-import subprocess
 import sys
-import tempfile
 from enum import Enum
-from typing import Any, Dict, List, Tuple, Union
+from typing import Any, Dict, Iterator, List, Tuple, Union
 
 import orjson
 from rnapolis.common import (
@@ -24,7 +22,9 @@ from rnapolis.common import (
 )
 
 from adapters.exceptions import PdbParsingError, RegexError
-from adapters.tools.utils import run_external_cmd
+from adapters.tools.pdb_table import AtomTable
+from adapters.tools.utils import stream_external_cmd
+from adapters.tools.workspace import materialize, temporary_directory
 
 logger = logging.getLogger(__name__)
 
@@ -63,10 +63,6 @@ class MCAnnotateAdapter:
     CIS = "cis"
     TRANS = "trans"
 
-    # Tokens used in PDB files
-    ATOM = "ATOM"
-    HETATM = "HETATM"
-
     # This regex is used to capture 6 groups of residues information:
     # (1) (2) (3) (4) (5) (6)
     # 1, 4 - chain IDs
@@ -83,12 +79,6 @@ class MCAnnotateAdapter:
     # both in our model and MC-Annotate
     ROMAN_NUMERALS = ("I", "V", "X")
 
-    # Positions of resiudes info in PDB files
-    CHAIN_INDEX = 21
-    NUMBER_INDEX = slice(22, 26)
-    ICODE_INDEX = 26
-    NAME_INDEX = slice(17, 20)
-
     def __init__(self) -> None:
         self.analysis_output = BaseInteractions([], [], [], [], [])
         # Since names are not present in adjacent and non-adjacent stackings
@@ -245,41 +235,35 @@ class MCAnnotateAdapter:
                     base_added = True
 
     @classmethod
-    def run_mc_annotate(cls, pdb_content: str) -> str:
-        with tempfile.TemporaryDirectory() as directory_name:
-            with tempfile.NamedTemporaryFile(
-                "w+", dir=directory_name, suffix=".pdb"
-            ) as file:
-                file.write(pdb_content)
-                file.seek(0)
-                mc_result = run_external_cmd(
-                    ["mc-annotate", file.name],
-                    cwd=directory_name,
-                    stdout=subprocess.PIPE,
-                ).stdout.decode("utf-8")
-        logger.debug(f"MC-Annotate result: {mc_result}")
-        return mc_result
+    def run_mc_annotate(cls, pdb_content: str) -> Iterator[str]:
+        """Lines of MC-Annotate output, available while the tool runs"""
+        with temporary_directory() as directory_name:
+            path = materialize(pdb_content, directory_name, "input.pdb", shared=True)
+            with stream_external_cmd(["mc-annotate", path], cwd=directory_name) as out:
+                for line in out:
+                    yield line.rstrip("\r\n")
 
     def append_names(self, file_content: str) -> None:
-        for line in file_content.splitlines():
-            if line.startswith(self.ATOM) or line.startswith(self.HETATM):
-                chain = line[self.CHAIN_INDEX].strip()
-                number = line[self.NUMBER_INDEX].strip()
-                icode = line[self.ICODE_INDEX].strip()
-                name = line[self.NAME_INDEX].strip()
-                residue_info = (
-                    f"{chain}{number}" if icode == "" else f"{chain}{number}.{icode}"
-                )
-                self.names[residue_info] = name
+        table = AtomTable(file_content)
+        first, _ = table.residues(by_name=True)
+        for chain, number, icode, name in zip(
+            table.chain[first].tolist(),
+            table.number[first].tolist(),
+            table.icode[first].tolist(),
+            table.residue_name[first].tolist(),
+        ):
+            residue_info = (
+                f"{chain}{number}" if icode == "" else f"{chain}{number}.{icode}"
+            )
+            self.names[residue_info] = name
 
     def analyze_by_mc_annotate(
         self, pdb_content: str, **_: Dict[str, Any]
     ) -> BaseInteractions:
         self.append_names(pdb_content)
-        mc_result = self.run_mc_annotate(pdb_content)
         current_state = None
 
-        for line in mc_result.splitlines():
+        for line in self.run_mc_annotate(pdb_content):
             for state in self.ParseState:
                 if line.startswith(state.value):
                     current_state = state
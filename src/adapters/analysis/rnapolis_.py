@@ -3,30 +3,170 @@
 
 import logging
 import sys
-import tempfile
-from typing import Any, Dict
+from collections import defaultdict
+from typing import Any, DefaultDict, Dict, List, Optional, Tuple, Union
 
 import orjson
 import rnapolis.annotator
 import rnapolis.parser
-from rnapolis.common import BaseInteractions
+from rnapolis.common import BaseInteractions, ResidueAuth, ResidueLabel
+from rnapolis.tertiary import Atom, Structure3D
+
+from adapters.tools.output_filter import requested
+from adapters.tools.structure import Structure
 
 logger = logging.getLogger(__name__)
 
+NUCLEIC_ACID_TYPES = (
+    "peptide nucleic acid",
+    "polydeoxyribonucleotide",
+    "polydeoxyribonucleotide/polyribonucleotide hybrid",
+    "polyribonucleotide",
+)
 
-def analyze(file_content: str, **kwargs: Dict[str, Any]) -> BaseInteractions:
-    model = int(kwargs.get("model"))
-    with tempfile.NamedTemporaryFile("w+") as cif_file:
-        cif_file.write(file_content)
-        cif_file.seek(0)
-        tertiary_structure = rnapolis.parser.read_3d_structure(cif_file, model)
-    base_interactions = rnapolis.annotator.extract_base_interactions(
-        tertiary_structure, model
+
+def read_category(structure: Structure, name: str) -> List[Dict[str, str]]:
+    if len(structure.data) == 0 or structure.data[0].getObj(name) is None:
+        return []
+    category = structure.data[0].getObj(name)
+    attributes = category.getAttributeList()
+    return [dict(zip(attributes, row)) for row in category.getRowList()]
+
+
+def read_residue(
+    row: Dict[str, str], icode: Optional[str]
+) -> Tuple[Optional[ResidueLabel], Optional[ResidueAuth]]:
+    label_chain = row.get("label_asym_id")
+    label_number = rnapolis.parser.try_parse_int(row.get("label_seq_id"))
+    label_name = row.get("label_comp_id")
+    auth_chain = row.get("auth_asym_id")
+    auth_number = rnapolis.parser.try_parse_int(row.get("auth_seq_id"))
+    auth_name = row.get("auth_comp_id")
+
+    label = None
+    if None not in (label_chain, label_number, label_name):
+        label = ResidueLabel(label_chain, label_number, label_name)
+    auth = None
+    if None not in (auth_chain, auth_number, auth_name):
+        auth = ResidueAuth(auth_chain, auth_number, icode, auth_name)
+    return label, auth
+
+
+def read_atoms(structure: Structure) -> DefaultDict[int, List[Atom]]:
+    atoms: DefaultDict[int, List[Atom]] = defaultdict(list)
+    for row in read_category(structure, "atom_site"):
+        icode = row.get("pdbx_PDB_ins_code")
+        # mmCIF marks empty values with ?
+        label, auth = read_residue(row, None if icode == "?" else icode)
+        if label is None and auth is None:
+            logger.debug(f"Skipping atom without residue information: {row}")
+            continue
+        occupancy = row.get("occupancy", ".")
+        model = int(row.get("pdbx_PDB_model_num", "1"))
+        atoms[model].append(
+            Atom(
+                row.get("label_entity_id"),
+                label,
+                auth,
+                model,
+                row["label_atom_id"],
+                float(row["Cartn_x"]),
+                float(row["Cartn_y"]),
+                float(row["Cartn_z"]),
+                float(occupancy) if occupancy != "." else None,
+            )
+        )
+    return atoms
+
+
+def read_modified(
+    structure: Structure,
+) -> Dict[Union[ResidueLabel, ResidueAuth], str]:
+    modified: Dict[Union[ResidueLabel, ResidueAuth], str] = {}
+    for row in read_category(structure, "pdbx_struct_mod_residue"):
+        icode = row.get("PDB_ins_code")
+        label, auth = read_residue(row, icode)
+        if icode is None:
+            auth = None
+        for residue in (label, auth):
+            if residue is not None:
+                modified[residue] = row.get("parent_comp_id", "n")
+    return modified
+
+
+def read_entities(structure: Structure) -> Tuple[Dict[str, str], Dict[str, bool]]:
+    sequence_by_entity: Dict[str, str] = {}
+    is_nucleic_acid_by_entity: Dict[str, bool] = {}
+    for row in read_category(structure, "entity_poly"):
+        entity_id, type_ = row.get("entity_id"), row.get("type")
+        sequence = row.get("pdbx_seq_one_letter_code_can")
+        if entity_id and type_:
+            is_nucleic_acid_by_entity[entity_id] = type_ in NUCLEIC_ACID_TYPES
+        if entity_id and sequence:
+            sequence_by_entity[entity_id] = sequence.replace("\n", "")
+    for row in read_category(structure, "entity"):
+        entity_id, type_ = row.get("id"), row.get("type")
+        if entity_id:
+            sequence_by_entity.setdefault(entity_id, "")
+            if type_:
+                is_nucleic_acid_by_entity.setdefault(
+                    entity_id, type_ in NUCLEIC_ACID_TYPES
+                )
+    return sequence_by_entity, is_nucleic_acid_by_entity
+
+
+def parse(structure: Structure) -> Dict[int, Structure3D]:
+    """Read parsed mmCIF data into a tertiary structure of each model.
+    It is the same as `rnapolis.parser.read_3d_structure()` for every model,
+    but the input is read once and duplicated or clashing atoms are looked for
+    within a model only. It reuses internals of the parser, so rnapolis is
+    pinned to an exact version and tests compare both parsers."""
+    modified = read_modified(structure)
+    sequence_by_entity, is_nucleic_acid_by_entity = read_entities(structure)
+    return {
+        model: rnapolis.parser.group_atoms(
+            rnapolis.parser.filter_clashing_atoms(atoms),
+            modified,
+            sequence_by_entity,
+            is_nucleic_acid_by_entity,
+            False,
+        )
+        for model, atoms in read_atoms(structure).items()
+    }
+
+
+def analyze_model(structure: Structure3D, **kwargs: Dict[str, Any]) -> BaseInteractions:
+    """Analyze tertiary structure of a single model returned by `parse()`,
+    searches are run only for the selected `categories`"""
+    categories = kwargs.get("categories")
+    base_pairs, base_phosphate, base_ribose = [], [], []
+    stackings = []
+    if requested(
+        categories, "basePairs", "baseRiboseInteractions", "basePhosphateInteractions"
+    ):
+        base_pairs, base_phosphate, base_ribose = rnapolis.annotator.find_pairs(
+            structure
+        )
+    if requested(categories, "stackings"):
+        stackings = rnapolis.annotator.find_stackings(structure)
+    base_interactions = BaseInteractions(
+        base_pairs, stackings, base_ribose, base_phosphate, []
     )
     logger.debug(base_interactions)
     return base_interactions
 
 
+def analyze(file_content: str, **kwargs: Dict[str, Any]) -> BaseInteractions:
+    model = int(kwargs.get("model"))
+    models = parse(Structure.from_cif(file_content))
+    if model not in models:
+        # the same as rnapolis.parser.read_3d_structure()
+        model = next(iter(models), model)
+    return analyze_model(
+        models.get(model, Structure3D([])), categories=kwargs.get("categories")
+    )
+
+
 def main() -> None:
     structure = analyze(sys.stdin.read(), model=1)
     print(orjson.dumps(structure).decode("utf-8"))
@@ -1,12 +1,10 @@
 #! /usr/bin/env python
 import logging
-import math
 import re
 import sys
-import tempfile
-from dataclasses import dataclass
 from typing import Any, Dict, Optional, Tuple
 
+import numpy as np
 import orjson
 from rnapolis.common import (
     BaseInteractions,
@@ -22,7 +20,10 @@ from rnapolis.common import (
 )
 
 from adapters.exceptions import PdbParsingError, RegexError
+from adapters.tools.pdb_table import AtomTable
+from adapters.tools.tracing import trace
 from adapters.tools.utils import run_external_cmd
+from adapters.tools.workspace import materialize, temporary_directory
 
 logger = logging.getLogger(__name__)
 
@@ -69,44 +70,12 @@ class RNAViewAdapter:
     #    * Group 14: if bp classification, then Saenger classification OR one of:
     #    * !1H(b_b), !(b_s), !(s_s) or !b_(O1P,O2P)
 
-    @dataclass
-    class PotentialResidue:
-        residue: Residue
-        position_c2: Optional[Tuple[float, float, float]]
-        position_c6: Optional[Tuple[float, float, float]]
-        position_n1: Optional[Tuple[float, float, float]]
-
-        def is_correct_according_to_rnaview(self) -> bool:
-            """
-            This is a reimplementation of residue_ident() function from fpair_sub.c from RNAView source code.
-            """
-            if any(
-                (
-                    self.position_c2 is None,
-                    self.position_c6 is None,
-                    self.position_n1 is None,
-                )
-            ):
-                return False
-
-            distance_n1_c2 = math.dist(self.position_n1, self.position_c2)  # type: ignore
-            distance_n1_c6 = math.dist(self.position_n1, self.position_c6)  # type: ignore
-            distance_c2_c6 = math.dist(self.position_c2, self.position_c6)  # type: ignore
-            return all(
-                (distance_n1_c2 <= 2.0, distance_n1_c6 <= 2.0, distance_c2_c6 <= 3.0)
-            )
-
-    # Positions of resiudes info in PDB files
-    ATOM_NAME_INDEX = slice(12, 16)
-    CHAIN_INDEX = 21
-    NUMBER_INDEX = slice(22, 26)
-    ICODE_INDEX = 26
-    NAME_INDEX = slice(17, 20)
-    X_INDEX, Y_INDEX, Z_INDEX = slice(30, 38), slice(38, 46), slice(46, 54)
+    # Maximum distances between atoms of a base checked by RNAView
+    MAX_DISTANCE_N1_C2 = 2.0
+    MAX_DISTANCE_N1_C6 = 2.0
+    MAX_DISTANCE_C2_C6 = 3.0
 
     # Tokens used in PDB files
-    ATOM = "ATOM"
-    HETATM = "HETATM"
     ATOM_C6 = "C6"
     ATOM_C2 = "C2"
     ATOM_N1 = "N1"
@@ -138,64 +107,65 @@ class RNAViewAdapter:
 
     @classmethod
     def run_rnaview(cls, file_content: str) -> str:
-        with tempfile.TemporaryDirectory() as directory_name:
-            with tempfile.NamedTemporaryFile(
-                "w+", dir=directory_name, suffix=".pdb"
-            ) as file:
-                file.write(file_content)
-                file.seek(0)
-                run_external_cmd(["rnaview", file.name], cwd=directory_name)
-                with open(f"{file.name}.out", encoding="utf-8") as rnaview_file:
-                    rnaview_result = rnaview_file.read()
-        logger.debug(f"rnaview result: {rnaview_result}")
+        with temporary_directory() as directory_name:
+            path = materialize(file_content, directory_name, "input.pdb")
+            run_external_cmd(["rnaview", path], cwd=directory_name)
+            with open(f"{path}.out", encoding="utf-8") as rnaview_file:
+                rnaview_result = rnaview_file.read()
+        trace(logger, "rnaview result", rnaview_result)
         return rnaview_result
 
-    def append_residues_from_pdb_using_rnaview_indexing(self, pdb_content: str) -> None:
-        potential_residues: Dict[str, RNAViewAdapter.PotentialResidue] = {}
-
-        for line in pdb_content.splitlines():
-            if line.startswith(self.ATOM) or line.startswith(self.HETATM):
-                atom_name = line[self.ATOM_NAME_INDEX].strip()
-
-                number = int(line[self.NUMBER_INDEX].strip())
-                icode = (
-                    None
-                    if line[self.ICODE_INDEX].strip() == ""
-                    else line[self.ICODE_INDEX]
-                )
-                chain = line[self.CHAIN_INDEX].strip()
-                name = line[self.NAME_INDEX].strip()
+    @staticmethod
+    def atom_positions(
+        table: AtomTable, residue: np.ndarray, atom_name: str
+    ) -> np.ndarray:
+        """Coordinates of the atom in each residue (NaN if missing)"""
+        atoms = table.last_atoms(residue, atom_name)
+        return np.where(atoms[:, np.newaxis] >= 0, table.xyz[atoms], np.nan)
 
-                residue = Residue(None, ResidueAuth(chain, number, icode, name))
-
-                if str(residue) not in potential_residues:
-                    potential_residues[str(residue)] = RNAViewAdapter.PotentialResidue(
-                        residue, None, None, None
-                    )
-                potential_residue = potential_residues[str(residue)]
-
-                atom_position = (
-                    float(line[self.X_INDEX].strip()),
-                    float(line[self.Y_INDEX].strip()),
-                    float(line[self.Z_INDEX].strip()),
-                )
+    # pylint: disable-next=too-many-locals
+    def append_residues_from_pdb_using_rnaview_indexing(self, pdb_content: str) -> None:
+        """
+        RNAView numbers only residues recognized as nucleotides.
+        This is a reimplementation of residue_ident() function from fpair_sub.c from RNAView source code,
+        checking distances between N1, C2 and C6 atoms of all residues at once.
+        """
+        table = AtomTable(pdb_content)
+        first, atom_residue = table.residues(by_name=True)
+
+        n1 = self.atom_positions(table, atom_residue, self.ATOM_N1)
+        c2 = self.atom_positions(table, atom_residue, self.ATOM_C2)
+        c6 = self.atom_positions(table, atom_residue, self.ATOM_C6)
+
+        # comparisons with NaN (missing atom) are false
+        correct = (
+            (np.linalg.norm(n1 - c2, axis=1) <= self.MAX_DISTANCE_N1_C2)
+            & (np.linalg.norm(n1 - c6, axis=1) <= self.MAX_DISTANCE_N1_C6)
+            & (np.linalg.norm(c2 - c6, axis=1) <= self.MAX_DISTANCE_C2_C6)
+        )
+
+        first = first[correct]
+        for counter, (chain, number, icode, name) in enumerate(
+            zip(
+                table.chain[first].tolist(),
+                table.number[first].tolist(),
+                table.icode[first].tolist(),
+                table.residue_name[first].tolist(),
+            ),
+            start=1,
+        ):
+            self.residues_from_pdb[counter] = Residue(
+                None, ResidueAuth(chain, number, icode or None, name)
+            )
 
-                if atom_name == self.ATOM_C6:
-                    potential_residue.position_c6 = atom_position
-                elif atom_name == self.ATOM_C2:
-                    potential_residue.position_c2 = atom_position
-                elif atom_name == self.ATOM_N1:
-                    potential_residue.position_n1 = atom_position
-
-        counter = 1
-        for potential_residue in potential_residues.values():
-            if potential_residue.is_correct_according_to_rnaview():
-                self.residues_from_pdb[counter] = potential_residue.residue
-                counter += 1
-
-        logger.debug("RNAView residues mapping:")
-        for idx, residue in sorted(self.residues_from_pdb.items()):
-            logger.debug(f"  {idx}: {residue}")
+        trace(
+            logger,
+            "RNAView residues mapping",
+            lambda: "".join(
+                f"\n  {idx}: {residue}"
+                for idx, residue in sorted(self.residues_from_pdb.items())
+            ),
+        )
 
     def get_leontis_westhof(
         self, lw_info: str, trans_cis_info: str
@@ -1,3 +1,636 @@
+import errno
+import fcntl
+import gzip
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
 from flask_caching import Cache
+from flask_caching.backends.base import BaseCache
+
+from adapters.config import config as adapters_config
+
+logger = logging.getLogger(__name__)
 
 cache = Cache()
+
+# Size of text chunks hashed at once (avoids encoding whole file in memory)
+DIGEST_CHUNK_SIZE = 1 << 20
+COMPRESS_LEVEL = 6
+# Interval of polling for a lock held by another worker
+LOCK_POLL_INTERVAL = 0.1
+
+
+def digest(*contents: str) -> str:
+    """Compute SHA-256 hex digest of given text contents (joined by NUL)"""
+    sha256 = hashlib.sha256()
+    for i, content in enumerate(contents):
+        if i > 0:
+            sha256.update(b"\0")
+        for start in range(0, len(content), DIGEST_CHUNK_SIZE):
+            sha256.update(
+                content[start : start + DIGEST_CHUNK_SIZE].encode(
+                    "utf-8", "surrogatepass"
+                )
+            )
+    return sha256.hexdigest()
+
+
+@contextmanager
+def single_flight(
+    key: str, timeout: float = adapters_config["SUBPROCESS_DEFAULT_TIMEOUT"]
+):
+    """Let only one worker at a time enter the block for given key.
+    Other workers wait on a lock file in `LOCK_DIR`. If waiting takes longer
+    than `timeout` seconds, the block is entered without the lock.
+
+    Args:
+        key (str): identifier of the operation, e.g. "pdb2cif:<digest>"
+        timeout (float): maximum time of waiting in seconds
+    """
+    os.makedirs(adapters_config["LOCK_DIR"], exist_ok=True)
+    path = os.path.join(adapters_config["LOCK_DIR"], f"{digest(key)}.lock")
+    deadline = time.monotonic() + timeout
+
+    while True:
+        lock = open(path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            if time.monotonic() > deadline:
+                logger.warning(f"Waiting for {key} timed out, computing anyway")
+                yield
+                return
+            time.sleep(LOCK_POLL_INTERVAL)
+            continue
+        # The holder removes lock file on release, so make sure we locked
+        # the file which is still present under the path
+        try:
+            if os.stat(path).st_ino == os.fstat(lock.fileno()).st_ino:
+                break
+        except FileNotFoundError:
+            pass
+        lock.close()
+
+    try:
+        yield
+    finally:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        lock.close()
+
+
+def cached(key: str, compute: Callable[[], Any]) -> Any:
+    """Get value from cache or compute it and store in cache.
+    Concurrent computations of the same key are deduplicated across workers."""
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    with single_flight(key):
+        # Another worker might have computed the value while we were waiting
+        value = cache.get(key)
+        if value is None:
+            value = compute()
+            cache.set(key, value)
+        else:
+            logger.debug(f"Value for {key} computed by another worker")
+    return value
+
+
+def artifact_key(name: str, content: str, model: Optional[int]) -> str:
+    return f"artifact:{name}:{model}:{digest(content)}"
+
+
+def pack_artifact(value: Any) -> bytes:
+    return gzip.compress(
+        pickle.dumps(value, pickle.HIGHEST_PROTOCOL), compresslevel=COMPRESS_LEVEL
+    )
+
+
+def cached_artifact(
+    name: str, content: str, model: Optional[int], compute: Callable[[], Any]
+) -> Any:
+    """Get a named pipeline artifact (e.g. filtered structure) derived from input
+    content and model number. The artifact is computed once, pickled and stored
+    gzip-compressed, so that all adapters can start from it.
+
+    Args:
+        name (str): name of the artifact
+        content (str): input file content
+        model (Optional[int]): model number (None for artifacts of all models)
+        compute (Callable[[], Any]): function which creates the artifact
+    """
+    compressed = cached(
+        artifact_key(name, content, model), lambda: pack_artifact(compute())
+    )
+    return pickle.loads(gzip.decompress(compressed))
+
+
+def store_artifact(name: str, content: str, model: Optional[int], value: Any):
+    """Store an artifact computed as a by-product of another one (e.g. all models
+    parsed at once), so that `cached_artifact()` finds it without computing"""
+    cache.set(artifact_key(name, content, model), pack_artifact(value))
+
+
+def memoize_compressed(operation: str):
+    """Decorate a text -> text function (e.g. file conversion) to cache its result.
+    The result is stored gzip-compressed under SHA-256 digest of the input,
+    so neither the key nor the stored value holds a raw copy of the file.
+    Concurrent calls with the same input are computed only once.
+
+    Args:
+        operation (str): name of the operation, part of the cache key
+    """
+
+    def _memoize_compressed(function: Callable[[str], str]):
+        @wraps(function)
+        def __memoize_compressed(content: str) -> str:
+            compressed = cached(
+                f"{operation}:{digest(content)}",
+                lambda: gzip.compress(
+                    function(content).encode("utf-8"), compresslevel=COMPRESS_LEVEL
+                ),
+            )
+            return gzip.decompress(compressed).decode("utf-8")
+
+        return __memoize_compressed
+
+    return _memoize_compressed
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    # Size of pickled value in bytes
+    size: int
+    # Expiration timestamp (0 means never expire)
+    expires: int
+    # Pickled value (if known)
+    payload: Optional[bytes] = None
+
+
+class ExpirationMixin:
+    def _expiration(self, timeout) -> int:
+        timeout = self._normalize_timeout(timeout)
+        return 0 if timeout == 0 else int(time.time()) + timeout
+
+
+# pylint: disable-next=too-many-instance-attributes
+class DiskLruCache(ExpirationMixin, BaseCache):
+    """A cache that stores items on the file system, bounded by total size in bytes.
+
+    Entries are spread over 256 shard subdirectories (by the first byte of
+    SHA-256 of the key). Each read bumps modification time of the entry,
+    so pruning removes least recently used entries first. Writes go to a
+    temporary file which is atomically renamed, so it is safe to share
+    `cache_dir` between gunicorn workers. Pruning is guarded by a lock file.
+
+    Total size is not recounted on every write. Each worker adds sizes of its
+    writes to the size found by the last scan and scans the directory only when
+    this estimate exceeds `max_size` or after `PRUNE_INTERVAL` writes (to account
+    for writes of other workers). Expired entries are removed when read.
+
+    The layout version is kept in `cache_dir`. Files of other layouts (e.g. flat
+    files left by FileSystemCache) are removed when the cache is created.
+    Hit, miss and eviction counters are kept per process, see `stats()`.
+
+    Args:
+        cache_dir (str): directory where cache files are stored
+        max_size (int): maximum total size of cache files in bytes (0 means no limit)
+        default_timeout (int): default timeout in seconds (0 means never expire)
+    """
+
+    EXPIRES = struct.Struct("I")
+    LOCK_FILE = ".lock"
+    LAYOUT_FILE = ".layout"
+    # Bump when the directory layout or the format of entries changes
+    LAYOUT_VERSION = "1"
+    TEMPORARY_SUFFIX = ".tmp"
+    # After pruning the cache occupies at most this fraction of max_size
+    PRUNE_RATIO = 0.9
+    # Maximum number of writes between scans of the cache directory
+    PRUNE_INTERVAL = 100
+
+    def __init__(self, cache_dir: str, max_size: int = 0, default_timeout: int = 300):
+        super().__init__(default_timeout=default_timeout)
+        self.ignore_errors = True
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        # Estimated total size of cache files (None until the first scan)
+        self._size: Optional[int] = None
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._migrate()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        args.insert(0, config["CACHE_DIR"])
+        kwargs.update({"max_size": config["CACHE_MAX_SIZE"]})
+        return cls(*args, **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def _migrate(self) -> None:
+        """Remove files of other layouts unless `cache_dir` has the current one"""
+        layout = os.path.join(self.cache_dir, self.LAYOUT_FILE)
+        with open(
+            os.path.join(self.cache_dir, self.LOCK_FILE), "w", encoding="utf-8"
+        ) as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(layout, encoding="utf-8") as file:
+                    if file.read().strip() == self.LAYOUT_VERSION:
+                        return
+            except FileNotFoundError:
+                pass
+
+            logger.info(f"Removing cache files of other layouts from {self.cache_dir}")
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    if entry.name in (self.LOCK_FILE, self.LAYOUT_FILE):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            shutil.rmtree(entry.path)
+                        else:
+                            os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+                    except OSError:
+                        logger.warning(f"Failed to remove {entry.path}", exc_info=True)
+
+            fd, temporary = tempfile.mkstemp(
+                suffix=self.TEMPORARY_SUFFIX, dir=self.cache_dir
+            )
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(self.LAYOUT_VERSION)
+            os.replace(temporary, layout)
+
+    def _get_filename(self, key: str) -> str:
+        key_hash = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key_hash[:2], key_hash)
+
+    def _list_entries(self) -> Iterator[os.DirEntry]:
+        with os.scandir(self.cache_dir) as shards:
+            for shard in shards:
+                if not shard.is_dir(follow_symlinks=False):
+                    continue
+                with os.scandir(shard.path) as entries:
+                    for entry in entries:
+                        if not entry.name.endswith(self.TEMPORARY_SUFFIX):
+                            yield entry
+
+    def load(self, key: str) -> Optional[CacheEntry]:
+        """Read entry (with its size and expiration time) and mark it as recently used"""
+        filename = self._get_filename(key)
+        try:
+            with open(filename, "rb") as file:
+                expires = self.EXPIRES.unpack(file.read(self.EXPIRES.size))[0]
+                if expires != 0 and expires < time.time():
+                    self._remove_expired(filename, file)
+                    return None
+                payload = file.read()
+            value = pickle.loads(payload)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, struct.error, pickle.UnpicklingError):
+            logger.warning(f"Failed to read cache file {filename}", exc_info=True)
+            return None
+        try:
+            os.utime(filename)
+        except OSError:
+            pass
+        return CacheEntry(value, len(payload), expires, payload)
+
+    @staticmethod
+    def _remove_expired(filename: str, file) -> None:
+        # Another worker might have replaced the entry with a fresh one
+        try:
+            if os.stat(filename).st_ino == os.fstat(file.fileno()).st_ino:
+                os.remove(filename)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.warning(f"Failed to remove {filename}", exc_info=True)
+
+    def store(self, key: str, payload: bytes, expires: int) -> bool:
+        """Atomically write already pickled value"""
+        filename = self._get_filename(key)
+        directory = os.path.dirname(filename)
+        os.makedirs(directory, exist_ok=True)
+        try:
+            fd, temporary = tempfile.mkstemp(
+                suffix=self.TEMPORARY_SUFFIX, dir=directory
+            )
+            with os.fdopen(fd, "wb") as file:
+                file.write(self.EXPIRES.pack(expires))
+                file.write(payload)
+            os.replace(temporary, filename)
+        except OSError:
+            logger.warning(f"Failed to write cache file {filename}", exc_info=True)
+            return False
+        self._prune(self.EXPIRES.size + len(payload))
+        return True
+
+    def get(self, key: str) -> Any:
+        entry = self.load(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.value
+
+    def has(self, key: str) -> bool:
+        if self.load(key) is None:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def add(self, key: str, value: Any, timeout=None) -> bool:
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def set(self, key: str, value: Any, timeout=None) -> bool:
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return self.store(key, payload, self._expiration(timeout))
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self._get_filename(key))
+        except FileNotFoundError:
+            return False
+        except OSError:
+            logger.warning(f"Failed to remove cache entry {key}", exc_info=True)
+            return False
+        return True
+
+    def clear(self) -> bool:
+        for entry in self._list_entries():
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                logger.warning(f"Failed to remove {entry.path}", exc_info=True)
+                return False
+        # the next write scans the directory again
+        self._size = None
+        self._writes = 0
+        return True
+
+    def _prune(self, written: int) -> None:
+        if self.max_size == 0:
+            return
+
+        self._writes += 1
+        if self._size is not None:
+            # Overwritten entries are counted twice, so the estimate only errs
+            # on the side of scanning too early
+            self._size += written
+            if self._size <= self.max_size and self._writes < self.PRUNE_INTERVAL:
+                return
+
+        with open(
+            os.path.join(self.cache_dir, self.LOCK_FILE), "w", encoding="utf-8"
+        ) as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError as exception:
+                # Another worker is pruning right now
+                if exception.errno in (errno.EAGAIN, errno.EACCES):
+                    return
+                raise
+
+            entries: List[Tuple[float, int, str]] = []
+            total_size = 0
+            for entry in self._list_entries():
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+
+            self._writes = 0
+            self._size = total_size
+            if total_size <= self.max_size:
+                return
+
+            target_size = int(self.max_size * self.PRUNE_RATIO)
+            for _, size, path in sorted(entries):
+                if total_size <= target_size:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total_size -= size
+                self.evictions += 1
+            self._size = total_size
+            logger.debug(f"Cache pruned to {total_size} bytes, stats: {self.stats()}")
+
+
+# pylint: disable-next=too-many-instance-attributes
+class MemoryLruCache(ExpirationMixin, BaseCache):
+    """An in-process cache bounded by total size (in bytes) of pickled values.
+    Immutable values (e.g. compressed bytes) are kept as objects, other values
+    are kept pickled, so that every caller gets its own copy.
+    Hit, miss and eviction counters are kept, see `stats()`.
+
+    Args:
+        max_size (int): maximum total size of values in bytes
+        default_timeout (int): default timeout in seconds (0 means never expire)
+    """
+
+    # Types of values returned without copying
+    IMMUTABLE_TYPES = (bytes, str, int, float)
+
+    def __init__(self, max_size: int, default_timeout: int = 300):
+        super().__init__(default_timeout=default_timeout)
+        self.ignore_errors = True
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": self.size,
+        }
+
+    def load(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires != 0 and entry.expires < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def store(self, key: str, entry: CacheEntry) -> bool:
+        """Store entry with its value and payload, only one of them is kept"""
+        if entry.size > self.max_size:
+            return False
+        if isinstance(entry.value, self.IMMUTABLE_TYPES):
+            entry = entry._replace(payload=None)
+        else:
+            entry = entry._replace(value=None)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self.size += entry.size
+            while self.size > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return True
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size -= entry.size
+        return True
+
+    def get(self, key: str) -> Any:
+        entry = self.load(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if entry.payload is not None:
+            return pickle.loads(entry.payload)
+        return entry.value
+
+    def has(self, key: str) -> bool:
+        return self.load(key) is not None
+
+    def add(self, key: str, value: Any, timeout=None) -> bool:
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def set(self, key: str, value: Any, timeout=None) -> bool:
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return self.store(
+            key, CacheEntry(value, len(payload), self._expiration(timeout), payload)
+        )
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._remove(key)
+
+    def clear(self) -> bool:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+        return True
+
+
+class TieredCache(ExpirationMixin, BaseCache):
+    """Two-tier cache: per-worker MemoryLruCache in front of shared DiskLruCache.
+    Writes go through to both tiers, disk hits are promoted to memory.
+    Values are pickled once on write and unpickled once on a disk hit.
+    `stats()` reports counters of both tiers and promotions of disk hits.
+
+    Args:
+        cache_dir (str): directory for the disk tier
+        max_size (int): maximum size of the disk tier in bytes (0 means no limit)
+        memory_max_size (int): maximum size of the memory tier in bytes
+        default_timeout (int): default timeout in seconds (0 means never expire)
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        max_size: int = 0,
+        memory_max_size: int = 0,
+        default_timeout: int = 300,
+    ):
+        super().__init__(default_timeout=default_timeout)
+        self.ignore_errors = True
+        self.memory = MemoryLruCache(memory_max_size, default_timeout)
+        self.disk = DiskLruCache(cache_dir, max_size, default_timeout)
+        # Disk hits stored in the memory tier
+        self.promotions = 0
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        args.insert(0, config["CACHE_DIR"])
+        kwargs.update(
+            {
+                "max_size": config["CACHE_MAX_SIZE"],
+                "memory_max_size": config["CACHE_MEMORY_MAX_SIZE"],
+            }
+        )
+        return cls(*args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats(),
+            "promotions": self.promotions,
+        }
+
+    def get(self, key: str) -> Any:
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        entry = self.disk.load(key)
+        if entry is None:
+            self.disk.misses += 1
+            return None
+        self.disk.hits += 1
+        # the memory tier keeps its own copy (payload) of mutable values
+        if self.memory.store(key, entry):
+            self.promotions += 1
+        return entry.value
+
+    def has(self, key: str) -> bool:
+        return self.memory.has(key) or self.disk.has(key)
+
+    def add(self, key: str, value: Any, timeout=None) -> bool:
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def set(self, key: str, value: Any, timeout=None) -> bool:
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        expires = self._expiration(timeout)
+        self.memory.store(key, CacheEntry(value, len(payload), expires, payload))
+        return self.disk.store(key, payload, expires)
+
+    def delete(self, key: str) -> bool:
+        deleted_from_memory = self.memory.delete(key)
+        deleted_from_disk = self.disk.delete(key)
+        return deleted_from_memory or deleted_from_disk
+
+    def clear(self) -> bool:
+        return self.memory.clear() and self.disk.clear()
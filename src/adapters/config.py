@@ -1,14 +1,48 @@
 import logging
 from os import environ
+from typing import Dict
+
+
+def parse_limits(limits: str) -> Dict[str, int]:
+    """Parse limits given as comma-separated `name=value` pairs"""
+    pairs = (pair.split("=", 1) for pair in limits.split(",") if pair.strip())
+    return {name.strip(): int(value) for name, value in pairs}
+
 
 config = {
-    "CACHE_TYPE": "FileSystemCache",
+    "CACHE_TYPE": "adapters.cache.TieredCache",
     "CACHE_DIR": environ.get("ADAPTERS_CACHE_DIR", "/var/tmp/adapters_cache/"),
-    "CACHE_THRESHOLD": int(environ.get("ADAPTERS_CACHE_THRESHOLD", "50")),
+    "CACHE_MAX_SIZE": int(environ.get("ADAPTERS_CACHE_MAX_SIZE", "2147483648")),
+    "CACHE_MEMORY_MAX_SIZE": int(
+        environ.get("ADAPTERS_CACHE_MEMORY_MAX_SIZE", "134217728")
+    ),
     "CACHE_DEFAULT_TIMEOUT": int(environ.get("ADAPTERS_CACHE_TIMEOUT", "3600")),
+    "LOCK_DIR": environ.get("ADAPTERS_LOCK_DIR", "/var/tmp/adapters_locks/"),
+    "SCRATCH_DIR": environ.get("ADAPTERS_SCRATCH_DIR", "/dev/shm/adapters_scratch/"),
+    "RESULT_CACHE_VERSION": environ.get("ADAPTERS_RESULT_CACHE_VERSION", "1"),
+    "BATCH_WORKERS": int(environ.get("ADAPTERS_BATCH_WORKERS", "4")),
+    "JOB_DIR": environ.get("ADAPTERS_JOB_DIR", "/var/tmp/adapters_jobs/"),
+    "JOB_WORKERS": int(environ.get("ADAPTERS_JOB_WORKERS", "2")),
+    "JOB_TIMEOUT": int(environ.get("ADAPTERS_JOB_TIMEOUT", "86400")),
     "SUBPROCESS_DEFAULT_TIMEOUT": int(
         environ.get("ADAPTERS_SUBPROCESS_TIMEOUT", "600")
     ),
+    "TOOL_SLOTS": parse_limits(environ.get("ADAPTERS_TOOL_SLOTS", "")),
+    "TOOL_QUEUE_SIZE": int(environ.get("ADAPTERS_TOOL_QUEUE_SIZE", "16")),
+    "TOOL_QUEUE_TIMEOUT": int(environ.get("ADAPTERS_TOOL_QUEUE_TIMEOUT", "60")),
+    "TOOL_MEMORY_LIMITS": parse_limits(environ.get("ADAPTERS_TOOL_MEMORY_LIMITS", "")),
+    "TOOL_CPU_LIMITS": parse_limits(environ.get("ADAPTERS_TOOL_CPU_LIMITS", "")),
+    "RESOURCE_LOG": environ.get("ADAPTERS_RESOURCE_LOG", ""),
+    "TRACE_DIR": environ.get("ADAPTERS_TRACE_DIR", ""),
+    "TRACE_PREVIEW": int(environ.get("ADAPTERS_TRACE_PREVIEW", "1000")),
+    "TRACE_MAX_AGE": int(environ.get("ADAPTERS_TRACE_MAX_AGE", "86400")),
+    "PRELOAD": environ.get("ADAPTERS_PRELOAD", "0") == "1",
+    "WORKER_POOL_SIZE": int(environ.get("ADAPTERS_WORKER_POOL_SIZE", "1")),
+    "WORKER_MAX_JOBS": int(environ.get("ADAPTERS_WORKER_MAX_JOBS", "100")),
+    "WORKER_STARTUP_TIMEOUT": int(
+        environ.get("ADAPTERS_WORKER_STARTUP_TIMEOUT", "120")
+    ),
+    "WORKER_IDLE_TIMEOUT": int(environ.get("ADAPTERS_WORKER_IDLE_TIMEOUT", "3600")),
 }
 
 logging.basicConfig(format="[%(asctime)s] [%(levelname)s] [%(filename)s] %(message)s")
@@ -20,3 +20,7 @@ class InvalidSvgError(Exception):
 
 class InvalidEpsError(Exception):
     pass
+
+
+class ToolBusyError(Exception):
+    pass
@@ -0,0 +1,151 @@
+#! /usr/bin/env python
+"""Runner of asynchronous jobs, a process independent of HTTP workers:
+
+    python -m adapters.job_runner
+
+It picks up jobs queued in the job store and runs up to `JOB_WORKERS` of them
+at a time in its own process pool, so jobs survive restarts of HTTP workers.
+On SIGTERM the pool is shut down and its processes are terminated, and they
+terminate themselves if the runner dies in any other way."""
+
+import ctypes
+import logging
+import multiprocessing
+import os
+import signal
+import subprocess
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict
+
+from werkzeug.exceptions import HTTPException
+
+from adapters import jobs
+from adapters.config import config
+from adapters.exceptions import ToolBusyError
+from adapters.routes.analysis import get_adapter
+from adapters.server import app, preload
+from adapters.tools.workspace import Workspace
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the job store for new jobs
+POLL_INTERVAL = 0.5
+# Seconds between removals of expired jobs
+PURGE_INTERVAL = 600
+# Seconds before a job which found its tool busy is run again
+RETRY_DELAY = 5
+# prctl(2) option which sets the signal sent to a process when its parent dies
+PR_SET_PDEATHSIG = 1
+
+
+def die_with_runner(runner_pid: int):
+    """Initializer of job workers: make them exit when the runner dies,
+    otherwise they would wait for new jobs forever"""
+    libc = ctypes.CDLL(None, use_errno=True)
+    if libc.prctl(PR_SET_PDEATHSIG, signal.SIGTERM) != 0:
+        logger.warning(f"prctl failed: {os.strerror(ctypes.get_errno())}")
+    # the runner might have died before prctl
+    if os.getppid() != runner_pid:
+        os.kill(os.getpid(), signal.SIGTERM)
+
+
+def new_executor() -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(
+        max_workers=config["JOB_WORKERS"],
+        initializer=die_with_runner,
+        initargs=(os.getpid(),),
+    )
+
+
+def stop(signum: int, _):
+    raise SystemExit(128 + signum)
+
+
+def run_job(job_id: str):
+    """Run a job claimed by the runner and store its result or error"""
+    jobs.store.update(job_id, pid=os.getpid())
+    status = jobs.store.status(job_id)
+    categories = status["categories"] and tuple(status["categories"])
+    try:
+        runner, analyze = get_adapter(status["tool"])
+        with app.app_context(), Workspace():
+            data = jobs.store.input(job_id)
+            result = runner(analyze, data, status["model"], categories)
+    except HTTPException as exception:
+        error = exception.description
+    except subprocess.TimeoutExpired:
+        error = "Timeout (request too big)"
+    except ToolBusyError as exception:
+        # the tool is busy only temporarily, the job waits in the queue
+        logger.info(f"Job {job_id} requeued: {exception}")
+        jobs.store.requeue(job_id, RETRY_DELAY)
+        return
+    except Exception as exception:  # pylint: disable=broad-except
+        logger.error(f"Job {job_id} failed: {exception}", exc_info=1)
+        error = "Unknown Error"
+    else:
+        jobs.store.set_result(job_id, result)
+        jobs.store.update(job_id, finished=time.time())
+        return
+    jobs.store.update(job_id, status=jobs.FAILED, error=error, finished=time.time())
+
+
+def submit_queued(executor: ProcessPoolExecutor, running: Dict[Future, str]):
+    """Claim queued jobs (the oldest first) while there are free job workers"""
+    for job_id in jobs.store.queued():
+        if len(running) >= config["JOB_WORKERS"]:
+            return
+        if jobs.store.claim(job_id):
+            running[executor.submit(run_job, job_id)] = job_id
+            logger.info(f"Job {job_id} started")
+
+
+def collect_finished(finished: Dict[Future, str]) -> bool:
+    """Check finished futures, returns False if the process pool is broken"""
+    healthy = True
+    for future, job_id in finished.items():
+        try:
+            future.result()
+        except BrokenProcessPool:
+            # e.g. a job worker killed by OOM killer, its job cannot finish
+            jobs.store.update(job_id, status=jobs.FAILED, error="Job was interrupted")
+            healthy = False
+        logger.info(f"Job {job_id} finished")
+    return healthy
+
+
+def main():
+    signal.signal(signal.SIGTERM, stop)
+    preload()
+    running: Dict[Future, str] = {}
+    purged = 0.0
+    executor = new_executor()
+    logger.info(f"Job runner started (pid: {os.getpid()})")
+    try:
+        while True:
+            if time.monotonic() - purged > PURGE_INTERVAL:
+                jobs.store.purge()
+                purged = time.monotonic()
+            submit_queued(executor, running)
+            if not running:
+                time.sleep(POLL_INTERVAL)
+                continue
+            done, _ = wait(running, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+            if not collect_finished({future: running.pop(future) for future in done}):
+                # all jobs of a broken pool fail, the pool is replaced
+                done, _ = wait(running)
+                collect_finished({future: running.pop(future) for future in done})
+                executor.shutdown(wait=False)
+                executor = new_executor()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        # do not wait for running jobs, they are reported as interrupted
+        for child in multiprocessing.active_children():
+            child.terminate()
+        logger.info("Job runner stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import fcntl
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import orjson
+from rnapolis.common import BaseInteractions
+
+from adapters.config import config
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+Categories = Optional[Tuple[str, ...]]
+
+
+class JobStore:
+    """Jobs kept on disk, so that any HTTP worker can report on any job and
+    the job runner (see `adapters.job_runner`) can pick them up. Each job is
+    a directory with `input.txt`, `status.json` and (when done) `result.json`.
+
+    Args:
+        directory (str): root directory of the store
+        timeout (int): seconds after which finished jobs are removed
+    """
+
+    def __init__(self, directory: str, timeout: int):
+        self.directory = directory
+        self.timeout = timeout
+
+    def create(
+        self, tool: str, data: str, model: int, categories: Categories
+    ) -> Dict[str, Any]:
+        self.purge()
+        job_id = uuid.uuid4().hex
+        os.makedirs(self._path(job_id))
+        self._write(job_id, "input.txt", data.encode("utf-8"))
+        status = {
+            "id": job_id,
+            "tool": tool,
+            "model": model,
+            "categories": categories,
+            "status": QUEUED,
+            "submitted": time.time(),
+        }
+        self._write(job_id, "status.json", orjson.dumps(status))
+        return status
+
+    def update(self, job_id: str, **changes: Any):
+        with self._locked(job_id):
+            status = self.status(job_id)
+            if status is not None:
+                status.update(changes)
+                self._write(job_id, "status.json", orjson.dumps(status))
+
+    def claim(self, job_id: str) -> bool:
+        """Mark a queued job as running by the current process, unless another
+        runner has claimed it first"""
+        with self._locked(job_id):
+            status = self.status(job_id)
+            if status is None or status["status"] != QUEUED:
+                return False
+            status.update(status=RUNNING, started=time.time(), pid=os.getpid())
+            self._write(job_id, "status.json", orjson.dumps(status))
+            return True
+
+    def requeue(self, job_id: str, delay: float):
+        """Put a claimed job back to the queue, to be run after `delay` seconds"""
+        self.update(job_id, status=QUEUED, pid=None, not_before=time.time() + delay)
+
+    def set_result(self, job_id: str, result: BaseInteractions):
+        self._write(job_id, "result.json", orjson.dumps(result))
+        self.update(job_id, status=DONE)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        content = self._read(job_id, "status.json")
+        if content is None:
+            return None
+        status = orjson.loads(content)
+        # A job whose process is gone (e.g. a restarted runner) never finishes
+        if status["status"] == RUNNING and not is_alive(status["pid"]):
+            status.update(status=FAILED, error="Job was interrupted")
+        return status
+
+    def input(self, job_id: str) -> Optional[str]:
+        content = self._read(job_id, "input.txt")
+        return None if content is None else content.decode("utf-8")
+
+    def result(self, job_id: str) -> Optional[bytes]:
+        return self._read(job_id, "result.json")
+
+    def queued(self) -> List[str]:
+        """Ids of queued jobs ready to run, the oldest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        now = time.time()
+        statuses = (self.status(job_id) for job_id in os.listdir(self.directory))
+        return [
+            status["id"]
+            for status in sorted(
+                (status for status in statuses if status is not None),
+                key=lambda status: status["submitted"],
+            )
+            if status["status"] == QUEUED and status.get("not_before", 0) <= now
+        ]
+
+    def purge(self):
+        """Remove jobs not updated for `timeout` seconds"""
+        if not os.path.isdir(self.directory):
+            return
+        deadline = time.time() - self.timeout
+        for job_id in os.listdir(self.directory):
+            path = self._path(job_id)
+            try:
+                if os.stat(path).st_mtime < deadline:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                continue
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, job_id)
+
+    @contextmanager
+    def _locked(self, job_id: str) -> Iterator[None]:
+        """Serialize read-modify-write of the status of a job across processes"""
+        with open(os.path.join(self._path(job_id), "status.lock"), "ab") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def _read(self, job_id: str, name: str) -> Optional[bytes]:
+        # job ids come from URLs, allow only the ones generated by `create()`
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(os.path.join(self._path(job_id), name), "rb") as file:
+                return file.read()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    def _write(self, job_id: str, name: str, content: bytes):
+        fd, temporary = tempfile.mkstemp(dir=self._path(job_id), suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            file.write(content)
+        os.replace(temporary, os.path.join(self._path(job_id), name))
+
+
+def is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+store = JobStore(config["JOB_DIR"], config["JOB_TIMEOUT"])
+
+
+def submit(
+    tool: str, data: str, model: int, categories: Categories = None
+) -> Dict[str, Any]:
+    """Queue an analysis for the job runner and return status of the new job"""
+    status = store.create(tool, data, model, categories)
+    logger.info(f"Job {status['id']} ({tool}, model {model}) submitted")
+    return status
@@ -1,21 +1,65 @@
 #! /usr/bin/env python
 
-from flask import Blueprint, request
-
-from adapters import services
-from adapters.analysis import (
-    barnaba_,
-    bpnet,
-    fr3d_,
-    maxit,
-    mc_annotate,
-    rnapolis_,
-    rnaview,
-)
+from http import HTTPStatus
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import Blueprint, Response, request
+from rnapolis.common import BaseInteractions
+from werkzeug.exceptions import BadRequest, Conflict, NotFound
+from werkzeug.utils import import_string
+
+from adapters import jobs, services
+from adapters.tools.output_filter import CATEGORIES
 from adapters.tools.utils import content_type, json_response
 
 server = Blueprint("analysis", __name__)
 
+# Adapter modules are imported on first use, some of them take long to import
+ADAPTERS = {
+    "barnaba": (
+        services.run_structure_adapter,
+        "adapters.analysis.barnaba_:analyze_structure",
+    ),
+    "bpnet": (services.run_cif_adapter, "adapters.analysis.bpnet:analyze"),
+    "fr3d": (services.run_cif_adapter, "adapters.analysis.fr3d_:analyze"),
+    "maxit": (services.run_cif_adapter, "adapters.analysis.maxit:analyze"),
+    "mc-annotate": (services.run_pdb_adapter, "adapters.analysis.mc_annotate:analyze"),
+    "rnapolis": (
+        services.run_parsed_adapter,
+        "adapters.analysis.rnapolis_:analyze_model",
+    ),
+    "rnaview": (services.run_pdb_adapter, "adapters.analysis.rnaview:analyze"),
+}
+
+
+def get_adapter(tool: str) -> Tuple[Callable, Callable[..., BaseInteractions]]:
+    """Runner and analyze function of the tool (imported on first use)"""
+    if tool not in ADAPTERS:
+        raise NotFound(f"Unknown analysis tool: {tool}")
+    runner, analyze = ADAPTERS[tool]
+    return runner, import_string(analyze)
+
+
+def parse_categories(categories: str) -> Optional[Tuple[str, ...]]:
+    if categories == "all":
+        return None
+    selected = {category.strip() for category in categories.split(",")}
+    unknown = sorted(selected.difference(CATEGORIES))
+    if unknown:
+        raise BadRequest(f"Unknown interaction categories: {', '.join(unknown)}")
+    return tuple(category for category in CATEGORIES if category in selected)
+
+
+def request_categories() -> Optional[Tuple[str, ...]]:
+    """Interaction categories selected with `categories` query parameter"""
+    return parse_categories(request.args.get("categories", "all"))
+
+
+def run_adapter(tool: str, model: int) -> BaseInteractions:
+    runner, analyze = get_adapter(tool)
+    return runner(analyze, request.data.decode("utf-8"), model, request_categories())
+
+
 # BPNet adapter routes
 
 
@@ -23,11 +67,7 @@ server = Blueprint("analysis", __name__)
 @content_type("text/plain")
 @json_response()
 def analyze_bpnet_model(model: int):
-    return services.run_cif_adapter(
-        bpnet.analyze,
-        request.data.decode("utf-8"),
-        model,
-    )
+    return run_adapter("bpnet", model)
 
 
 @server.route("/bpnet", methods=["POST"])
@@ -42,11 +82,7 @@ def analyze_bpnet():
 @content_type("text/plain")
 @json_response()
 def analyze_fr3d_model(model: int):
-    return services.run_cif_adapter(
-        fr3d_.analyze,
-        request.data.decode("utf-8"),
-        model,
-    )
+    return run_adapter("fr3d", model)
 
 
 @server.route("/fr3d", methods=["POST"])
@@ -61,11 +97,7 @@ def analyze_fr3d():
 @content_type("text/plain")
 @json_response()
 def analyze_barnaba_model(model: int):
-    return services.run_pdb_adapter(
-        barnaba_.analyze,
-        request.data.decode("utf-8"),
-        model,
-    )
+    return run_adapter("barnaba", model)
 
 
 @server.route("/barnaba", methods=["POST"])
@@ -80,11 +112,7 @@ def analyze_barnaba():
 @content_type("text/plain")
 @json_response()
 def analyze_mc_annotate_model(model: int):
-    return services.run_pdb_adapter(
-        mc_annotate.analyze,
-        request.data.decode("utf-8"),
-        model,
-    )
+    return run_adapter("mc-annotate", model)
 
 
 @server.route("/mc-annotate", methods=["POST"])
@@ -99,11 +127,7 @@ def analyze_mc_annotate():
 @content_type("text/plain")
 @json_response()
 def analyze_rnaview_model(model: int):
-    return services.run_pdb_adapter(
-        rnaview.analyze,
-        request.data.decode("utf-8"),
-        model,
-    )
+    return run_adapter("rnaview", model)
 
 
 @server.route("/rnaview", methods=["POST"])
@@ -118,11 +142,7 @@ def analyze_rnaview():
 @content_type("text/plain")
 @json_response()
 def analyze_rnapolis_model(model: int):
-    return services.run_cif_adapter(
-        rnapolis_.analyze,
-        request.data.decode("utf-8"),
-        model,
-    )
+    return run_adapter("rnapolis", model)
 
 
 @server.route("/rnapolis", methods=["POST"])
@@ -137,13 +157,115 @@ def analyze_rnapolis():
 @content_type("text/plain")
 @json_response()
 def analyze_maxit_model(model: int):
-    return services.run_cif_adapter(
-        maxit.analyze,
-        request.data.decode("utf-8"),
-        model,
-    )
+    return run_adapter("maxit", model)
 
 
 @server.route("/maxit", methods=["POST"])
 def analyze_maxit():
     return analyze_maxit_model(1)
+
+
+# Batch routes (many models of one structure in a single request)
+
+
+def parse_models(models: str) -> Optional[List[int]]:
+    if models == "all":
+        return None
+    try:
+        return list(dict.fromkeys(int(model) for model in models.split(",")))
+    except ValueError as exception:
+        raise BadRequest(
+            "Parameter models must be 'all' or a comma-separated list of numbers"
+        ) from exception
+
+
+@server.route("/<tool>/models", methods=["POST"])
+@content_type("text/plain")
+@json_response()
+def analyze_models(tool: str):
+    runner, analyze = get_adapter(tool)
+    return services.run_batch_adapter(
+        runner,
+        analyze,
+        request.data.decode("utf-8"),
+        parse_models(request.args.get("models", "all")),
+        request_categories(),
+    )
+
+
+def parse_tools(tools: str) -> List[str]:
+    if tools == "all":
+        return list(ADAPTERS)
+    selected = list(dict.fromkeys(tool.strip() for tool in tools.split(",")))
+    unknown = [tool for tool in selected if tool not in ADAPTERS]
+    if unknown:
+        raise BadRequest(f"Unknown analysis tools: {', '.join(unknown)}")
+    return selected
+
+
+# Multi-tool routes (many tools for one structure in a single request)
+
+
+@server.route("/tools/<int:model>", methods=["POST"])
+@content_type("text/plain")
+@json_response()
+def analyze_tools_model(model: int):
+    return services.run_multi_adapter(
+        {
+            tool: get_adapter(tool)
+            for tool in parse_tools(request.args.get("tools", "all"))
+        },
+        request.data.decode("utf-8"),
+        model,
+        request_categories(),
+    )
+
+
+@server.route("/tools", methods=["POST"])
+def analyze_tools():
+    return analyze_tools_model(1)
+
+
+# Asynchronous job routes (submit, poll status, fetch result)
+
+
+def job_status(job_id: str) -> Dict[str, Any]:
+    status = jobs.store.status(job_id)
+    if status is None:
+        raise NotFound(f"Unknown job: {job_id}")
+    status.pop("pid", None)
+    return status
+
+
+@server.route("/jobs/<tool>/<int:model>", methods=["POST"])
+@content_type("text/plain")
+@json_response(HTTPStatus.ACCEPTED)
+def submit_job_model(tool: str, model: int):
+    get_adapter(tool)
+    return jobs.submit(tool, request.data.decode("utf-8"), model, request_categories())
+
+
+@server.route("/jobs/<tool>", methods=["POST"])
+def submit_job(tool: str):
+    return submit_job_model(tool, 1)
+
+
+@server.route("/jobs/<job_id>", methods=["GET"])
+@json_response()
+def get_job(job_id: str):
+    return job_status(job_id)
+
+
+@server.route("/jobs/<job_id>/result", methods=["GET"])
+def get_job_result(job_id: str):
+    status = job_status(job_id)
+    if status["status"] != jobs.DONE:
+        description = f"Job is {status['status']}"
+        if "error" in status:
+            description += f" ({status['error']})"
+        raise Conflict(description)
+    return Response(
+        response=jobs.store.result(job_id),
+        status=HTTPStatus.OK,
+        mimetype="application/json",
+    )
@@ -3,23 +3,32 @@
 from __future__ import annotations
 
 from flask import Blueprint, request
+from werkzeug.utils import import_string
 
 from adapters.services import run_multi_visualization_adapter, run_visualization_adapter
 from adapters.tools.utils import content_type, svg_response
-from adapters.visualization.pseudoviewer import PseudoViewerDrawer
-from adapters.visualization.rchie import RChieDrawer
-from adapters.visualization.rnapuzzler import RNAPuzzlerDrawer
-from adapters.visualization.weblogo_ import WeblogoDrawer
 
 server = Blueprint("visualization", __name__)
 
+# Drawer modules are imported on first use, some of them take long to import
+DRAWERS = {
+    "pseudoviewer": "adapters.visualization.pseudoviewer:PseudoViewerDrawer",
+    "rchie": "adapters.visualization.rchie:RChieDrawer",
+    "rnapuzzler": "adapters.visualization.rnapuzzler:RNAPuzzlerDrawer",
+    "weblogo": "adapters.visualization.weblogo_:WeblogoDrawer",
+}
+
+
+def get_drawer(name: str):
+    return import_string(DRAWERS[name])()
+
 
 @server.route("/weblogo", methods=["POST"])
 @content_type("application/json")
 @svg_response()
 def visualize_weblogo():
     return run_multi_visualization_adapter(
-        WeblogoDrawer(),
+        get_drawer("weblogo"),
         request.data,
     )
 
@@ -29,7 +38,7 @@ def visualize_weblogo():
 @svg_response()
 def visualize_rchie():
     return run_visualization_adapter(
-        RChieDrawer(),
+        get_drawer("rchie"),
         request.data,
     )
 
@@ -39,7 +48,7 @@ def visualize_rchie():
 @svg_response()
 def visualize_pseudoviewer():
     return run_visualization_adapter(
-        PseudoViewerDrawer(),
+        get_drawer("pseudoviewer"),
         request.data,
     )
 
@@ -49,6 +58,6 @@ def visualize_pseudoviewer():
 @svg_response()
 def visualize_rnapuzzler():
     return run_visualization_adapter(
-        RNAPuzzlerDrawer(),
+        get_drawer("rnapuzzler"),
         request.data,
     )
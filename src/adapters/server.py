@@ -5,14 +5,20 @@ import logging
 import subprocess
 
 import orjson
-from flask import Flask, Response, request
+from flask import Flask, Response, g, request
 from werkzeug.exceptions import HTTPException
+from werkzeug.utils import import_string
 
 from adapters.cache import cache
 from adapters.config import config
+from adapters.exceptions import ToolBusyError
+from adapters.routes.analysis import ADAPTERS
 from adapters.routes.analysis import server as analysis
 from adapters.routes.conversion import server as conversion
+from adapters.routes.visualization import DRAWERS
 from adapters.routes.visualization import server as visualization
+from adapters.tools.tracing import trace
+from adapters.tools.workspace import Workspace
 
 app = Flask(__name__)
 app.config.from_mapping(config)
@@ -20,21 +26,33 @@ app.config.from_mapping(config)
 logger = logging.getLogger(__name__)
 
 
+@app.before_request
+def open_workspace():
+    g.workspace = Workspace().open()
+
+
+@app.teardown_request
+def close_workspace(_):
+    if "workspace" in g:
+        g.pop("workspace").close()
+
+
 @analysis.before_request
 @conversion.before_request
 def log_plain_request():
     logger.info(f"Request (text/plain) received, path: {request.path}")
-    logger.debug(request.data.decode("utf-8"))
+    trace(logger, "Request body", lambda: request.get_data(as_text=True))
 
 
 @visualization.before_request
 def log_json_request():
     logger.info(f"Request (application/json) received, path: {request.path}")
-    logger.debug(orjson.loads(request.data))
+    trace(logger, "Request body", lambda: request.get_data(as_text=True))
 
 
 @app.errorhandler(Exception)
 def handle_exception(exception: Exception):
+    headers = {}
     if isinstance(exception, HTTPException):
         name = exception.name
         code = exception.code
@@ -46,6 +64,12 @@ def handle_exception(exception: Exception):
         logger.warning(
             f"Subprocess timeout for {exception.cmd} after {exception.timeout}s"
         )
+    elif isinstance(exception, ToolBusyError):
+        name = "Too Many Requests"
+        code = 429
+        description = str(exception)
+        headers["Retry-After"] = str(config["TOOL_QUEUE_TIMEOUT"])
+        logger.warning(description)
     else:
         code = 500
         name = "Internal Server Error"
@@ -65,10 +89,25 @@ def handle_exception(exception: Exception):
     return Response(
         response=orjson.dumps(result).decode("utf-8"),
         status=code,
+        headers=headers,
         mimetype="application/json",
     )
 
 
+def preload():
+    """Import all adapters and drawers, which otherwise are imported on first use.
+    With `gunicorn --preload` it is done once in the master process and
+    workers forked from it start with everything imported."""
+    for _, analyze in ADAPTERS.values():
+        import_string(analyze)
+    for drawer in DRAWERS.values():
+        import_string(drawer)
+    logger.info("Adapters preloaded")
+
+
+if config["PRELOAD"]:
+    preload()
+
 cache.init_app(app)
 app.register_blueprint(analysis, url_prefix="/analysis-api/v1")
 app.register_blueprint(conversion, url_prefix="/conversion-api/v1")
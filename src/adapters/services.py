@@ -1,45 +1,148 @@
 import logging
-from typing import Callable
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import orjson
 from rnapolis.common import BaseInteractions
+from werkzeug.utils import import_string
 
+from adapters.cache import cached, cached_artifact, digest, store_artifact
+from adapters.config import config
 from adapters.tools import cif_filter, output_filter, pdb_filter, visualization_utils
+from adapters.tools.structure import Structure
+from adapters.tools.workspace import current_path
 from adapters.visualization.model import Model2D, ModelMulti2D
 
+Categories = Optional[Tuple[str, ...]]
 
-def run_cif_adapter(
-    analyze: Callable[..., BaseInteractions], data: str, model: int
-) -> BaseInteractions:
-    cif_content = cif_filter.apply(
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+
+def result_cache_key(
+    analyze: Callable[..., BaseInteractions],
+    data: str,
+    model: int,
+    categories: Categories = None,
+) -> str:
+    adapter = analyze.__module__.rsplit(".", maxsplit=1)[-1].rstrip("_")
+    version = config["RESULT_CACHE_VERSION"]
+    if categories is not None:
+        adapter = f"{adapter}:{'+'.join(categories)}"
+    return f"result:{adapter}:{version}:{model}:{digest(data)}"
+
+
+def cached_result(function):
+    """Decorate an adapter runner to cache its final result.
+    The key is built from input digest, adapter name, model number, selected
+    categories and `RESULT_CACHE_VERSION` (bump it when a tool or an adapter
+    changes). Identical concurrent requests are analyzed only once."""
+
+    @wraps(function)
+    def _cached_result(
+        analyze: Callable[..., BaseInteractions],
+        data: str,
+        model: int,
+        categories: Categories = None,
+    ) -> BaseInteractions:
+        return cached(
+            result_cache_key(analyze, data, model, categories),
+            lambda: function(analyze, data, model, categories),
+        )
+
+    return _cached_result
+
+
+def prepare_structure(data: str) -> Structure:
+    """Normalized structure with all models, shared by all models and adapters
+    (cached artifact)"""
+    return cached_artifact("normalized", data, None, lambda: cif_filter.normalize(data))
+
+
+def prepare_cif(data: str, model: int) -> Structure:
+    """Filtered single-model structure, shared by all adapters (cached artifact)"""
+    return cached_artifact(
+        "structure",
         data,
-        [
-            (cif_filter.leave_single_model, {"model": model}),
-            (cif_filter.fix_occupancy, {}),
-        ],
+        model,
+        lambda: cif_filter.apply_filters(
+            prepare_structure(data),
+            [
+                (cif_filter.leave_single_model, {"model": model}),
+                (cif_filter.fix_occupancy, {}),
+            ],
+        ),
     )
 
-    analysis_output = analyze(cif_content, model=model)
+
+def prepare_pdb(data: str, model: int) -> Optional[Tuple[str, Dict[str, str]]]:
+    """PDB with chain mapping derived from `prepare_cif()` (cached artifact)"""
+    return cached_artifact(
+        "pdb",
+        data,
+        model,
+        lambda: pdb_filter.from_structure(prepare_cif(data, model)),
+    )
+
+
+def prepare_parsed(
+    parse: Callable[[Structure], Dict[int, Any]], data: str, model: int
+) -> Optional[Any]:
+    """Input read by the adapter's own `parse()`, which is called once for all
+    models; each model is then stored as a separate cached artifact"""
+    name = f"parsed-{parse.__module__.rsplit('.', maxsplit=1)[-1].rstrip('_')}"
+
+    def parse_all() -> Dict[int, Any]:
+        return parse(
+            cif_filter.apply_filters(
+                prepare_structure(data), [(cif_filter.fix_occupancy, {})]
+            )
+        )
+
+    def parse_models() -> List[int]:
+        models = parse_all()
+        for number, parsed in models.items():
+            store_artifact(name, data, number, parsed)
+        return list(models)
+
+    cached(f"{name}:models:{digest(data)}", parse_models)
+    # computed again only if the artifact has been evicted in the meantime
+    return cached_artifact(name, data, model, lambda: parse_all().get(model))
+
+
+@cached_result
+def run_cif_adapter(
+    analyze: Callable[..., BaseInteractions],
+    data: str,
+    model: int,
+    categories: Categories = None,
+) -> BaseInteractions:
+    cif_content = prepare_cif(data, model).to_cif()
+    analysis_output = analyze(cif_content, model=model, categories=categories)
 
     return output_filter.apply(
         analysis_output,
         [
+            (output_filter.select_categories, {"categories": categories}),
             (output_filter.remove_duplicate_pairs, {}),
             (output_filter.sort_interactions_lists, {}),
         ],
     )
 
 
+@cached_result
 def run_pdb_adapter(
-    analyze: Callable[..., BaseInteractions], data: str, model: int
+    analyze: Callable[..., BaseInteractions],
+    data: str,
+    model: int,
+    categories: Categories = None,
 ) -> BaseInteractions:
-    result = pdb_filter.apply(
-        data,
-        [
-            (cif_filter.leave_single_model, {"model": model}),
-            (cif_filter.fix_occupancy, {}),
-        ],
-    )
+    result = prepare_pdb(data, model)
 
     # If the result is None, it means that the input data is not representable as a valid PDB file
     if result is None:
@@ -49,11 +152,12 @@ def run_pdb_adapter(
         return BaseInteractions([], [], [], [], [])
 
     pdb_content, mapped_chains = result
-    analysis_output = analyze(pdb_content, model=model)
+    analysis_output = analyze(pdb_content, model=model, categories=categories)
 
     return output_filter.apply(
         analysis_output,
         [
+            (output_filter.select_categories, {"categories": categories}),
             (output_filter.remove_duplicate_pairs, {}),
             (output_filter.restore_chains, {"mapped_chains": mapped_chains}),
             (output_filter.sort_interactions_lists, {}),
@@ -61,6 +165,164 @@ def run_pdb_adapter(
     )
 
 
+@cached_result
+def run_structure_adapter(
+    analyze: Callable[..., BaseInteractions],
+    data: str,
+    model: int,
+    categories: Categories = None,
+) -> BaseInteractions:
+    """Run an adapter which works on parsed `Structure` (without serialization)"""
+    analysis_output = analyze(
+        prepare_cif(data, model), model=model, categories=categories
+    )
+
+    return output_filter.apply(
+        analysis_output,
+        [
+            (output_filter.select_categories, {"categories": categories}),
+            (output_filter.remove_duplicate_pairs, {}),
+            (output_filter.sort_interactions_lists, {}),
+        ],
+    )
+
+
+@cached_result
+def run_parsed_adapter(
+    analyze: Callable[..., BaseInteractions],
+    data: str,
+    model: int,
+    categories: Categories = None,
+) -> BaseInteractions:
+    """Run an adapter which parses the input with `parse()` defined next to
+    `analyze()` in its module and analyzes each model of the parsed input"""
+    parse = import_string(f"{analyze.__module__}:parse")
+    parsed = prepare_parsed(parse, data, model)
+    if parsed is None:
+        logging.info(f"Model {model} not found, returning empty 2D structure")
+        return BaseInteractions([], [], [], [], [])
+
+    analysis_output = analyze(parsed, model=model, categories=categories)
+
+    return output_filter.apply(
+        analysis_output,
+        [
+            (output_filter.select_categories, {"categories": categories}),
+            (output_filter.remove_duplicate_pairs, {}),
+            (output_filter.sort_interactions_lists, {}),
+        ],
+    )
+
+
+def run_batch_adapter(
+    runner: Callable[[Callable[..., BaseInteractions], str, int], BaseInteractions],
+    analyze: Callable[..., BaseInteractions],
+    data: str,
+    models: Optional[List[int]],
+    categories: Categories = None,
+) -> Dict[str, BaseInteractions]:
+    """Analyze many models of one structure.
+    The input is normalized once, analyses of models run in a process pool.
+
+    Args:
+        runner: `run_cif_adapter` or `run_pdb_adapter`
+        analyze: adapter function
+        data (str): content of the input file
+        models (Optional[List[int]]): models to analyze (None means all models)
+        categories (Optional[Tuple[str, ...]]): interaction categories (None means all)
+
+    Returns:
+        Dict[str, BaseInteractions]: results keyed by model number
+    """
+    structure = prepare_structure(data)
+    if models is None:
+        models = structure.models()
+
+    # workers find the normalized structure in the shared cache
+    return run_in_pool(
+        {str(model): (runner, analyze, data, model, categories) for model in models}
+    )
+
+
+def run_multi_adapter(
+    adapters: Dict[str, Tuple[Callable, Callable[..., BaseInteractions]]],
+    data: str,
+    model: int,
+    categories: Categories = None,
+) -> Dict[str, BaseInteractions]:
+    """Analyze one model of a structure with many tools.
+    The input is prepared once, tools run in a process pool.
+
+    Args:
+        adapters: `(runner, analyze)` pairs keyed by tool name
+        data (str): content of the input file
+        model (int): model to analyze
+        categories (Optional[Tuple[str, ...]]): interaction categories (None means all)
+
+    Returns:
+        Dict[str, BaseInteractions]: results keyed by tool name
+    """
+    # workers find the prepared structure in the shared cache
+    prepare_cif(data, model)
+    if any(runner is run_pdb_adapter for runner, _ in adapters.values()):
+        prepare_pdb(data, model)
+
+    return run_in_pool(
+        {
+            tool: (runner, analyze, data, model, categories)
+            for tool, (runner, analyze) in adapters.items()
+        }
+    )
+
+
+def executor() -> ProcessPoolExecutor:
+    """Batch executor of the current process, started on first use and reused
+    by later requests (forking a new pool for each request is expensive)"""
+    global _executor, _executor_pid  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(max_workers=config["BATCH_WORKERS"])
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def reset_executor():
+    """Drop a broken executor (e.g. one of its processes was killed)"""
+    global _executor  # pylint: disable=global-statement
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+
+
+def run_task(workspace: Optional[str], function: Callable, *args) -> Any:
+    """Run a pool task in the workspace of the request which submitted it,
+    pool processes outlive requests"""
+    token = current_path.set(workspace)
+    try:
+        return function(*args)
+    finally:
+        current_path.reset(token)
+
+
+def run_in_pool(tasks: Dict[str, Tuple]) -> Dict[str, Any]:
+    """Run `(function, *args)` tasks in the pool of at most `BATCH_WORKERS`
+    processes (or in this process if there is only one worker)"""
+    if min(len(tasks), config["BATCH_WORKERS"]) <= 1:
+        return {key: function(*args) for key, (function, *args) in tasks.items()}
+
+    workspace = current_path.get()
+    try:
+        futures = {
+            key: executor().submit(run_task, workspace, *task)
+            for key, task in tasks.items()
+        }
+        return {key: future.result() for key, future in futures.items()}
+    except BrokenProcessPool:
+        reset_executor()
+        raise
+
+
 def run_visualization_adapter(adapter, data: bytes) -> str:
     model = Model2D.from_dict(orjson.loads(data))
     model_with_unique_strands = visualization_utils.ensure_unique_strands(model)
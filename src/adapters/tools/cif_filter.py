@@ -1,15 +1,23 @@
-from tempfile import NamedTemporaryFile, _TemporaryFileWrapper
-from typing import Any, Callable, Dict, Iterable, List, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Tuple
 
-import mmcif.io
 from rnapolis.molecule_filter import filter_by_poly_types
 
-from adapters.tools import maxit
+from adapters.tools import converter, maxit
+from adapters.tools.structure import Structure
 
+if TYPE_CHECKING:
+    import pandas as pd
 
-def apply(file_content: str, functions_args: Iterable[Tuple[Callable, Dict]]) -> str:
+
+def apply(
+    file_content: str, functions_args: Iterable[Tuple[Callable, Dict]]
+) -> Structure:
+    return apply_filters(normalize(file_content), functions_args)
+
+
+def normalize(file_content: str) -> Structure:
     # ensure the format is mmCIF
-    cif_content = maxit.ensure_cif(file_content)
+    cif_content = converter.ensure_cif(file_content)
 
     # filter to leave only DNA, RNA and hybrids
     cif_content = filter_by_poly_types(
@@ -22,68 +30,43 @@ def apply(file_content: str, functions_args: Iterable[Tuple[Callable, Dict]]) ->
         ["chem_comp"],
     )
 
-    # apply all filtering functions
-    with NamedTemporaryFile("w+", suffix=".cif") as cif_file:
-        data = begin(cif_file, cif_content)
-
-        for function, kwargs in functions_args:
-            function(data, **kwargs)
-
-        cif_content = end(cif_file, data)
+    # parse normalized mmCIF once, it is independent of the analyzed model
+    return Structure.from_cif(maxit.ensure_mmcif(cif_content))
 
-    return cif_content
 
+def apply_filters(
+    structure: Structure, functions_args: Iterable[Tuple[Callable, Dict]]
+) -> Structure:
+    # apply all filtering functions on atom_site table
+    table = structure.atom_site_table()
 
-def begin(cif: _TemporaryFileWrapper, file_content: str) -> List[Any]:
-    cif.write(maxit.ensure_mmcif(file_content))
-    cif.flush()
-    cif.seek(0)
-    return mmcif.io.IoAdapter().readFile(cif.name)
-
+    if table is not None:
+        for function, kwargs in functions_args:
+            table = function(table, **kwargs)
+        structure.set_atom_site_table(table)
 
-def end(cif: _TemporaryFileWrapper, data: List[Any]) -> str:
-    cif.seek(0)
-    cif.truncate(0)
-    mmcif.io.IoAdapter().writeFile(cif.name, data)
-    cif.flush()
-    cif.seek(0)
-    return cif.read()
+    return structure
 
 
 # Leave only one specified model in the file and sets its number to 1.
 # Some tools like BPNET work only with model number 1.
-def leave_single_model(data: List, **kwargs):
-    model = kwargs.get("model", 1)
+def leave_single_model(table: "pd.DataFrame", **kwargs) -> "pd.DataFrame":
+    import pandas as pd  # pylint: disable=import-outside-toplevel
 
-    if len(data) > 0:
-        atom_site = data[0].getObj("atom_site")
-
-        if atom_site:
-            pdbx_PDB_model_num = atom_site.getAttributeIndex("pdbx_PDB_model_num")
+    model = kwargs.get("model", 1)
 
-            if pdbx_PDB_model_num != -1:
-                toremove = []
+    if "pdbx_PDB_model_num" not in table.columns:
+        return table
 
-                for i, row in enumerate(atom_site.getRowList()):
-                    if int(row[pdbx_PDB_model_num]) != model:
-                        toremove.append(i)
-                    else:
-                        row[pdbx_PDB_model_num] = "1"
-                for i in reversed(toremove):
-                    del atom_site.getRowList()[i]
+    models = pd.to_numeric(table["pdbx_PDB_model_num"], errors="coerce")
+    return table.loc[models == model].assign(pdbx_PDB_model_num="1")
 
 
 # Modify occupancy column so that it always parses to a float
-def fix_occupancy(data: List, *_):
-    if len(data) > 0:
-        atom_site = data[0].getObj("atom_site")
-
-        if atom_site:
-            occupancy = atom_site.getAttributeIndex("occupancy")
-
-            if occupancy != -1:
-                for row in atom_site.getRowList():
-                    try:
-                        float(row[occupancy])
-                    except (KeyError, ValueError):
-                        row[occupancy] = "1.0"
+def fix_occupancy(table: "pd.DataFrame", *_) -> "pd.DataFrame":
+    import pandas as pd  # pylint: disable=import-outside-toplevel
+
+    if "occupancy" in table.columns:
+        invalid = pd.to_numeric(table["occupancy"], errors="coerce").isna()
+        table.loc[invalid, "occupancy"] = "1.0"
+    return table
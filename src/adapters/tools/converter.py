@@ -0,0 +1,422 @@
+#! /usr/bin/env python
+import logging
+import string
+from io import StringIO
+from itertools import product
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from mmcif.api.DataCategory import DataCategory
+from mmcif.api.PdbxContainers import DataContainer
+from mmcif.io.PdbxReader import PdbxReader
+from mmcif.io.PdbxWriter import PdbxWriter
+
+from adapters.tools import maxit
+from adapters.tools.utils import is_cif
+
+logger = logging.getLogger(__name__)
+
+ATOM_SITE_REQUIRED = (
+    "group_PDB",
+    "auth_atom_id",
+    "auth_comp_id",
+    "auth_asym_id",
+    "auth_seq_id",
+    "Cartn_x",
+    "Cartn_y",
+    "Cartn_z",
+)
+
+ATOM_SITE_ATTRIBUTES = (
+    "group_PDB",
+    "id",
+    "type_symbol",
+    "label_atom_id",
+    "label_alt_id",
+    "label_comp_id",
+    "label_asym_id",
+    "label_entity_id",
+    "label_seq_id",
+    "pdbx_PDB_ins_code",
+    "Cartn_x",
+    "Cartn_y",
+    "Cartn_z",
+    "occupancy",
+    "B_iso_or_equiv",
+    "pdbx_formal_charge",
+    "auth_seq_id",
+    "auth_comp_id",
+    "auth_asym_id",
+    "auth_atom_id",
+    "pdbx_PDB_model_num",
+)
+
+RIBONUCLEOTIDES = {"A", "C", "G", "U", "I", "N"}
+DEOXYRIBONUCLEOTIDES = {"DA", "DC", "DG", "DT", "DU", "DI", "DN"}
+AMINO_ACIDS = {
+    "ALA",
+    "ARG",
+    "ASN",
+    "ASP",
+    "CYS",
+    "GLN",
+    "GLU",
+    "GLY",
+    "HIS",
+    "ILE",
+    "LEU",
+    "LYS",
+    "MET",
+    "PHE",
+    "PRO",
+    "SER",
+    "THR",
+    "TRP",
+    "TYR",
+    "VAL",
+    "UNK",
+}
+WATERS = {"HOH", "WAT", "DOD"}
+
+# records which are only understood by a complete PDB -> mmCIF annotation
+ANNOTATED_RECORDS = ("SEQRES", "MODRES", "HETNAM", "LINK  ", "SSBOND")
+
+
+def ensure_cif(file_content: str) -> str:
+    if is_cif(file_content):
+        return file_content
+    cif_content = pdb2cif(file_content)
+    if cif_content is None:
+        logger.debug("Native PDB to mmCIF conversion not possible, using MAXIT")
+        return maxit.pdb2cif(file_content)
+    return cif_content
+
+
+def ensure_pdb(file_content: str) -> str:
+    if not is_cif(file_content):
+        return file_content
+    pdb_content = cif2pdb(file_content)
+    if pdb_content is None:
+        logger.debug("Native mmCIF to PDB conversion not possible, using MAXIT")
+        return maxit.cif2pdb(file_content)
+    return pdb_content
+
+
+def cif2pdb(cif_content: str) -> Optional[str]:
+    """Convert coordinates from mmCIF to PDB format without running MAXIT
+
+    Args:
+        cif_content (str): content of mmCIF file
+
+    Returns:
+        Optional[str]: content of PDB file or None if data cannot be represented
+    """
+
+    data: List[DataContainer] = []
+    PdbxReader(StringIO(cif_content)).read(data)
+
+    if len(data) == 0:
+        return None
+    return write_pdb(data[0].getObj("atom_site"))
+
+
+def write_pdb(atom_site: Optional[DataCategory]) -> Optional[str]:
+    """Write PDB coordinate records from already parsed `atom_site` category
+
+    Args:
+        atom_site (Optional[DataCategory]): parsed `atom_site` category
+
+    Returns:
+        Optional[str]: content of PDB file or None if data cannot be represented
+    """
+
+    if atom_site is None:
+        return None
+
+    attributes = atom_site.getAttributeList()
+    if any(name not in attributes for name in ATOM_SITE_REQUIRED):
+        return None
+
+    rows = [
+        {
+            name: value if value not in ("?", ".") else ""
+            for name, value in zip(attributes, row)
+        }
+        for row in atom_site.getRowList()
+    ]
+    models = list(dict.fromkeys(row.get("pdbx_PDB_model_num", "1") for row in rows))
+
+    lines = []
+    serial = 0
+
+    for model in models:
+        if len(models) > 1:
+            lines.append(f"MODEL     {model:>4}".ljust(80))
+
+        atoms = [row for row in rows if row.get("pdbx_PDB_model_num", "1") == model]
+        for i, row in enumerate(atoms):
+            serial += 1
+            line = format_atom(row, serial)
+            if line is None:
+                return None
+            lines.append(line)
+
+            if row["group_PDB"] == "ATOM" and (
+                i + 1 == len(atoms)
+                or atoms[i + 1]["group_PDB"] != "ATOM"
+                or atoms[i + 1]["auth_asym_id"] != row["auth_asym_id"]
+            ):
+                serial += 1
+                lines.append(format_ter(row, serial))
+
+        if len(models) > 1:
+            lines.append("ENDMDL".ljust(80))
+
+    if serial > 99999:
+        return None
+
+    lines.append("END".ljust(80))
+    return "\n".join(lines) + "\n"
+
+
+def format_atom(row: Dict[str, str], serial: int) -> Optional[str]:
+    name = row["auth_atom_id"]
+    residue = row["auth_comp_id"]
+    chain = row["auth_asym_id"]
+    element = row.get("type_symbol", "")
+    charge = row.get("pdbx_formal_charge", "")
+
+    if len(name) > 4 or len(residue) > 3 or len(chain) != 1 or len(element) > 2:
+        return None
+
+    try:
+        number = int(row["auth_seq_id"])
+        coordinates = "".join(
+            f"{float(row[key]):8.3f}" for key in ("Cartn_x", "Cartn_y", "Cartn_z")
+        )
+        occupancy = f"{float(row.get('occupancy') or 1.0):6.2f}"
+        temperature = f"{float(row.get('B_iso_or_equiv') or 0.0):6.2f}"
+        formal_charge = int(charge) if charge else 0
+    except ValueError:
+        return None
+
+    if (
+        not -999 <= number <= 9999
+        or len(coordinates) > 24
+        or len(occupancy) > 6
+        or len(temperature) > 6
+    ):
+        return None
+
+    charge = f"{abs(formal_charge)}{'-' if formal_charge < 0 else '+'}"
+    if formal_charge == 0:
+        charge = ""
+
+    # atom names start in column 13 only for two-letter elements or 4 characters
+    if len(name) < 4 and not (len(element) == 2 and name.startswith(element)):
+        name = f" {name}"
+
+    return (
+        f"{row['group_PDB']:<6}{serial:>5} {name:<4}{row.get('label_alt_id', ''):1}"
+        f"{residue:>3} {chain}{number:>4}{row.get('pdbx_PDB_ins_code', ''):1}   "
+        f"{coordinates}{occupancy}{temperature}          {element:>2}{charge:2}"
+    )
+
+
+def format_ter(row: Dict[str, str], serial: int) -> str:
+    return (
+        f"TER   {serial:>5}      {row['auth_comp_id']:>3} {row['auth_asym_id']}"
+        f"{int(row['auth_seq_id']):>4}{row.get('pdbx_PDB_ins_code', ''):1}"
+    ).ljust(80)
+
+
+def pdb2cif(pdb_content: str) -> Optional[str]:
+    """Convert coordinates from PDB to mmCIF format without running MAXIT
+
+    Only files with standard residues and no sequence or modification records
+    are handled, because everything else requires full annotation.
+
+    Args:
+        pdb_content (str): content of PDB file
+
+    Returns:
+        Optional[str]: content of mmCIF file or None if annotation is required
+    """
+
+    atoms = []
+    model = "1"
+
+    for line in pdb_content.splitlines():
+        if line.startswith(ANNOTATED_RECORDS):
+            return None
+        if line.startswith("MODEL "):
+            model = line[10:14].strip() or model
+        elif line.startswith(("ATOM  ", "HETATM")):
+            atom = parse_atom(line, model)
+            if atom is None:
+                return None
+            atoms.append(atom)
+
+    if len(atoms) == 0:
+        return None
+
+    polymers = classify_polymers(atoms)
+    if polymers is None:
+        return None
+    return write_cif(atoms, polymers)
+
+
+def write_cif(atoms: List[Dict], polymers: Dict[str, str]) -> str:
+    waters = list(
+        dict.fromkeys(atom["chain"] for atom in atoms if atom["residue"] in WATERS)
+    )
+
+    # assign label_asym_id and label_entity_id: polymers first, then waters
+    asym_ids = dict(
+        zip(
+            [(chain, False) for chain in polymers]
+            + [(chain, True) for chain in waters],
+            asym_id_generator(),
+        )
+    )
+
+    entity_ids = {chain: str(i) for i, chain in enumerate(polymers, 1)}
+    water_entity_id = str(len(polymers) + 1)
+
+    container = DataContainer("converted")
+
+    entity = DataCategory("entity", ["id", "type"])
+    for chain in polymers:
+        entity.append([entity_ids[chain], "polymer"])
+    if waters:
+        entity.append([water_entity_id, "water"])
+    container.append(entity)
+
+    entity_poly = DataCategory("entity_poly", ["entity_id", "type", "pdbx_strand_id"])
+    for chain, polymer_type in polymers.items():
+        entity_poly.append([entity_ids[chain], polymer_type, chain])
+    container.append(entity_poly)
+
+    struct_asym = DataCategory("struct_asym", ["id", "entity_id"])
+    for (chain, is_water), asym_id in asym_ids.items():
+        struct_asym.append(
+            [asym_id, water_entity_id if is_water else entity_ids[chain]]
+        )
+    container.append(struct_asym)
+
+    container.append(build_atom_site(atoms, asym_ids, entity_ids, water_entity_id))
+
+    output = StringIO()
+    PdbxWriter(output).write([container])
+    return output.getvalue()
+
+
+def build_atom_site(
+    atoms: List[Dict],
+    asym_ids: Dict[Tuple[str, bool], str],
+    entity_ids: Dict[str, str],
+    water_entity_id: str,
+) -> DataCategory:
+    # label_seq_id numbering is derived from the first occurrence of each residue
+    seq_ids: Dict[Tuple[str, int, str], int] = {}
+    last_seq_ids: Dict[str, int] = {}
+    for atom in atoms:
+        key = (atom["chain"], atom["number"], atom["icode"])
+        if atom["residue"] not in WATERS and key not in seq_ids:
+            last_seq_ids[atom["chain"]] = last_seq_ids.get(atom["chain"], 0) + 1
+            seq_ids[key] = last_seq_ids[atom["chain"]]
+
+    atom_site = DataCategory("atom_site", list(ATOM_SITE_ATTRIBUTES))
+    for serial, atom in enumerate(atoms, 1):
+        is_water = atom["residue"] in WATERS
+        key = (atom["chain"], atom["number"], atom["icode"])
+        atom_site.append(
+            [
+                atom["group"],
+                str(serial),
+                atom["element"],
+                atom["name"],
+                atom["alt"] or ".",
+                atom["residue"],
+                asym_ids[(atom["chain"], is_water)],
+                water_entity_id if is_water else entity_ids[atom["chain"]],
+                "." if is_water else str(seq_ids[key]),
+                atom["icode"] or "?",
+                atom["x"],
+                atom["y"],
+                atom["z"],
+                atom["occupancy"],
+                atom["temperature"],
+                atom["charge"] or "?",
+                str(atom["number"]),
+                atom["residue"],
+                atom["chain"],
+                atom["name"],
+                atom["model"],
+            ]
+        )
+    return atom_site
+
+
+def parse_atom(line: str, model: str) -> Optional[Dict]:
+    line = line.ljust(80)
+    residue = line[17:20].strip()
+    chain = line[21].strip()
+    element = line[76:78].strip()
+    charge = line[78:80].strip()
+
+    if (
+        not chain
+        or not element
+        or residue not in RIBONUCLEOTIDES | DEOXYRIBONUCLEOTIDES | AMINO_ACIDS | WATERS
+    ):
+        return None
+
+    try:
+        return {
+            "group": line[0:6].strip(),
+            "name": line[12:16].strip(),
+            "alt": line[16].strip(),
+            "residue": residue,
+            "chain": chain,
+            "number": int(line[22:26]),
+            "icode": line[26].strip(),
+            "x": f"{float(line[30:38]):.3f}",
+            "y": f"{float(line[38:46]):.3f}",
+            "z": f"{float(line[46:54]):.3f}",
+            "occupancy": f"{float(line[54:60].strip() or 1.0):.2f}",
+            "temperature": f"{float(line[60:66].strip() or 0.0):.2f}",
+            "element": element,
+            "charge": (
+                f"{'-' if charge.endswith('-') else ''}{charge[:-1]}" if charge else ""
+            ),
+            "model": model,
+        }
+    except ValueError:
+        return None
+
+
+def classify_polymers(atoms: List[Dict]) -> Optional[Dict[str, str]]:
+    residues: Dict[str, set] = {}
+    for atom in atoms:
+        if atom["residue"] not in WATERS:
+            residues.setdefault(atom["chain"], set()).add(atom["residue"])
+
+    polymers = {}
+    for chain, names in residues.items():
+        if names <= RIBONUCLEOTIDES:
+            polymers[chain] = "polyribonucleotide"
+        elif names <= DEOXYRIBONUCLEOTIDES:
+            polymers[chain] = "polydeoxyribonucleotide"
+        elif names <= RIBONUCLEOTIDES | DEOXYRIBONUCLEOTIDES:
+            polymers[chain] = "polydeoxyribonucleotide/polyribonucleotide hybrid"
+        elif names <= AMINO_ACIDS:
+            polymers[chain] = "polypeptide(L)"
+        else:
+            return None
+    return polymers
+
+
+def asym_id_generator() -> Iterator[str]:
+    for length in range(1, 4):
+        for letters in product(string.ascii_uppercase, repeat=length):
+            yield "".join(reversed(letters))
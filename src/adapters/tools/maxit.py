@@ -1,9 +1,10 @@
 #! /usr/bin/env python
+import os
 import sys
-from tempfile import NamedTemporaryFile, TemporaryDirectory
 
-from adapters.cache import cache
+from adapters.cache import memoize_compressed
 from adapters.tools.utils import is_cif, run_external_cmd
+from adapters.tools.workspace import materialize, temporary_directory
 
 # constants defined by MAXIT
 MODE_PDB2CIF = "1"
@@ -27,79 +28,33 @@ def ensure_mmcif(file_content: str) -> str:
     return cif2mmcif(ensure_cif(file_content))
 
 
-@cache.memoize()
+@memoize_compressed("pdb2cif")
 def pdb2cif(pdb_content):
-    with TemporaryDirectory() as directory:
-        with NamedTemporaryFile("w+", suffix=".pdb", dir=directory) as pdb:
-            with NamedTemporaryFile("w+", suffix=".cif", dir=directory) as cif:
-                pdb.write(pdb_content)
-                pdb.seek(0)
-                run_external_cmd(
-                    [
-                        "maxit",
-                        "-input",
-                        pdb.name,
-                        "-output",
-                        cif.name,
-                        "-o",
-                        MODE_PDB2CIF,
-                    ],
-                    cwd=directory,
-                )
-                cif.seek(0)
-                cif_content = cif.read()
-
-    return cif_content
-
-
-@cache.memoize()
+    return run_maxit(pdb_content, "input.pdb", "output.cif", MODE_PDB2CIF)
+
+
+@memoize_compressed("cif2pdb")
 def cif2pdb(cif_content):
-    with TemporaryDirectory() as directory:
-        with NamedTemporaryFile("w+", suffix=".cif", dir=directory) as cif:
-            with NamedTemporaryFile("w+", suffix=".pdb", dir=directory) as pdb:
-                cif.write(cif_content)
-                cif.seek(0)
-                run_external_cmd(
-                    [
-                        "maxit",
-                        "-input",
-                        cif.name,
-                        "-output",
-                        pdb.name,
-                        "-o",
-                        MODE_CIF2PDB,
-                    ],
-                    cwd=directory,
-                )
-                pdb.seek(0)
-                pdb_content = pdb.read()
-
-    return pdb_content
-
-
-@cache.memoize()
+    return run_maxit(cif_content, "input.cif", "output.pdb", MODE_CIF2PDB)
+
+
+@memoize_compressed("cif2mmcif")
 def cif2mmcif(cif_content: str) -> str:
-    with TemporaryDirectory() as directory:
-        with NamedTemporaryFile("w+", suffix=".cif", dir=directory) as cif:
-            with NamedTemporaryFile("w+", suffix=".cif", dir=directory) as mmcif:
-                cif.write(cif_content)
-                cif.seek(0)
-                run_external_cmd(
-                    [
-                        "maxit",
-                        "-input",
-                        cif.name,
-                        "-output",
-                        mmcif.name,
-                        "-o",
-                        MODE_CIF2MMCIF,
-                    ],
-                    cwd=directory,
-                )
-                mmcif.seek(0)
-                cif_content = mmcif.read()
-
-    return cif_content
+    return run_maxit(cif_content, "input.cif", "output.cif", MODE_CIF2MMCIF)
+
+
+def run_maxit(content: str, input_name: str, output_name: str, mode: str) -> str:
+    with temporary_directory() as directory:
+        input_path = materialize(content, directory, input_name, shared=True)
+        output_path = os.path.join(directory, output_name)
+        run_external_cmd(
+            ["maxit", "-input", input_path, "-output", output_path, "-o", mode],
+            cwd=directory,
+        )
+        if not os.path.exists(output_path):
+            return ""
+        with open(output_path, encoding="utf-8") as output:
+            return output.read()
 
 
 def main():
@@ -1,4 +1,4 @@
-from typing import Callable, Dict, Iterable, List, Tuple, Type, TypeVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Type, TypeVar
 
 from rnapolis.common import (
     BaseInteractions,
@@ -17,6 +17,15 @@ from rnapolis.common import (
 
 InteractionTypeT = TypeVar("InteractionTypeT", BasePair, Stacking, OtherInteraction)
 
+# Interaction categories (fields of BaseInteractions) in canonical order
+CATEGORIES = (
+    "basePairs",
+    "stackings",
+    "baseRiboseInteractions",
+    "basePhosphateInteractions",
+    "otherInteractions",
+)
+
 
 def apply(
     analysis_output: BaseInteractions, functions_args: Iterable[Tuple[Callable, Dict]]
@@ -33,6 +42,25 @@ def apply(
     }
 
 
+def requested(categories: Optional[Tuple[str, ...]], *names: str) -> bool:
+    """Check if any of given categories is selected (None means all)"""
+    return categories is None or any(name in categories for name in names)
+
+
+def select_categories(analysis_output: BaseInteractions, **kwargs) -> BaseInteractions:
+    """Leave only selected categories of interactions (None means all),
+    lists of other categories are empty"""
+    categories: Optional[Tuple[str, ...]] = kwargs.get("categories")
+    if categories is None:
+        return analysis_output
+    return BaseInteractions(
+        *(
+            getattr(analysis_output, category) if category in categories else []
+            for category in CATEGORIES
+        )
+    )
+
+
 def remove_duplicate_pairs(analysis_output: BaseInteractions, *_) -> BaseInteractions:
     stacking_topology_mapping = {
         StackingTopology.upward: StackingTopology.downward,
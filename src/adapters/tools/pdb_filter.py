@@ -1,12 +1,9 @@
 import string
-import tempfile
 from collections import defaultdict
 from typing import Callable, Dict, Iterable, Optional, Tuple
 
-from mmcif.io.IoAdapterPy import IoAdapterPy
-from rnapolis.transformer import replace_value
-
-from adapters.tools import cif_filter, maxit
+from adapters.tools import cif_filter
+from adapters.tools.structure import Structure
 
 
 class DefaultMapping(defaultdict):
@@ -18,32 +15,23 @@ def apply(
     file_content: str, functions_args: Iterable[Tuple[Callable, Dict]]
 ) -> Optional[Tuple[str, Dict[str, str]]]:
     # apply all filters on mmCIF representation
-    cif_content = cif_filter.apply(file_content, functions_args)
-
-    # check if the filtered data is PDB-compatible
-    adapter = IoAdapterPy()
+    return from_structure(cif_filter.apply(file_content, functions_args))
 
-    with tempfile.NamedTemporaryFile(mode="wt") as f:
-        f.write(cif_content)
-        f.seek(0)
-        data = adapter.readFile(f.name)
 
+def from_structure(structure: Structure) -> Optional[Tuple[str, Dict[str, str]]]:
     # no "atom_site" category -> not a PDB file
-    if len(data) == 0 or "atom_site" not in data[0].getObjNameList():
+    atom_site = structure.atom_site
+    if atom_site is None:
         return None
 
-    category_obj = data[0].getObj("atom_site")
-    attributes = category_obj.getAttributeList()
+    attributes = atom_site.getAttributeList()
 
     # no "auth_asym_id" column -> not a PDB file
     if "auth_asym_id" not in attributes:
         return None
 
-    used = set()
-
-    for row in category_obj.getRowList():
-        i = attributes.index("auth_asym_id")
-        used.add(row[i])
+    i = attributes.index("auth_asym_id")
+    used = {row[i] for row in atom_site.getRowList()}
 
     available_chain_names = (
         string.ascii_uppercase
@@ -57,14 +45,13 @@ def apply(
         return None
 
     # rename chains to printable, single characters
-    cif_content, mapping = replace_value(
-        cif_content,
-        "atom_site",
-        "auth_asym_id",
-        available_chain_names,
-    )
+    mapping: Dict[str, str] = {}
+    for row in atom_site.getRowList():
+        if row[i] not in mapping:
+            mapping[row[i]] = available_chain_names[len(mapping)]
+        row[i] = mapping[row[i]]
     mapping = {v: k for k, v in mapping.items()}
 
-    # convert back to PDB
-    pdb_content = maxit.ensure_pdb(cif_content)
+    # convert to PDB
+    pdb_content = structure.to_pdb()
     return pdb_content, mapping
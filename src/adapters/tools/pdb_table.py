@@ -0,0 +1,93 @@
+from typing import Tuple
+
+import numpy as np
+
+# Width of a PDB record, shorter lines are padded with spaces
+LINE_WIDTH = 80
+
+# Columns of ATOM and HETATM records (0-based, end exclusive)
+ATOM_NAME_COLUMNS = (12, 16)
+RESIDUE_NAME_COLUMNS = (17, 20)
+CHAIN_COLUMNS = (21, 22)
+NUMBER_COLUMNS = (22, 26)
+ICODE_COLUMNS = (26, 27)
+XYZ_COLUMNS = ((30, 38), (38, 46), (46, 54))
+
+
+class AtomTable:
+    """Columns of ATOM and HETATM records of a PDB file, one row per atom,
+    in order of the file. Text columns are stripped of whitespace.
+
+    Args:
+        pdb_content (str): content of the PDB file
+    """
+
+    def __init__(self, pdb_content: str):
+        lines = pdb_content.splitlines()
+        self.line_numbers = np.array(
+            [i for i, line in enumerate(lines) if line.startswith(("ATOM", "HETATM"))],
+            dtype=np.int64,
+        )
+        # PDB files are ASCII, replacing other characters keeps columns aligned
+        records = "".join(
+            lines[i].ljust(LINE_WIDTH)[:LINE_WIDTH] for i in self.line_numbers
+        ).encode("ascii", "replace")
+        chars = np.frombuffer(records, dtype="S1").reshape(-1, LINE_WIDTH)
+
+        self.atom_name = self.column(chars, ATOM_NAME_COLUMNS).astype(str)
+        self.residue_name = self.column(chars, RESIDUE_NAME_COLUMNS).astype(str)
+        self.chain = self.column(chars, CHAIN_COLUMNS).astype(str)
+        self.number = self.column(chars, NUMBER_COLUMNS).astype(np.int64)
+        self.icode = self.column(chars, ICODE_COLUMNS).astype(str)
+        self.xyz = np.column_stack(
+            [self.column(chars, columns).astype(np.float64) for columns in XYZ_COLUMNS]
+        ).reshape(-1, 3)
+
+        for array in vars(self).values():
+            array.setflags(write=False)
+
+    def __len__(self) -> int:
+        return len(self.line_numbers)
+
+    @staticmethod
+    def column(chars: np.ndarray, columns: Tuple[int, int]) -> np.ndarray:
+        start, end = columns
+        values = np.ascontiguousarray(chars[:, start:end]).view(f"S{end - start}")
+        return np.char.strip(values.reshape(-1))
+
+    def residues(self, by_name: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+        """Index residues by chain, number and insertion code (and residue name)
+        in order of their first appearance.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: index of the first atom of each residue
+                and index of the residue of each atom
+        """
+        keys = [self.chain, self.number.astype(str), self.icode]
+        if by_name:
+            keys.append(self.residue_name)
+        joined = keys[0]
+        for key in keys[1:]:
+            joined = np.char.add(np.char.add(joined, "\n"), key)
+
+        _, first, inverse = np.unique(joined, return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        return first[order], rank[inverse.reshape(-1)]
+
+    def last_atoms(self, residue: np.ndarray, atom_name: str) -> np.ndarray:
+        """Index of the last atom with given name in each residue (-1 if missing)
+
+        Args:
+            residue (np.ndarray): residue index of each atom (see `residues()`)
+            atom_name (str): name of the atom
+        """
+        count = residue.max() + 1 if len(residue) > 0 else 0
+        atoms = np.full(count, -1, dtype=np.int64)
+        # search from the end, so that later atoms (alternate locations) win
+        (selected,) = np.nonzero(self.atom_name[::-1] == atom_name)
+        selected = len(self) - 1 - selected
+        _, last = np.unique(residue[selected], return_index=True)
+        atoms[residue[selected[last]]] = selected[last]
+        return atoms
@@ -0,0 +1,124 @@
+import logging
+import math
+import os
+import resource
+import select
+import subprocess
+import time
+from typing import Dict, List, Optional
+
+import orjson
+
+from adapters.config import config
+
+logger = logging.getLogger(__name__)
+
+
+def limits_command(tool: str) -> List[str]:
+    """Prefix of a command which runs it with `TOOL_MEMORY_LIMITS` (RLIMIT_AS,
+    bytes) and `TOOL_CPU_LIMITS` (RLIMIT_CPU, seconds) of the tool. prlimit(1)
+    sets them before exec, so they are in force (and inherited by children of
+    the tool) from its first instruction. preexec_fn is not safe in threaded
+    servers."""
+    options = []
+    if tool in config["TOOL_MEMORY_LIMITS"]:
+        options.append(f"--as={config['TOOL_MEMORY_LIMITS'][tool]}")
+    if tool in config["TOOL_CPU_LIMITS"]:
+        options.append(f"--cpu={config['TOOL_CPU_LIMITS'][tool]}")
+    return ["prlimit", *options, "--"] if options else []
+
+
+def apply_limits(tool: str, pid: int, persistent: bool = False):
+    """Apply `TOOL_MEMORY_LIMITS` (RLIMIT_AS, bytes) and `TOOL_CPU_LIMITS`
+    (RLIMIT_CPU, seconds) of the tool to a started process with prlimit().
+
+    A `persistent` worker accumulates CPU time over many jobs, so it is called
+    before each job and only the soft CPU limit is moved to the CPU time used
+    so far plus the limit (the hard limit could not be raised again)."""
+    limits = {}
+    try:
+        if tool in config["TOOL_MEMORY_LIMITS"]:
+            value = config["TOOL_MEMORY_LIMITS"][tool]
+            limits[resource.RLIMIT_AS] = (value, value)
+        if tool in config["TOOL_CPU_LIMITS"]:
+            value = config["TOOL_CPU_LIMITS"][tool]
+            if persistent:
+                _, hard = resource.prlimit(pid, resource.RLIMIT_CPU)
+                value += cpu_time(pid)
+                if hard != resource.RLIM_INFINITY:
+                    value = min(value, hard)
+                limits[resource.RLIMIT_CPU] = (value, hard)
+            else:
+                limits[resource.RLIMIT_CPU] = (value, value)
+        for limit, values in limits.items():
+            resource.prlimit(pid, limit, values)
+    except (ProcessLookupError, FileNotFoundError):
+        pass
+
+
+def cpu_time(pid: int) -> int:
+    """CPU time (user and system, whole seconds rounded up) used by a running process"""
+    with open(f"/proc/{pid}/stat", encoding="utf-8") as stat:
+        # fields after the command name, utime and stime are 14th and 15th field
+        fields = stat.read().rsplit(")", 1)[1].split()
+    return math.ceil((int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK"))
+
+
+def wait_accounted(
+    process: subprocess.Popen, timeout: Optional[float] = None
+) -> resource.struct_rusage:
+    """Wait for the process and reap it with wait4(), which also returns its
+    resource usage (Popen.wait() discards it). Output of the process must not
+    be left in pipes, otherwise it may never exit.
+
+    Raises:
+        subprocess.TimeoutExpired: the process is still running after `timeout`
+    """
+    if timeout is not None:
+        pidfd = os.pidfd_open(process.pid)
+        try:
+            if not select.select([pidfd], [], [], timeout)[0]:
+                raise subprocess.TimeoutExpired(process.args, timeout)
+        finally:
+            os.close(pidfd)
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return rusage
+
+
+def record_usage(
+    tool: str,
+    process: subprocess.Popen,
+    rusage: resource.struct_rusage,
+    wall_time: float,
+    timed_out: bool,
+    **extra: object,
+):
+    """Log resource usage of a finished tool and append it to `RESOURCE_LOG`
+    (JSON Lines) if configured. `extra` fields are added to the record."""
+    usage: Dict[str, object] = {
+        "timestamp": time.time(),
+        "tool": tool,
+        "returncode": process.returncode,
+        "timed_out": timed_out,
+        "wall_time": round(wall_time, 3),
+        "user_time": round(rusage.ru_utime, 3),
+        "system_time": round(rusage.ru_stime, 3),
+        # Linux reports ru_maxrss in kilobytes
+        "max_rss": rusage.ru_maxrss * 1024,
+        **extra,
+    }
+    logger.info(f"Resource usage: {usage}")
+
+    if config["RESOURCE_LOG"]:
+        line = orjson.dumps(usage, option=orjson.OPT_APPEND_NEWLINE)
+        try:
+            fd = os.open(
+                config["RESOURCE_LOG"], os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644
+            )
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+        except OSError as exception:
+            logger.warning(f"Cannot write resource usage: {exception}")
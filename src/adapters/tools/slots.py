@@ -0,0 +1,75 @@
+import fcntl
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import IO, List, Optional
+
+from adapters.config import config
+from adapters.exceptions import ToolBusyError
+
+logger = logging.getLogger(__name__)
+
+SLOT_POLL_INTERVAL = 0.1
+
+
+def try_lock(paths: List[str]) -> Optional[IO]:
+    """Lock the first free file of given ones (the lock lives as long as the
+    returned file is open, also across processes)"""
+    for path in paths:
+        lock = open(path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return lock
+        except BlockingIOError:
+            lock.close()
+    return None
+
+
+@contextmanager
+def tool_slot(tool: str):
+    """Run the block in one of `TOOL_SLOTS[tool]` slots shared by all workers.
+    When all slots are taken, wait in a queue of `TOOL_QUEUE_SIZE` places for
+    at most `TOOL_QUEUE_TIMEOUT` seconds. Tools without a limit run at once.
+
+    Args:
+        tool (str): name of the tool, e.g. "maxit"
+
+    Raises:
+        ToolBusyError: the queue is full or waiting timed out
+    """
+    slots = config["TOOL_SLOTS"].get(tool)
+    if slots is None:
+        yield
+        return
+
+    directory = os.path.join(config["LOCK_DIR"], "slots")
+    os.makedirs(directory, exist_ok=True)
+    slot_paths = [os.path.join(directory, f"{tool}.{i}.lock") for i in range(slots)]
+    queue_paths = [
+        os.path.join(directory, f"{tool}.queue.{i}.lock")
+        for i in range(config["TOOL_QUEUE_SIZE"])
+    ]
+
+    slot = try_lock(slot_paths)
+    if slot is None:
+        ticket = try_lock(queue_paths)
+        if ticket is None:
+            raise ToolBusyError(f"Too many requests for {tool}, queue is full")
+        try:
+            logger.info(f"Waiting for a free {tool} slot")
+            deadline = time.monotonic() + config["TOOL_QUEUE_TIMEOUT"]
+            while slot is None:
+                if time.monotonic() > deadline:
+                    raise ToolBusyError(
+                        f"Too many requests for {tool}, waited too long"
+                    )
+                time.sleep(SLOT_POLL_INTERVAL)
+                slot = try_lock(slot_paths)
+        finally:
+            ticket.close()
+
+    try:
+        yield
+    finally:
+        slot.close()
@@ -0,0 +1,73 @@
+from io import StringIO
+from typing import TYPE_CHECKING, List, Optional
+
+from mmcif.api.DataCategory import DataCategory
+from mmcif.api.PdbxContainers import DataContainer
+from mmcif.io.PdbxReader import PdbxReader
+from mmcif.io.PdbxWriter import PdbxWriter
+
+from adapters.tools import converter, maxit
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class Structure:
+    """Parsed mmCIF data passed between filters and adapters.
+    It is serialized only when an external tool needs it, in the format it needs.
+
+    Args:
+        data (List[DataContainer]): data blocks as read by PdbxReader
+    """
+
+    def __init__(self, data: List[DataContainer]):
+        self.data = data
+
+    @classmethod
+    def from_cif(cls, cif_content: str) -> "Structure":
+        data: List[DataContainer] = []
+        PdbxReader(StringIO(cif_content)).read(data)
+        return cls(data)
+
+    @property
+    def atom_site(self) -> Optional[DataCategory]:
+        if len(self.data) == 0:
+            return None
+        return self.data[0].getObj("atom_site")
+
+    def models(self) -> List[int]:
+        """Numbers of models present in `atom_site`, in order of appearance"""
+        atom_site = self.atom_site
+        if atom_site is None:
+            return []
+        index = atom_site.getAttributeIndex("pdbx_PDB_model_num")
+        if index == -1:
+            return [1]
+        models = dict.fromkeys(row[index] for row in atom_site.getRowList())
+        return [int(model) for model in models if model.lstrip("-").isdigit()]
+
+    def atom_site_table(self) -> Optional["pd.DataFrame"]:
+        """Columnar copy of `atom_site` category, values are kept as strings"""
+        # pandas is imported on first use to keep server startup fast
+        import pandas as pd  # pylint: disable=import-outside-toplevel
+
+        atom_site = self.atom_site
+        if atom_site is None:
+            return None
+        return pd.DataFrame(
+            atom_site.getRowList(), columns=atom_site.getAttributeList(), dtype=object
+        )
+
+    def set_atom_site_table(self, table: "pd.DataFrame"):
+        self.atom_site.setRowList(table.to_numpy().tolist())
+
+    def to_cif(self) -> str:
+        output = StringIO()
+        PdbxWriter(output).write(self.data)
+        return output.getvalue()
+
+    def to_pdb(self) -> str:
+        pdb_content = converter.write_pdb(self.atom_site)
+        if pdb_content is None:
+            return maxit.cif2pdb(self.to_cif())
+        return pdb_content
@@ -0,0 +1,87 @@
+import itertools
+import logging
+import os
+import re
+import time
+from typing import Any, Callable, Union
+
+from adapters.config import config
+
+logger = logging.getLogger(__name__)
+
+# Maximum length of the label part of trace file names
+SLUG_LENGTH = 40
+# Numbers trace files written by this process
+counter = itertools.count()
+# Seconds between removals of expired trace files by this process
+PRUNE_INTERVAL = 600
+_next_prune: float = 0.0
+
+
+def trace(
+    log: logging.Logger,
+    label: str,
+    payload: Union[Any, Callable[[], Any]],
+    level: int = logging.DEBUG,
+) -> None:
+    """Log a payload (e.g. tool output, request body) which may be large.
+    Nothing is evaluated or formatted unless `level` is enabled for the logger.
+    With `TRACE_DIR` set, the full payload is written to a file there and only
+    its first `TRACE_PREVIEW` characters are logged. Files older than
+    `TRACE_MAX_AGE` seconds are removed.
+
+    Args:
+        log (logging.Logger): logger of the calling module
+        label (str): description of the payload
+        payload: the payload or a function computing it
+        level (int): logging level of the message
+    """
+    if not log.isEnabledFor(level):
+        return
+    if callable(payload):
+        payload = payload()
+    text = payload if isinstance(payload, str) else str(payload)
+
+    if not config["TRACE_DIR"]:
+        log.log(level, f"{label}: {text}", stacklevel=2)
+        return
+
+    path = write_trace(label, text)
+    preview = text[: config["TRACE_PREVIEW"]]
+    log.log(level, f"{label} ({len(text)} characters, {path}): {preview}", stacklevel=2)
+
+
+def write_trace(label: str, text: str) -> str:
+    slug = re.sub(r"[^a-zA-Z0-9]+", "-", label).strip("-").lower()[:SLUG_LENGTH]
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(counter)}-{slug}.log"
+    path = os.path.join(config["TRACE_DIR"], name)
+    try:
+        os.makedirs(config["TRACE_DIR"], exist_ok=True)
+        prune_traces()
+        # payloads include request bodies, only the owner may read them
+        with open(
+            os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600),
+            "w",
+            encoding="utf-8",
+        ) as trace_file:
+            trace_file.write(text)
+    except OSError as exception:
+        logger.warning(f"Cannot write trace: {exception}")
+    return path
+
+
+def prune_traces():
+    """Remove trace files not modified for `TRACE_MAX_AGE` seconds, at most
+    once per `PRUNE_INTERVAL` in each process"""
+    global _next_prune  # pylint: disable=global-statement
+    if time.monotonic() < _next_prune:
+        return
+    _next_prune = time.monotonic() + PRUNE_INTERVAL
+    deadline = time.time() - config["TRACE_MAX_AGE"]
+    with os.scandir(config["TRACE_DIR"]) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < deadline:
+                    os.unlink(entry.path)
+            except OSError:
+                continue
@@ -1,12 +1,16 @@
 import logging
 import os
+import select
+import selectors
 import signal
 import subprocess
+import threading
+import time
 from contextlib import contextmanager, redirect_stderr, redirect_stdout
 from functools import wraps
 from http import HTTPStatus
 from os import devnull
-from tempfile import NamedTemporaryFile, TemporaryDirectory
+from typing import IO, Dict, Iterator, List, Optional, Tuple
 
 import orjson
 from flask import Response, request
@@ -14,9 +18,16 @@ from werkzeug.exceptions import UnsupportedMediaType
 
 from adapters.config import config
 from adapters.exceptions import InvalidSvgError
+from adapters.tools.resources import limits_command, record_usage, wait_accounted
+from adapters.tools.slots import tool_slot
+from adapters.tools.tracing import trace
+from adapters.tools.workspace import materialize, temporary_directory
 
 logger = logging.getLogger(__name__)
 
+# Size of chunks read from pipes of subprocesses
+PIPE_READ_SIZE = 32768
+
 
 def is_cif(file_content: str) -> bool:
     for line in file_content.splitlines():
@@ -40,15 +51,13 @@ def clean_svg(svg_content: str, copy_on_error: bool = False) -> str:
         str: content of clean SVG file
     """
 
-    with TemporaryDirectory() as directory:
-        with NamedTemporaryFile("w+", dir=directory, suffix=".svg") as input_svg:
-            input_svg.write(svg_content)
-            input_svg.seek(0)
-            output_svg = os.path.join(directory, "output.svg")
-            cmd_args = ["svgcleaner", input_svg.name, output_svg]
-            if copy_on_error:
-                cmd_args.append("--copy-on-error")
-            run_external_cmd(cmd_args, cwd=directory)
+    with temporary_directory() as directory:
+        input_svg = materialize(svg_content, directory, "input.svg")
+        output_svg = os.path.join(directory, "output.svg")
+        cmd_args = ["svgcleaner", input_svg, output_svg]
+        if copy_on_error:
+            cmd_args.append("--copy-on-error")
+        run_external_cmd(cmd_args, cwd=directory)
         if not os.path.isfile(output_svg):
             raise FileNotFoundError("svgcleaner failed: SVG was not generated!")
         with open(output_svg, "r", encoding="utf-8") as output_svg_file:
@@ -72,7 +81,7 @@ def pdf_to_svg(pdf_path: str) -> str:
         str: content of SVG file
     """
 
-    with TemporaryDirectory() as directory:
+    with temporary_directory() as directory:
         output_svg = os.path.join(directory, "out.svg")
         run_external_cmd(
             ["pdf2svg", pdf_path, output_svg],
@@ -95,6 +104,7 @@ def run_external_cmd(
     check=False,
     timeout=config["SUBPROCESS_DEFAULT_TIMEOUT"],
     cmd_input=None,
+    tool=None,
 ):
     """Wrapper for subprocess.Popen()
 
@@ -106,6 +116,7 @@ def run_external_cmd(
         check (bool, optional): check for exceptions. Defaults to False.
         timeout (int, optional): timeout for command. Defaults to 120.
         cmd_input (bytes, optional): input for command. Defaults to None.
+        tool (str, optional): name used for concurrency limits. Defaults to command name.
 
     Raises:
         ValueError: cwd is not valid directory
@@ -117,19 +128,25 @@ def run_external_cmd(
     if cwd is None:
         return ValueError("cwd argument must be valid directory!")
 
-    subprocess_result = wrapped_popen(
-        args,
-        cwd=cwd,
-        stdout=stdout,
-        stderr=stderr,
-        check=check,
-        timeout=timeout,
-        input=cmd_input,
-    )
+    tool = tool or os.path.basename(args[0])
+    with tool_slot(tool):
+        subprocess_result = wrapped_popen(
+            args,
+            cwd=cwd,
+            stdout=stdout,
+            stderr=stderr,
+            check=check,
+            timeout=timeout,
+            input=cmd_input,
+            tool=tool,
+        )
 
-    error_output = subprocess_result.stderr.decode("utf-8")
-    if error_output:
-        logger.debug(f"Subprocess {args} stderr: {error_output}")
+    if subprocess_result.stderr:
+        trace(
+            logger,
+            f"Subprocess {args} stderr",
+            lambda: subprocess_result.stderr.decode("utf-8"),
+        )
 
     return subprocess_result
 
@@ -140,9 +157,11 @@ def wrapped_popen(
     capture_output=False,
     timeout=None,
     check=False,
+    tool=None,
     **kwargs,
 ) -> subprocess.CompletedProcess:
-    """Wrapper for subprocess.popen() (POSIX only)"""
+    """Wrapper for subprocess.popen() (POSIX only). Resource usage of the process
+    is recorded and resource limits of the `tool` (if configured) are applied."""
     if input is not None:
         if kwargs.get("stdin") is not None:
             raise ValueError("stdin and input arguments may not both be used.")
@@ -156,24 +175,158 @@ def wrapped_popen(
         kwargs["stdout"] = subprocess.PIPE
         kwargs["stderr"] = subprocess.PIPE
 
-    with subprocess.Popen(*popenargs, **kwargs, start_new_session=True) as process:
+    tool = tool or os.path.basename(popenargs[0][0])
+    args = limits_command(tool) + list(popenargs[0])
+    started = time.monotonic()
+    with subprocess.Popen(
+        args, *popenargs[1:], **kwargs, start_new_session=True
+    ) as process:
         try:
-            stdout, stderr = process.communicate(input, timeout=timeout)
+            stdout, stderr = communicate(process, input, timeout)
+            rusage = wait_accounted(process, remaining(started, timeout))
         except subprocess.TimeoutExpired:
-            os.killpg(os.getpgid(process.pid), signal.SIGKILL)
-            process.wait()
+            kill_process_group(process)
+            rusage = wait_accounted(process)
+            record_usage(tool, process, rusage, time.monotonic() - started, True)
             raise
-        except:  # noqa (Including KeyboardInterrupt, communicate handled that.)
-            os.killpg(os.getpgid(process.pid), signal.SIGKILL)
-            # We don't call process.wait() as .__exit__ does that for us.
+        except:  # noqa (Including KeyboardInterrupt, .__exit__ reaps the process)
+            kill_process_group(process)
             raise
-        retcode = process.poll()
-        if check and retcode:
+        record_usage(tool, process, rusage, time.monotonic() - started, False)
+        if check and process.returncode:
             raise subprocess.CalledProcessError(
-                retcode, process.args, output=stdout, stderr=stderr
+                process.returncode, process.args, output=stdout, stderr=stderr
             )
 
-    return subprocess.CompletedProcess(process.args, retcode, stdout, stderr)
+    return subprocess.CompletedProcess(process.args, process.returncode, stdout, stderr)
+
+
+def remaining(started: float, timeout: Optional[float]) -> Optional[float]:
+    return None if timeout is None else max(0.0, started + timeout - time.monotonic())
+
+
+def communicate(
+    process: subprocess.Popen, data: Optional[bytes], timeout: Optional[float]
+) -> Tuple[Optional[bytes], Optional[bytes]]:
+    """Like Popen.communicate(), but it does not reap the process, so that it
+    can be reaped by wait_accounted(). Pipes are closed when they reach EOF.
+
+    Raises:
+        subprocess.TimeoutExpired: pipes are still open after `timeout`
+    """
+    started = time.monotonic()
+    pending = memoryview(data or b"")
+    outputs: Dict[IO[bytes], List[bytes]] = {
+        stream: [] for stream in (process.stdout, process.stderr) if stream
+    }
+    with selectors.DefaultSelector() as selector:
+        if process.stdin:
+            selector.register(process.stdin, selectors.EVENT_WRITE)
+        for stream in outputs:
+            selector.register(stream, selectors.EVENT_READ)
+
+        while selector.get_map():
+            timeout_left = remaining(started, timeout)
+            if timeout_left == 0:
+                raise subprocess.TimeoutExpired(process.args, timeout)
+            for key, _ in selector.select(timeout_left):
+                if key.fileobj is process.stdin:
+                    pending = write_chunk(key.fd, pending)
+                    done = not pending
+                else:
+                    chunk = os.read(key.fd, PIPE_READ_SIZE)
+                    outputs[key.fileobj].append(chunk)
+                    done = not chunk
+                if done:
+                    selector.unregister(key.fileobj)
+                    key.fileobj.close()
+
+    stdout, stderr = (
+        b"".join(outputs[stream]) if stream else None
+        for stream in (process.stdout, process.stderr)
+    )
+    return stdout, stderr
+
+
+def write_chunk(fd: int, pending: memoryview) -> memoryview:
+    """Write as much as a pipe takes without blocking, returns the rest"""
+    try:
+        return pending[os.write(fd, pending[: select.PIPE_BUF]) :]
+    except BrokenPipeError:
+        # the process does not read its input anymore
+        return pending[:0]
+
+
+@contextmanager
+def stream_external_cmd(
+    args,
+    cwd,
+    timeout=config["SUBPROCESS_DEFAULT_TIMEOUT"],
+    tool=None,
+) -> Iterator[IO[str]]:
+    """Run a command and give access to its stdout while it runs, so that
+    the output can be parsed line by line instead of being buffered whole
+
+    Args:
+        args: command arguments
+        cwd: current working directory
+        timeout (int, optional): timeout for command. Defaults to 600.
+        tool (str, optional): name used for limits. Defaults to command name.
+
+    Raises:
+        subprocess.TimeoutExpired: the command took longer than `timeout`
+
+    Yields:
+        IO[str]: stdout of the command
+    """
+    tool = tool or os.path.basename(args[0])
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        kill_process_group(process)
+
+    started = time.monotonic()
+    with tool_slot(tool), subprocess.Popen(
+        limits_command(tool) + list(args),
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding="utf-8",
+        start_new_session=True,
+    ) as process:
+        # stderr is drained while stdout is read, so the tool never blocks on it
+        stderr: List[str] = []
+        reader = threading.Thread(
+            target=lambda: stderr.append(process.stderr.read()), daemon=True
+        )
+        reader.start()
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        try:
+            yield process.stdout
+            reader.join()
+            rusage = wait_accounted(process)
+        except:  # noqa (the reader failed, the process is not needed anymore)
+            kill_process_group(process)
+            raise
+        finally:
+            timer.cancel()
+
+        wall_time = time.monotonic() - started
+        record_usage(tool, process, rusage, wall_time, timed_out.is_set())
+        if stderr and stderr[0]:
+            trace(logger, f"Subprocess {args} stderr", stderr[0])
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(args, timeout)
+
+
+def kill_process_group(process: subprocess.Popen):
+    try:
+        os.killpg(os.getpgid(process.pid), signal.SIGKILL)
+    except ProcessLookupError:
+        pass
 
 
 def convert_to_svg_using_inkscape(file_content: str, file_type: str) -> str:
@@ -191,28 +344,24 @@ def convert_to_svg_using_inkscape(file_content: str, file_type: str) -> str:
         str: SVG content as string
     """
 
-    with TemporaryDirectory() as directory:
-        with NamedTemporaryFile("w+", dir=directory, suffix=file_type) as file:
-            file.write(file_content)
-            file.seek(0)
-            output_file = os.path.join(directory, "output.svg")
-            run_external_cmd(
-                [
-                    "inkscape",
-                    "--export-plain-svg",
-                    "--export-area-drawing",
-                    "--export-filename",
-                    output_file,
-                    file.name,
-                ],
-                cwd=directory,
-            )
-            if not os.path.isfile(output_file):
-                raise FileNotFoundError(
-                    "Inkscape conversion failed: file does not exist!"
-                )
-            with open(output_file, encoding="utf-8") as svg_file:
-                svg_content = svg_file.read()
+    with temporary_directory() as directory:
+        input_file = materialize(file_content, directory, f"input{file_type}")
+        output_file = os.path.join(directory, "output.svg")
+        run_external_cmd(
+            [
+                "inkscape",
+                "--export-plain-svg",
+                "--export-area-drawing",
+                "--export-filename",
+                output_file,
+                input_file,
+            ],
+            cwd=directory,
+        )
+        if not os.path.isfile(output_file):
+            raise FileNotFoundError("Inkscape conversion failed: file does not exist!")
+        with open(output_file, encoding="utf-8") as svg_file:
+            svg_content = svg_file.read()
     if "svg" not in svg_content:
         raise InvalidSvgError("Inkscape conversion failed: SVG not valid!")
     return svg_content
@@ -242,9 +391,10 @@ def content_type(mimetype: str):
     return _content_type
 
 
-def json_response():
-    """Decorate a flask route to return `Response` with status `200`and
-    `Content-Type: application/json`. Additionally, `orjson` is used to dump object."""
+def json_response(status: HTTPStatus = HTTPStatus.OK):
+    """Decorate a flask route to return `Response` with status `status` (`200` by
+    default) and `Content-Type: application/json`. Additionally, `orjson` is used
+    to dump object."""
 
     def _json_response(function):
         @wraps(function)
@@ -253,7 +403,7 @@ def json_response():
             logger.info(f"Response application/json sent (path: {request.path})")
             return Response(
                 response=orjson.dumps(result).decode("utf-8"),
-                status=HTTPStatus.OK,
+                status=status,
                 mimetype="application/json",
             )
 
@@ -292,7 +442,7 @@ def svg_response():
                 clean_svg_content = clean_svg(svg_content, copy_on_error=True)
             except (FileNotFoundError, InvalidSvgError, subprocess.SubprocessError):
                 logger.warning("svgcleaner failed, returning non-optimized svg")
-                logger.debug(f"invalid svg for svgcleaner: {svg_content}")
+                trace(logger, "invalid svg for svgcleaner", svg_content)
                 clean_svg_content = svg_content
             logger.info(f"Response image/svg+xml sent (path: {request.path})")
             return Response(
@@ -0,0 +1,130 @@
+#! /usr/bin/env python
+"""Server of a `WorkerPool` shared by all processes of the host, started by
+`SharedWorkerPool` with the specification of the pool as JSON:
+
+    python -m adapters.tools.worker_server '{"args": [...], "socket": ...}'
+
+Each connection sends one JSON job and receives one JSON reply. The server
+exits (and stops its workers) after `idle_timeout` seconds without jobs,
+on SIGTERM or when asked to stop."""
+
+import fcntl
+import logging
+import os
+import select
+import signal
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict
+
+import orjson
+
+from adapters.exceptions import ThirdPartySoftwareError, ToolBusyError
+from adapters.tools.workers import WorkerPool
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks whether the server is idle
+IDLE_CHECK_INTERVAL = 1.0
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if line:
+            reply = self.server.execute(orjson.loads(line))
+            self.wfile.write(orjson.dumps(reply) + b"\n")
+
+
+class WorkerServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Runs jobs of concurrent connections on its pool and keeps track of
+    time since the last one finished"""
+
+    def __init__(self, pool: WorkerPool, path: str):
+        super().__init__(path, JobHandler)
+        self.pool = pool
+        self.active = 0
+        self.last_active = time.monotonic()
+        self.stopping = False
+        self._lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self.active += 1
+        super().process_request(request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.last_active = time.monotonic()
+
+    def is_idle(self, timeout: float) -> bool:
+        with self._lock:
+            idle_time = time.monotonic() - self.last_active
+            return self.stopping or (self.active == 0 and idle_time >= timeout)
+
+    def execute(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if request.get("command") == "stop":
+            self.stopping = True
+            return {"response": {"ok": True}}
+        try:
+            return {"response": self.pool.run(request["job"], request["timeout"])}
+        except subprocess.TimeoutExpired:
+            return {"error": "TimeoutExpired"}
+        except (ThirdPartySoftwareError, ToolBusyError) as exception:
+            return {"error": type(exception).__name__, "message": str(exception)}
+        except Exception as exception:  # pylint: disable=broad-except
+            logger.exception(f"Job failed in worker server {self.server_address}")
+            return {"error": "ThirdPartySoftwareError", "message": str(exception)}
+
+
+def serve(spec: Dict[str, Any]):
+    path = spec["socket"]
+    pool = WorkerPool(
+        spec["args"],
+        size=spec["size"],
+        max_jobs=spec["max_jobs"],
+        startup_timeout=spec["startup_timeout"],
+        tool=spec["tool"],
+    )
+    server = WorkerServer(pool, path)
+    server.timeout = IDLE_CHECK_INTERVAL
+    logger.info(f"Worker server {path} listening (pid: {os.getpid()})")
+
+    try:
+        while True:
+            server.handle_request()
+            if not server.is_idle(spec["idle_timeout"]):
+                continue
+            # Clients start a new server under the same lock
+            with open(f"{path}.lock", "a", encoding="utf-8") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                if server.is_idle(spec["idle_timeout"]):
+                    os.unlink(path)
+                    break
+        # Connections made before the socket was removed are still answered
+        while select.select([server], [], [], 0)[0]:
+            server.handle_request()
+    finally:
+        server.server_close()
+        pool.close()
+    logger.info(f"Worker server {path} stopped")
+
+
+def stop(signum: int, _):
+    raise SystemExit(128 + signum)
+
+
+def main():
+    signal.signal(signal.SIGTERM, stop)
+    serve(orjson.loads(sys.argv[1]))
+
+
+if __name__ == "__main__":
+    main()
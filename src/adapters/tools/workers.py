@@ -0,0 +1,394 @@
+import atexit
+import fcntl
+import logging
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+from adapters.config import config
+from adapters.exceptions import ThirdPartySoftwareError, ToolBusyError
+from adapters.tools.resources import apply_limits, record_usage, wait_accounted
+from adapters.tools.slots import tool_slot
+from adapters.tools.tracing import trace
+
+logger = logging.getLogger(__name__)
+
+# Workers prefix their responses, so that any other output of a tool is ignored
+RESPONSE_PREFIX = b"@@adapters-worker "
+READ_CHUNK_SIZE = 1 << 16
+# Seconds between attempts to connect to a starting worker server
+CONNECT_INTERVAL = 0.05
+# Exceptions of a shared pool which are raised again by its clients
+SHARED_ERRORS = {
+    "ThirdPartySoftwareError": ThirdPartySoftwareError,
+    "ToolBusyError": ToolBusyError,
+}
+
+
+class WorkerCrashedError(Exception):
+    pass
+
+
+class Worker:  # pylint: disable=too-many-instance-attributes
+    """A long-lived helper process. It reads one JSON job per line on stdin
+    and answers with a single line `RESPONSE_PREFIX + JSON` on stdout.
+    Its stderr goes to a temporary file and is logged after each job.
+    Resource limits of the tool apply to each job, its resource usage is
+    recorded once, when the worker stops.
+
+    Args:
+        args (List[str]): command arguments
+        tool (str): name used for limits and usage records
+    """
+
+    def __init__(self, args: List[str], tool: str):
+        self.args = args
+        self.tool = tool
+        self.jobs = 0
+        self.started = time.monotonic()
+        self.stderr = tempfile.TemporaryFile()  # pylint: disable=consider-using-with
+        self.process = subprocess.Popen(  # pylint: disable=consider-using-with
+            args,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=self.stderr,
+            start_new_session=True,
+        )
+        self._buffer = b""
+        self._stderr_offset = 0
+        apply_limits(tool, self.process.pid, persistent=True)
+        logger.info(f"Worker {args} started (pid: {self.process.pid})")
+
+    def is_alive(self) -> bool:
+        if self.process.returncode is not None:
+            return False
+        # WNOWAIT leaves an exited worker to be reaped (and accounted) by stop()
+        flags = os.WEXITED | os.WNOHANG | os.WNOWAIT
+        return os.waitid(os.P_PID, self.process.pid, flags) is None
+
+    def stop(self):
+        if self.is_alive():
+            try:
+                os.killpg(os.getpgid(self.process.pid), signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        if self.process.returncode is None:
+            rusage = wait_accounted(self.process)
+            wall_time = time.monotonic() - self.started
+            record_usage(
+                self.tool, self.process, rusage, wall_time, False, jobs=self.jobs
+            )
+        self.log_stderr()
+        for stream in (self.process.stdin, self.process.stdout, self.stderr):
+            stream.close()
+        logger.info(f"Worker {self.args} stopped after {self.jobs} jobs")
+
+    def call(self, job: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Send a job and wait for its response
+
+        Raises:
+            subprocess.TimeoutExpired: no response in time
+            WorkerCrashedError: the process exited or closed its pipes
+        """
+        apply_limits(self.tool, self.process.pid, persistent=True)
+        try:
+            self.process.stdin.write(orjson.dumps(job) + b"\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as exception:
+            self.log_stderr(logging.WARNING)
+            raise WorkerCrashedError(
+                f"Worker {self.args} is not running"
+            ) from exception
+        try:
+            response = self._read_response(time.monotonic() + timeout, timeout)
+        except WorkerCrashedError:
+            self.log_stderr(logging.WARNING)
+            raise
+        self.log_stderr(logging.DEBUG if response.get("ok") else logging.WARNING)
+        return response
+
+    def log_stderr(self, level: int = logging.DEBUG):
+        """Log stderr written by the worker since the last call"""
+        # pread() leaves the file offset shared with the worker untouched
+        fd = self.stderr.fileno()
+        size = os.fstat(fd).st_size - self._stderr_offset
+        if size <= 0:
+            return
+        output = os.pread(fd, size, self._stderr_offset)
+        self._stderr_offset += len(output)
+        trace(
+            logger,
+            f"Worker {self.args} stderr",
+            lambda: output.decode("utf-8", "replace"),
+            level,
+        )
+
+    def _read_response(self, deadline: float, timeout: float) -> Dict[str, Any]:
+        fd = self.process.stdout.fileno()
+
+        while True:
+            while b"\n" in self._buffer:
+                line, self._buffer = self._buffer.split(b"\n", 1)
+                if line.startswith(RESPONSE_PREFIX):
+                    return orjson.loads(line[len(RESPONSE_PREFIX) :])
+                logger.debug(f"Worker {self.args} output: {line!r}")
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+
+            chunk = os.read(fd, READ_CHUNK_SIZE)
+            if not chunk:
+                raise WorkerCrashedError(f"Worker {self.args} exited unexpectedly")
+            self._buffer += chunk
+
+
+class WorkerPool:  # pylint: disable=too-many-instance-attributes
+    """A lazily started pool of `Worker` processes running the same command.
+    Workers are health-checked when started, replaced after a crash or
+    a timeout and recycled after `max_jobs` jobs.
+
+    Args:
+        args (List[str]): command arguments of a worker
+        size (int): maximum number of workers
+        max_jobs (int): number of jobs after which a worker is restarted
+        startup_timeout (float): time for a worker to answer the first ping
+        tool (str): name of the tool slot (default: name of the command)
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        args: List[str],
+        size: int,
+        max_jobs: int,
+        startup_timeout: float,
+        *,
+        tool: Optional[str] = None,
+    ):
+        self.args = args
+        self.tool = tool or os.path.basename(args[0])
+        self.max_jobs = max_jobs
+        self.startup_timeout = startup_timeout
+        self._idle: List[Worker] = []
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        atexit.register(self.close)
+
+    def run(self, job: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Run a job on an idle (or newly started) worker. A job which crashed
+        its worker is retried once on a fresh one.
+
+        Raises:
+            subprocess.TimeoutExpired: the job took longer than `timeout` seconds
+            ThirdPartySoftwareError: the job failed or workers keep crashing
+        """
+        with self._slots, tool_slot(self.tool):
+            for attempt in range(2):
+                worker = self._acquire()
+                try:
+                    response = worker.call(job, timeout)
+                except WorkerCrashedError as exception:
+                    worker.stop()
+                    logger.warning(f"{exception} (attempt {attempt + 1})")
+                    continue
+                except:  # noqa (including timeout, state of worker is unknown)
+                    worker.stop()
+                    raise
+                self._release(worker)
+                if not response.get("ok"):
+                    raise ThirdPartySoftwareError(
+                        response.get("error", "Unknown error")
+                    )
+                return response
+        raise ThirdPartySoftwareError(f"Worker {self.args} keeps crashing")
+
+    def close(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                for worker in self._idle:
+                    worker.stop()
+            self._idle = []
+
+    def _acquire(self) -> Worker:
+        with self._lock:
+            # Workers belong to the process which started them (e.g. not to a fork)
+            if self._pid != os.getpid():
+                self._idle, self._pid = [], os.getpid()
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.is_alive():
+                    return worker
+                worker.stop()
+        return self._start()
+
+    def _release(self, worker: Worker):
+        worker.jobs += 1
+        if worker.jobs >= self.max_jobs:
+            worker.stop()
+            return
+        with self._lock:
+            self._idle.append(worker)
+
+    def _start(self) -> Worker:
+        worker = Worker(self.args, self.tool)
+        try:
+            worker.call({"command": "ping"}, self.startup_timeout)
+        except (subprocess.TimeoutExpired, WorkerCrashedError) as exception:
+            worker.stop()
+            raise ThirdPartySoftwareError(
+                f"Worker {self.args} failed health check"
+            ) from exception
+        return worker
+
+
+class SharedWorkerPool:
+    """A `WorkerPool` shared by all processes of the host (HTTP workers, their
+    process pools and the job runner). The pool lives in a server process
+    (`adapters.tools.worker_server`) listening on a socket in `LOCK_DIR`,
+    which is started by the first job and exits after `WORKER_IDLE_TIMEOUT`
+    seconds without jobs. So there are at most `size` workers per host and
+    they outlive restarts of HTTP workers.
+
+    Args:
+        args (List[str]): command arguments of a worker
+        size (int): maximum number of workers
+        max_jobs (int): number of jobs after which a worker is restarted
+        startup_timeout (float): time for a worker to answer the first ping
+        tool (str): name of the tool slot (default: name of the command)
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        args: List[str],
+        size: int,
+        max_jobs: int,
+        startup_timeout: float,
+        *,
+        tool: Optional[str] = None,
+    ):
+        self.args = args
+        self.tool = tool or os.path.basename(args[0])
+        self.size = size
+        self.max_jobs = max_jobs
+        self.startup_timeout = startup_timeout
+        self._server: Optional[subprocess.Popen] = None
+
+    @property
+    def path(self) -> str:
+        return os.path.join(config["LOCK_DIR"], "workers", f"{self.tool}.sock")
+
+    def run(self, job: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Run a job in the shared pool, starting its server if needed. A job
+        which lost its server is retried once on a fresh one.
+
+        Raises:
+            subprocess.TimeoutExpired: the job took longer than `timeout` seconds
+            ThirdPartySoftwareError: the job failed or the server keeps crashing
+            ToolBusyError: no tool slot was free
+        """
+        request = orjson.dumps({"job": job, "timeout": timeout}) + b"\n"
+        for attempt in range(2):
+            try:
+                reply = self._send(request)
+            except ConnectionError as exception:
+                logger.warning(f"Worker server {self.path}: {exception}")
+                reply = b""
+            if reply:
+                return self._unpack(orjson.loads(reply), timeout)
+            logger.warning(
+                f"Worker server {self.path} closed connection (attempt {attempt + 1})"
+            )
+        raise ThirdPartySoftwareError(f"Worker server {self.path} keeps crashing")
+
+    def close(self):
+        """Stop the server and its workers. Not called at exit, because other
+        processes may still use them."""
+        try:
+            self._send(b'{"command": "stop"}\n', start=False)
+        except (FileNotFoundError, ConnectionError):
+            pass
+
+    def _send(self, request: bytes, start: bool = True) -> bytes:
+        with self._connect(start) as connection, connection.makefile("rb") as reply:
+            connection.sendall(request)
+            return reply.readline()
+
+    def _unpack(self, reply: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        error = reply.get("error")
+        if error is None:
+            return reply["response"]
+        if error == "TimeoutExpired":
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        raise SHARED_ERRORS[error](reply["message"])
+
+    def _connect(self, start: bool) -> socket.socket:
+        try:
+            return self._open()
+        except (FileNotFoundError, ConnectionRefusedError):
+            if not start:
+                raise
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # The lock makes sure only one process starts the server
+        with open(f"{self.path}.lock", "a", encoding="utf-8") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                return self._open()
+            except (FileNotFoundError, ConnectionRefusedError):
+                pass
+            self._start()
+            deadline = time.monotonic() + self.startup_timeout
+            while True:
+                try:
+                    return self._open()
+                except (FileNotFoundError, ConnectionRefusedError) as exception:
+                    if self._server.poll() is not None or time.monotonic() > deadline:
+                        raise ThirdPartySoftwareError(
+                            f"Worker server {self.path} failed to start"
+                        ) from exception
+                time.sleep(CONNECT_INTERVAL)
+
+    def _open(self) -> socket.socket:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(self.path)
+        except OSError:
+            connection.close()
+            raise
+        return connection
+
+    def _start(self):
+        # A socket left by a killed server refuses connections
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        spec = {
+            "args": self.args,
+            "size": self.size,
+            "max_jobs": self.max_jobs,
+            "startup_timeout": self.startup_timeout,
+            "tool": self.tool,
+            "socket": self.path,
+            "idle_timeout": config["WORKER_IDLE_TIMEOUT"],
+        }
+        # Own session, so that the server outlives the process which started it
+        self._server = subprocess.Popen(  # pylint: disable=consider-using-with
+            [
+                sys.executable,
+                "-m",
+                "adapters.tools.worker_server",
+                orjson.dumps(spec).decode(),
+            ],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        logger.info(f"Worker server {self.path} started (pid: {self._server.pid})")
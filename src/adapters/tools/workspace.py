@@ -0,0 +1,106 @@
+import logging
+import os
+import shutil
+import tempfile
+from contextvars import ContextVar, Token
+from functools import lru_cache
+from typing import Optional
+
+from adapters.cache import digest
+from adapters.config import config
+
+logger = logging.getLogger(__name__)
+
+# Path of the workspace of the request being processed (if any)
+current_path: ContextVar[Optional[str]] = ContextVar("workspace", default=None)
+
+# Permissions of files shared between tool runs
+READ_ONLY = 0o444
+
+
+@lru_cache(maxsize=None)
+def scratch_dir() -> str:
+    """Root of all workspaces, `SCRATCH_DIR` (preferably tmpfs) or system temp"""
+    try:
+        os.makedirs(config["SCRATCH_DIR"], exist_ok=True)
+        return config["SCRATCH_DIR"]
+    except OSError as exception:
+        logger.warning(f"Scratch directory not available ({exception}), using /tmp")
+        return tempfile.gettempdir()
+
+
+class Workspace:
+    """A per-request scratch directory shared by all stages of the pipeline.
+    While it is open, `temporary_directory()` and `materialize()` use it."""
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self._token: Optional[Token] = None
+
+    def open(self) -> "Workspace":
+        self.path = tempfile.mkdtemp(prefix="request-", dir=scratch_dir())
+        self._token = current_path.set(self.path)
+        return self
+
+    def close(self):
+        if self._token is not None:
+            current_path.reset(self._token)
+            self._token = None
+        if self.path is not None:
+            shutil.rmtree(self.path, ignore_errors=True)
+            self.path = None
+
+    def __enter__(self) -> "Workspace":
+        return self.open()
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def temporary_directory() -> tempfile.TemporaryDirectory:
+    """Private directory for a single tool run, inside the current workspace"""
+    return tempfile.TemporaryDirectory(dir=current_path.get() or scratch_dir())
+
+
+def materialize(content: str, directory: str, name: str, shared: bool = False) -> str:
+    """Make a file with given content available as `directory/name`.
+    With `shared` (only for tools known to just read their input) the content
+    is written only once within a workspace and later stages get a hard link
+    to it. The shared file is made read-only, although it does not stop a tool
+    running as root. Otherwise each call writes a private copy.
+
+    Args:
+        content (str): content of the file
+        directory (str): private directory of the tool run
+        name (str): name of the file in the directory
+        shared (bool): whether the file may be hard-linked to other tool runs
+
+    Returns:
+        str: path of the file
+    """
+    path = os.path.join(directory, name)
+    workspace = current_path.get()
+
+    if shared and workspace is not None:
+        shared_path = os.path.join(
+            workspace, f"{digest(content)}{os.path.splitext(name)[1]}"
+        )
+        if not os.path.exists(shared_path):
+            write_atomically(shared_path, content, READ_ONLY)
+        try:
+            os.link(shared_path, path)
+            return path
+        except OSError:
+            logger.debug(f"Cannot link {shared_path} to {path}, writing a copy")
+
+    write_atomically(path, content)
+    return path
+
+
+def write_atomically(path: str, content: str, mode: Optional[int] = None):
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as file:
+        file.write(content)
+        if mode is not None:
+            os.fchmod(file.fileno(), mode)
+    os.replace(temporary, path)
@@ -6,18 +6,30 @@ import re
 import sys
 from collections import defaultdict, deque
 from dataclasses import dataclass
-from tempfile import NamedTemporaryFile, TemporaryDirectory
 from typing import DefaultDict, Deque, Dict, List, Tuple
 
 from lxml import etree as ET
 
+from adapters.config import config
 from adapters.exceptions import InvalidSvgError, RegexError, ThirdPartySoftwareError
-from adapters.tools.utils import run_external_cmd
+from adapters.tools.tracing import trace
+from adapters.tools.workers import SharedWorkerPool
+from adapters.tools.workspace import temporary_directory
 from adapters.visualization.model import SYMBOLS, Model2D, Residue, SymbolType
 
 logger = logging.getLogger(__name__)
 
 
+# PseudoViewer daemons keep IronPython and PseudoViewer3.exe loaded between requests,
+# they are shared by all processes of the host
+pool = SharedWorkerPool(
+    ["pseudoviewer", "--server"],
+    size=config["WORKER_POOL_SIZE"],
+    max_jobs=config["WORKER_MAX_JOBS"],
+    startup_timeout=config["WORKER_STARTUP_TIMEOUT"],
+)
+
+
 @dataclass(frozen=True)
 class PseudoviewerInteraction:
     residue_left: Residue
@@ -152,35 +164,23 @@ class PseudoViewerDrawer:
             )
 
     def generate_pseudoviewer_svg(self) -> None:
-        with TemporaryDirectory() as directory:
-            with NamedTemporaryFile(
-                "w+", dir=directory, suffix=".seq"
-            ) as seqeunce_file:
-                with NamedTemporaryFile(
-                    "w+", dir=directory, suffix=".str"
-                ) as structure_file:
-                    seqeunce_file.write(self.modified_sequence)
-                    seqeunce_file.seek(0)
-                    structure_file.write(self.modified_structure)
-                    structure_file.seek(0)
-                    output_file = os.path.join(directory, "out.svg")
-                    run_external_cmd(
-                        [
-                            "pseudoviewer",
-                            seqeunce_file.name,
-                            structure_file.name,
-                            output_file,
-                        ],
-                        cwd=directory,
-                        timeout=self.TIMEOUT,
-                    )
-                    if not os.path.isfile(output_file):
-                        raise FileNotFoundError("PseudoViewer image was not created!")
-                    with open(output_file, "r", encoding="utf-8") as file:
-                        svg_content = file.read()
-                    if "svg" not in svg_content:
-                        raise InvalidSvgError("PseudoViewer image is not a valid SVG!")
-        logger.debug(f"PseudoViewer svg: {svg_content}")
+        with temporary_directory() as directory:
+            output_file = os.path.join(directory, "out.svg")
+            pool.run(
+                {
+                    "sequence": self.modified_sequence,
+                    "structure": self.modified_structure,
+                    "output": output_file,
+                },
+                timeout=self.TIMEOUT,
+            )
+            if not os.path.isfile(output_file):
+                raise FileNotFoundError("PseudoViewer image was not created!")
+            with open(output_file, "r", encoding="utf-8") as file:
+                svg_content = file.read()
+            if "svg" not in svg_content:
+                raise InvalidSvgError("PseudoViewer image is not a valid SVG!")
+        trace(logger, "PseudoViewer svg", svg_content)
         self.svg_result = svg_content
 
     def color_missing_residues(self) -> None:
@@ -3,13 +3,25 @@
 import logging
 import os
 import sys
-import tempfile
 
-from adapters.tools.utils import pdf_to_svg, run_external_cmd
+from adapters.config import config
+from adapters.tools.tracing import trace
+from adapters.tools.utils import pdf_to_svg
+from adapters.tools.workers import SharedWorkerPool
+from adapters.tools.workspace import materialize, temporary_directory
 from adapters.visualization.model import Model2D
 
 logger = logging.getLogger(__name__)
 
+# R workers keep R4RNA and its Bioconductor dependencies loaded between requests,
+# they are shared by all processes of the host
+pool = SharedWorkerPool(
+    ["rchie_worker.R"],
+    size=config["WORKER_POOL_SIZE"],
+    max_jobs=config["WORKER_MAX_JOBS"],
+    startup_timeout=config["WORKER_STARTUP_TIMEOUT"],
+)
+
 
 class RChieDrawer:
     # Only 8 colors are supported by RChie
@@ -25,17 +37,13 @@ class RChieDrawer:
     }
 
     def generate_rchie_svg(self, dot_bracket: str) -> str:
-        with tempfile.TemporaryDirectory() as directory:
-            with tempfile.NamedTemporaryFile(
-                "w+", dir=directory, suffix=".dbn"
-            ) as file:
-                file.write(dot_bracket)
-                file.seek(0)
-                output_pdf = os.path.join(directory, "out.pdf")
-                run_external_cmd(
-                    [
-                        "rchie.R",
-                        file.name,
+        with temporary_directory() as directory:
+            input_dbn = materialize(dot_bracket, directory, "input.dbn")
+            output_pdf = os.path.join(directory, "out.pdf")
+            pool.run(
+                {
+                    "args": [
+                        input_dbn,
                         "--format1",
                         "vienna",
                         "--rule1",
@@ -45,13 +53,14 @@ class RChieDrawer:
                         "--pdf",
                         "--output",
                         output_pdf,
-                    ],
-                    cwd=directory,
-                )
-                if not os.path.isfile(output_pdf):
-                    raise FileNotFoundError("Rchie PDF was not generated!")
+                    ]
+                },
+                timeout=config["SUBPROCESS_DEFAULT_TIMEOUT"],
+            )
+            if not os.path.isfile(output_pdf):
+                raise FileNotFoundError("Rchie PDF was not generated!")
             svg_content = pdf_to_svg(output_pdf)
-        logger.debug(f"Rchie svg: {svg_content}")
+        trace(logger, "Rchie svg", svg_content)
         return svg_content
 
     def visualize(self, data: Model2D) -> str:
@@ -6,11 +6,12 @@ import sys
 from collections import defaultdict, deque
 from dataclasses import dataclass
 from enum import Enum
-from tempfile import TemporaryDirectory
 from typing import DefaultDict, Deque, List
 
 from adapters.exceptions import InvalidEpsError, ThirdPartySoftwareError
+from adapters.tools.tracing import trace
 from adapters.tools.utils import convert_to_svg_using_inkscape, run_external_cmd
+from adapters.tools.workspace import temporary_directory
 from adapters.visualization.model import SYMBOLS, Model2D, SymbolType
 
 logger = logging.getLogger(__name__)
@@ -143,7 +144,7 @@ class RNAPuzzlerDrawer:
                 f"Maximum structure length ({self.MAX_STRUCTURE_LENGTH}) for RNAPuzzler exceeded"
             )
 
-        with TemporaryDirectory() as directory:
+        with temporary_directory() as directory:
             run_external_cmd(
                 ["RNAplot", "-t", "4", "--post", ""],
                 cwd=directory,
@@ -156,7 +157,7 @@ class RNAPuzzlerDrawer:
                 eps_content = file.read()
             if "RNAplot" not in eps_content:
                 raise InvalidEpsError("RNAPuzzler file is not a valid EPS!")
-        logger.debug(f"RNAPuzzler EPS {eps_content}")
+        trace(logger, "RNAPuzzler EPS", eps_content)
         self.result = eps_content
 
     def draw_interactions(self) -> List[str]:
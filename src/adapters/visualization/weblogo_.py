@@ -21,7 +21,9 @@ import weblogo as w
 from lxml import etree as ET
 
 from adapters.exceptions import InvalidSvgError, ThirdPartySoftwareError
+from adapters.tools.tracing import trace
 from adapters.tools.utils import clean_svg, run_external_cmd
+from adapters.tools.workspace import temporary_directory
 from adapters.visualization.model import ModelMulti2D
 
 logger = logging.getLogger(__name__)
@@ -100,7 +102,7 @@ class WeblogoDrawer:
                 '"pdf2svg" software not found. Please install it.'
             )
 
-        with tempfile.TemporaryDirectory() as directory_name:
+        with temporary_directory() as directory_name:
             with tempfile.NamedTemporaryFile(
                 "wb+", dir=directory_name, suffix=".pdf"
             ) as temp_pdf:
@@ -119,11 +121,11 @@ class WeblogoDrawer:
                 svg_result = svg_file.read()
             if "svg" not in svg_result:
                 raise InvalidSvgError("Weblogo image is not a valid SVG!")
-        logger.debug(f"svg weblogo: {svg_result}")
+        trace(logger, "svg weblogo", svg_result)
         return svg_result
 
     def merge_svg_files(self, svg_contents: List[str]) -> str:
-        with tempfile.TemporaryDirectory() as directory:
+        with temporary_directory() as directory:
             svg_files: List[str] = []
 
             for svg_content in svg_contents:
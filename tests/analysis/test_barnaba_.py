@@ -2,7 +2,10 @@ import pytest
 from data import MAPPED_VALUES, PDB_LINES, PDB_LINES_RENUMBERED, RESIDUES
 from rnapolis.common import LeontisWesthof, Residue, ResidueAuth
 
+from adapters.analysis import barnaba_
 from adapters.analysis.barnaba_ import BarnabaAdapter
+from adapters.tools.pdb_table import AtomTable
+from adapters.tools.structure import Structure
 
 # -------- FIXTURES --------
 
@@ -48,7 +51,7 @@ def adapter_after_pdb_parsing():
     ],
 )
 def test_append_chains(adapter, file_content, expected):
-    adapter.append_chains(file_content)
+    adapter.append_chains(AtomTable(file_content))
     assert adapter.chains == expected
 
 
@@ -64,7 +67,8 @@ def test_append_chains(adapter, file_content, expected):
     ids=["renumber pdb"],
 )
 def test_renumber_pdb(adapter, file_content, expected_mapped_values, expected_content):
-    assert adapter.renumber_pdb(file_content) == expected_content
+    table = AtomTable(file_content)
+    assert adapter.renumber_pdb(file_content, table) == expected_content
     assert adapter.mapped_residues_info == expected_mapped_values
 
 
@@ -97,3 +101,15 @@ def test_get_residue(adapter_after_pdb_parsing, residue_info, expected):
 )
 def test_get_leontis_westhof(adapter, interaction, expected):
     adapter.get_leontis_westhof(interaction) == expected
+
+
+def test_analyze_structure_without_mdtraj_internals(monkeypatch):
+    with open("files/input/2z_74.cif") as f:
+        cif_content = f.read()
+    expected = barnaba_.analyze_structure(Structure.from_cif(cif_content))
+
+    monkeypatch.setattr(barnaba_, "pdb_name_replacements", lambda: None)
+    result = barnaba_.analyze_structure(Structure.from_cif(cif_content))
+
+    assert result == expected
+    assert len(result.basePairs) > 0
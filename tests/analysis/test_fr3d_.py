@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+from data import TEST_DIRECTORY
+
+from adapters.analysis import fr3d_
+from adapters.exceptions import ThirdPartySoftwareError
+from adapters.tools.workers import WorkerPool
+
+WORKER = os.path.join(TEST_DIRECTORY, "../app/fr3d/fr3d_worker.py")
+
+# Stands in for NA_pairwise_interactions.py, writes requested classifiers and its pid
+CLASSIFIER = """
+import os, sys
+
+if __name__ == "__main__":
+    args = dict(zip(sys.argv[1::2], sys.argv[2::2]))
+    if args["-c"] == "fail":
+        sys.exit(2)
+    for classifier in args["-c"].split(","):
+        path = os.path.join(args["-o"], f"fr3d_{classifier}.txt")
+        with open(path, "w") as f:
+            f.write(f"{classifier}\\t{os.getpid()}\\n")
+"""
+
+
+@pytest.fixture
+def pool(monkeypatch, tmp_path):
+    script = tmp_path / "NA_pairwise_interactions.py"
+    script.write_text(CLASSIFIER, encoding="utf-8")
+    worker_pool = WorkerPool(
+        [sys.executable, WORKER, str(script)],
+        size=1,
+        max_jobs=10,
+        startup_timeout=10,
+        tool="fr3d",
+    )
+    monkeypatch.setattr(fr3d_, "pool", worker_pool)
+    yield worker_pool
+    worker_pool.close()
+
+
+def test_run_fr3d_script(pool):
+    basepair, stacking, backbone = fr3d_.run_fr3d_script(
+        "data_fr3d", fr3d_.select_classifiers(("basePairs", "stackings"))
+    )
+    _, again, _ = fr3d_.run_fr3d_script("data_fr3d", ["stacking"])
+
+    assert basepair[0].startswith("basepair_detail\t")
+    assert stacking[0].startswith("stacking\t")
+    assert backbone == []
+    # the same worker runs both jobs
+    assert again == stacking
+
+
+def test_run_fr3d_script_failed(pool):
+    with pytest.raises(ThirdPartySoftwareError, match="exited with code 2"):
+        fr3d_.run_fr3d_script("data_fr3d", ["fail"])
+    assert fr3d_.run_fr3d_script("data_fr3d", ["stacking"])[1]
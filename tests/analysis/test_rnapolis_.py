@@ -0,0 +1,65 @@
+import pytest
+import rnapolis.parser
+
+from adapters.analysis import rnapolis_
+from adapters.tools.structure import Structure
+
+# -------- HELPERS --------
+
+
+def read_3d_structure(tmp_path, cif_content, model):
+    path = tmp_path / "structure.cif"
+    path.write_text(cif_content, encoding="utf-8")
+    with open(path, encoding="utf-8") as f:
+        return rnapolis.parser.read_3d_structure(f, model)
+
+
+def split_atoms(cif_content):
+    lines = cif_content.splitlines(keepends=True)
+    atoms = [line for line in lines if line.startswith(("ATOM", "HETATM"))]
+    start = lines.index(atoms[0])
+    return lines[:start], atoms, lines[start + len(atoms) :]
+
+
+def as_model(atom, model):
+    """Move an atom_site row to another model (and slightly, not to clash)"""
+    values = atom.split()
+    values[10] = f"{float(values[10]) + 0.1:.3f}"
+    values[-1] = str(model)
+    return " ".join(values) + "\n"
+
+
+# -------- TESTS --------
+
+
+@pytest.mark.parametrize(
+    "file_name", ["2z_74.cif", "4gqj-assembly1.cif", "200d-assembly1.cif"]
+)
+def test_parse_same_as_rnapolis(tmp_path, file_name):
+    """Test if parse() gives the same structure as the public parser of the
+    pinned rnapolis version, whose internals it reuses"""
+    with open(f"files/input/{file_name}", encoding="utf-8") as f:
+        cif_content = f.read()
+
+    models = rnapolis_.parse(Structure.from_cif(cif_content))
+
+    assert list(models) == [1]
+    assert models[1] == read_3d_structure(tmp_path, cif_content, 1)
+
+
+def test_parse_models_same_as_rnapolis(tmp_path):
+    """Test if each model is parsed like a file with this model alone"""
+    with open("files/input/4gqj-assembly1.cif", encoding="utf-8") as f:
+        header, atoms, footer = split_atoms(f.read())
+    second = [as_model(atom, 2) for atom in atoms]
+
+    models = rnapolis_.parse(
+        Structure.from_cif("".join(header + atoms + second + footer))
+    )
+
+    assert list(models) == [1, 2]
+    for model, model_atoms in zip(models, (atoms, second)):
+        expected = read_3d_structure(
+            tmp_path, "".join(header + model_atoms + footer), model
+        )
+        assert models[model] == expected
@@ -1,10 +1,14 @@
 import os
+import subprocess
+import sys
+import time
 from collections import namedtuple
 
 import orjson
 import pytest
 from data import TEST_DIRECTORY
 
+from adapters import jobs
 from adapters.server import app
 
 
@@ -122,3 +126,78 @@ def test_analysis(analysis_test_result):
 def test_icode(analysis_test_result):
     assert analysis_test_result.status_code == 200
     assert analysis_test_result.response == analysis_test_result.expected
+
+
+@pytest.mark.parametrize(
+    "route, status_code",
+    [
+        ("/analysis-api/v1/unknown/models", 404),
+        ("/analysis-api/v1/bpnet/models?models=1,a", 400),
+        ("/analysis-api/v1/tools?tools=bpnet,unknown", 400),
+        ("/analysis-api/v1/rnapolis?categories=stackings,unknown", 400),
+    ],
+)
+def test_models_invalid(route, status_code):
+    client = app.test_client()
+
+    response = client.post(
+        route, headers={"Content-Type": "text/plain"}, data="irrelevant"
+    )
+
+    assert response.status_code == status_code
+    assert response.json["error"]["code"] == status_code
+
+
+@pytest.fixture
+def job_runner(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "store", jobs.JobStore(str(tmp_path), timeout=60))
+    runner = subprocess.Popen(
+        [sys.executable, "-m", "adapters.job_runner"],
+        env={
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(sys.path),
+            "ADAPTERS_JOB_DIR": str(tmp_path),
+        },
+    )
+    yield runner
+    runner.terminate()
+    runner.wait(timeout=10)
+
+
+def test_job(job_runner):
+    client = app.test_client()
+    with open(
+        os.path.join(TEST_DIRECTORY, "files/input/2z_74.pdb"), encoding="utf-8"
+    ) as file:
+        file_content = file.read()
+    with open(
+        os.path.join(TEST_DIRECTORY, "files/analysis_output/rnapolis.json"),
+        encoding="utf-8",
+    ) as file:
+        expected = orjson.loads(file.read())
+
+    response = client.post(
+        "/analysis-api/v1/jobs/rnapolis/1",
+        headers={"Content-Type": "text/plain"},
+        data=file_content,
+    )
+    assert response.status_code == 202
+    job_id = response.json["id"]
+
+    for _ in range(600):
+        status = client.get(f"/analysis-api/v1/jobs/{job_id}").json["status"]
+        if status not in ("queued", "running"):
+            break
+        time.sleep(0.1)
+
+    assert status == "done"
+    response = client.get(f"/analysis-api/v1/jobs/{job_id}/result")
+    assert response.status_code == 200
+    assert response.json == expected
+
+
+def test_job_unknown():
+    client = app.test_client()
+
+    assert client.get("/analysis-api/v1/jobs/0123abcd").status_code == 404
+    assert client.get("/analysis-api/v1/jobs/0123abcd/result").status_code == 404
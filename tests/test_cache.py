@@ -0,0 +1,311 @@
+import os
+import threading
+import time
+
+import pytest
+
+import adapters.cache
+from adapters.cache import (
+    DiskLruCache,
+    MemoryLruCache,
+    TieredCache,
+    cache,
+    cached,
+    digest,
+    memoize_compressed,
+    single_flight,
+)
+from adapters.config import config
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    # Setup
+    disk_cache = DiskLruCache(str(tmp_path), max_size=0, default_timeout=0)
+    yield disk_cache
+    # Teardown
+
+
+@pytest.fixture
+def tiered_cache(tmp_path):
+    # Setup
+    tiered_cache = TieredCache(str(tmp_path), memory_max_size=10000, default_timeout=0)
+    yield tiered_cache
+    # Teardown
+
+
+def test_digest():
+    assert digest("a", "b") == digest("a", "b")
+    assert digest("a", "b") != digest("ab")
+    assert len(digest("")) == 64
+
+
+@pytest.fixture
+def lock_dir(tmp_path, monkeypatch):
+    # Setup
+    monkeypatch.setitem(config, "LOCK_DIR", str(tmp_path / "locks"))
+    yield config["LOCK_DIR"]
+    # Teardown
+
+
+def test_single_flight_timeout(lock_dir):
+    with single_flight("test_single_flight_timeout"):
+        start = time.monotonic()
+        with single_flight("test_single_flight_timeout", timeout=0.3):
+            assert time.monotonic() - start >= 0.3
+    assert os.listdir(lock_dir) == []
+
+
+def test_cached_single_flight(lock_dir):
+    key = "test_cached_single_flight"
+    cache.delete(key)
+    calls = []
+    started = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.3)
+        return "value"
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(cached(key, compute)))
+    first.start()
+    started.wait()
+    second = threading.Thread(target=lambda: results.append(cached(key, compute)))
+    second.start()
+    first.join()
+    second.join()
+
+    assert results == ["value", "value"]
+    assert calls == [1]
+
+
+def test_memoize_compressed(disk_cache, lock_dir, monkeypatch):
+    monkeypatch.setattr(adapters.cache, "cache", disk_cache)
+    calls = []
+
+    @memoize_compressed("test_memoize_compressed")
+    def convert(content):
+        calls.append(content)
+        return content.upper()
+
+    content = "atom_site " * 1000
+    assert convert(content) == content.upper()
+    assert convert(content) == content.upper()
+    assert calls == [content]
+
+    compressed = disk_cache.get(f"test_memoize_compressed:{digest(content)}")
+    assert isinstance(compressed, bytes)
+    assert len(compressed) < len(content)
+
+
+def test_set_get(disk_cache):
+    assert disk_cache.get("key") is None
+    assert disk_cache.set("key", {"value": [1, 2, 3]})
+    assert disk_cache.get("key") == {"value": [1, 2, 3]}
+    assert disk_cache.stats() == {"hits": 1, "misses": 1, "evictions": 0}
+    assert disk_cache.has("key")
+    assert not disk_cache.has("other")
+    assert disk_cache.stats() == {"hits": 2, "misses": 2, "evictions": 0}
+
+
+def test_migrate_layout(tmp_path):
+    # flat files of FileSystemCache
+    (tmp_path / "2029240f6d1128be89ddc32729463129").write_bytes(b"old")
+    (tmp_path / "__wz_cache_count").write_bytes(b"1")
+    disk_cache = DiskLruCache(str(tmp_path), default_timeout=0)
+    disk_cache.set("key", "value")
+
+    assert sorted(os.listdir(tmp_path)) == [
+        ".layout",
+        ".lock",
+        os.path.basename(os.path.dirname(disk_cache._get_filename("key"))),
+    ]
+    # entries of the current layout are kept
+    assert DiskLruCache(str(tmp_path), default_timeout=0).get("key") == "value"
+
+    (tmp_path / ".layout").write_text("0")
+    assert DiskLruCache(str(tmp_path), default_timeout=0).get("key") is None
+
+
+def test_sharded_layout(disk_cache):
+    disk_cache.set("key", "value")
+    filename = disk_cache._get_filename("key")
+    assert os.path.dirname(filename) != disk_cache.cache_dir
+    assert os.path.basename(filename).startswith(
+        os.path.basename(os.path.dirname(filename))
+    )
+    assert os.path.isfile(filename)
+
+
+def test_expired(disk_cache):
+    disk_cache.set("key", "value", timeout=-1)
+    assert os.path.isfile(disk_cache._get_filename("key"))
+    assert disk_cache.get("key") is None
+    assert not disk_cache.has("key")
+    # expired entry is removed when read
+    assert not os.path.exists(disk_cache._get_filename("key"))
+
+
+def test_delete_and_clear(disk_cache):
+    disk_cache.set("key1", "value")
+    disk_cache.set("key2", "value")
+    assert disk_cache.delete("key1")
+    assert not disk_cache.delete("key1")
+    assert disk_cache.clear()
+    assert disk_cache.get("key2") is None
+
+
+def test_lru_eviction(disk_cache):
+    payload = "x" * 1000
+    disk_cache.set("old", payload)
+    disk_cache.set("recent", payload)
+    entry_size = os.path.getsize(disk_cache._get_filename("old"))
+
+    past = time.time() - 100
+    os.utime(disk_cache._get_filename("old"), (past, past))
+    os.utime(disk_cache._get_filename("recent"), (past + 1, past + 1))
+    # Reading "old" marks it as recently used
+    assert disk_cache.get("old") == payload
+
+    disk_cache.max_size = 2 * entry_size + entry_size // 2
+    disk_cache.set("new", payload)
+
+    assert disk_cache.has("old")
+    assert disk_cache.has("new")
+    assert not disk_cache.has("recent")
+    assert disk_cache.stats()["evictions"] == 1
+
+
+def test_clear_resets_size(disk_cache):
+    disk_cache.max_size = 100000
+    disk_cache.set("key", "x" * 1000)
+    assert disk_cache._size > 0
+    assert disk_cache.clear()
+    # the next write counts the size again
+    assert disk_cache._size is None
+    disk_cache.set("key", "x" * 1000)
+    assert disk_cache._size == os.path.getsize(disk_cache._get_filename("key"))
+
+
+def test_prune_scans_rarely(disk_cache, monkeypatch):
+    scans = []
+    list_entries = disk_cache._list_entries
+
+    def _list_entries():
+        scans.append(1)
+        return list_entries()
+
+    monkeypatch.setattr(disk_cache, "_list_entries", _list_entries)
+    disk_cache.max_size = 100000
+    for i in range(10):
+        disk_cache.set(f"key{i}", "x" * 1000)
+    # only the first write scans, later ones add to the estimated size
+    assert len(scans) == 1
+
+    for i in range(10, 100):
+        disk_cache.set(f"key{i}", "x" * 1000)
+    # the estimate exceeded max_size, the scan pruned the cache
+    assert len(scans) == 2
+    size = sum(
+        os.path.getsize(disk_cache._get_filename(f"key{i}"))
+        for i in range(100)
+        if disk_cache.has(f"key{i}")
+    )
+    assert size <= 100000
+
+
+def test_memory_lru_eviction():
+    memory_cache = MemoryLruCache(max_size=2500, default_timeout=0)
+    payload = "x" * 1000
+    memory_cache.set("old", payload)
+    memory_cache.set("recent", payload)
+    assert memory_cache.get("old") == payload
+    memory_cache.set("new", payload)
+
+    assert memory_cache.has("old")
+    assert memory_cache.has("new")
+    assert not memory_cache.has("recent")
+    assert memory_cache.stats()["evictions"] == 1
+    assert memory_cache.size <= 2500
+
+
+def test_memory_too_big_value():
+    memory_cache = MemoryLruCache(max_size=100, default_timeout=0)
+    assert not memory_cache.set("key", "x" * 1000)
+    assert memory_cache.get("key") is None
+
+
+def test_memory_returns_copies():
+    memory_cache = MemoryLruCache(max_size=10000, default_timeout=0)
+    memory_cache.set("mutable", {"value": [1, 2, 3]})
+    memory_cache.get("mutable")["value"].append(4)
+    assert memory_cache.get("mutable") == {"value": [1, 2, 3]}
+
+    compressed = b"x" * 100
+    memory_cache.set("immutable", compressed)
+    assert memory_cache.get("immutable") is compressed
+
+
+def test_tiered_returns_copies(tiered_cache):
+    value = {"value": [1, 2, 3]}
+    tiered_cache.set("key", value)
+    value["value"].append(4)
+    assert tiered_cache.get("key") == {"value": [1, 2, 3]}
+
+    tiered_cache.memory.clear()
+    # promoted from the disk tier
+    tiered_cache.get("key")["value"].append(4)
+    assert tiered_cache.get("key") == {"value": [1, 2, 3]}
+
+
+def test_tiered_write_through(tiered_cache):
+    tiered_cache.set("key", "value")
+    assert tiered_cache.memory.has("key")
+    assert tiered_cache.disk.has("key")
+    tiered_cache.disk.clear()
+    # served from the memory tier
+    assert tiered_cache.get("key") == "value"
+
+
+def test_tiered_read_promotion(tiered_cache):
+    tiered_cache.set("key", "value")
+    tiered_cache.memory.clear()
+
+    assert tiered_cache.get("key") == "value"
+    assert tiered_cache.memory.has("key")
+
+    tiered_cache.disk.clear()
+    assert tiered_cache.get("key") == "value"
+
+
+def test_tiered_delete(tiered_cache):
+    tiered_cache.set("key", "value")
+    assert tiered_cache.delete("key")
+    assert tiered_cache.get("key") is None
+    assert not tiered_cache.disk.has("key")
+
+
+def test_tiered_stats(tiered_cache):
+    tiered_cache.set("key", "value")
+    tiered_cache.memory.clear()
+
+    # a disk hit is counted once and promoted into memory
+    assert tiered_cache.get("key") == "value"
+    stats = tiered_cache.stats()
+    assert stats["memory"]["misses"] == 1
+    assert stats["disk"]["hits"] == 1
+    assert stats["promotions"] == 1
+
+    # then it is served from memory
+    assert tiered_cache.get("key") == "value"
+    stats = tiered_cache.stats()
+    assert stats["memory"]["hits"] == 1
+    assert stats["disk"]["hits"] == 1
+    assert stats["promotions"] == 1
+
+    assert tiered_cache.get("missing") is None
+    stats = tiered_cache.stats()
+    assert stats["memory"]["misses"] == 2
+    assert stats["disk"]["misses"] == 1
@@ -0,0 +1,128 @@
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from adapters import job_runner, jobs
+from adapters.exceptions import ToolBusyError
+
+
+def test_claim(tmp_path):
+    store = jobs.JobStore(str(tmp_path), timeout=60)
+    first = store.create("rnapolis", "data", 1, None)["id"]
+    second = store.create("bpnet", "data", 2, ("stackings",))["id"]
+
+    assert store.queued() == [first, second]
+    assert store.claim(first)
+    assert not store.claim(first)
+    assert store.queued() == [second]
+    assert store.status(first)["status"] == jobs.RUNNING
+    assert store.input(second) == "data"
+
+
+def update_many(store: jobs.JobStore, job_id: str, name: str):
+    for i in range(50):
+        store.update(job_id, **{name: i})
+
+
+def test_update_locked(tmp_path):
+    store = jobs.JobStore(str(tmp_path), timeout=60)
+    job_id = store.create("rnapolis", "data", 1, None)["id"]
+
+    processes = [
+        multiprocessing.Process(target=update_many, args=(store, job_id, f"key{i}"))
+        for i in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    status = store.status(job_id)
+    assert all(status[f"key{i}"] == 49 for i in range(4))
+
+
+def test_requeue(tmp_path):
+    store = jobs.JobStore(str(tmp_path), timeout=60)
+    job_id = store.create("rnapolis", "data", 1, None)["id"]
+    assert store.claim(job_id)
+
+    store.requeue(job_id, 60)
+    assert store.status(job_id)["status"] == jobs.QUEUED
+    assert store.queued() == []
+    store.requeue(job_id, 0)
+    assert store.queued() == [job_id]
+
+
+def test_run_job_tool_busy(tmp_path, monkeypatch):
+    store = jobs.JobStore(str(tmp_path), timeout=60)
+    monkeypatch.setattr(jobs, "store", store)
+
+    def busy(*_):
+        raise ToolBusyError("Too many requests for rnapolis, queue is full")
+
+    monkeypatch.setattr(job_runner, "get_adapter", lambda _: (busy, None))
+    job_id = store.create("rnapolis", "data", 1, None)["id"]
+    assert store.claim(job_id)
+    job_runner.run_job(job_id)
+
+    status = store.status(job_id)
+    assert status["status"] == jobs.QUEUED
+    assert "finished" not in status
+    assert status["not_before"] > time.time()
+
+
+def start_runner(job_dir: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "adapters.job_runner"],
+        env={
+            **os.environ,
+            "PYTHONPATH": os.pathsep.join(sys.path),
+            "ADAPTERS_JOB_DIR": job_dir,
+        },
+    )
+
+
+def children(pid: int):
+    with open(f"/proc/{pid}/task/{pid}/children", encoding="utf-8") as file:
+        return [int(child) for child in file.read().split()]
+
+
+def wait_for_exit(pids):
+    for _ in range(100):
+        if not any(jobs.is_alive(pid) for pid in pids):
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def run_until_finished(store: jobs.JobStore, job_id: str):
+    for _ in range(300):
+        if store.status(job_id)["status"] not in (jobs.QUEUED, jobs.RUNNING):
+            return
+        time.sleep(0.1)
+
+
+@pytest.mark.parametrize("signum", [signal.SIGTERM, signal.SIGKILL])
+def test_job_runner(tmp_path, signum):
+    store = jobs.JobStore(str(tmp_path), timeout=60)
+    job_id = store.create("unknown", "data", 1, None)["id"]
+    runner = start_runner(str(tmp_path))
+    try:
+        run_until_finished(store, job_id)
+        workers = children(runner.pid)
+    finally:
+        runner.send_signal(signum)
+        runner.wait(timeout=10)
+
+    status = store.status(job_id)
+    assert status["status"] == jobs.FAILED
+    assert status["error"] == "Unknown analysis tool: unknown"
+    assert status["pid"] != runner.pid
+    # job workers do not outlive the runner
+    assert workers
+    assert wait_for_exit(workers)
@@ -0,0 +1,194 @@
+import os
+import uuid
+
+import pandas as pd
+from rnapolis.common import BaseInteractions
+
+from adapters import services
+from adapters.analysis import barnaba_, bpnet, rnapolis_
+from adapters.cache import cache
+from adapters.tools.structure import Structure
+from adapters.tools.workspace import Workspace, current_path
+
+
+def test_result_cache_key():
+    key = services.result_cache_key(bpnet.analyze, "content", 1)
+    assert key == services.result_cache_key(bpnet.analyze, "content", 1)
+    assert key != services.result_cache_key(bpnet.analyze, "content", 2)
+    assert key != services.result_cache_key(bpnet.analyze, "other content", 1)
+    assert key != services.result_cache_key(rnapolis_.analyze, "content", 1)
+    assert key != services.result_cache_key(bpnet.analyze, "content", 1, ("stackings",))
+
+
+def test_cached_result(monkeypatch):
+    calls = []
+
+    def analyze(file_content, **kwargs):
+        calls.append(kwargs["model"])
+        return BaseInteractions([], [], [], [], [])
+
+    monkeypatch.setattr(services.cif_filter, "normalize", lambda data: Structure([]))
+    cache.delete(services.result_cache_key(analyze, "test_cached_result", 1))
+
+    first = services.run_cif_adapter(analyze, "test_cached_result", 1)
+    second = services.run_cif_adapter(analyze, "test_cached_result", 1)
+
+    assert first == second
+    assert calls == [1]
+
+
+def test_prepared_artifacts(monkeypatch):
+    normalize_calls = []
+    cif_calls = []
+    pdb_calls = []
+
+    def normalize(data):
+        normalize_calls.append(data)
+        return data
+
+    def apply_filters(data, functions_args):
+        cif_calls.append(functions_args[0][1]["model"])
+        return f"filtered {data}"
+
+    def from_structure(structure):
+        pdb_calls.append(structure)
+        return None
+
+    monkeypatch.setattr(services.cif_filter, "normalize", normalize)
+    monkeypatch.setattr(services.cif_filter, "apply_filters", apply_filters)
+    monkeypatch.setattr(services.pdb_filter, "from_structure", from_structure)
+    data = f"test_prepared_artifacts {uuid.uuid4()}"
+
+    assert services.prepare_cif(data, 2) == f"filtered {data}"
+    assert services.prepare_pdb(data, 2) is None
+    assert services.prepare_pdb(data, 2) is None
+    assert services.prepare_cif(data, 2) == f"filtered {data}"
+    assert services.prepare_cif(data, 3) == f"filtered {data}"
+
+    assert normalize_calls == [data]
+    assert cif_calls == [2, 3]
+    assert pdb_calls == [f"filtered {data}"]
+
+
+def test_run_batch_adapter(monkeypatch):
+    with open("files/input/2z_74.cif") as f:
+        structure = Structure.from_cif(f.read())
+    table = structure.atom_site_table()
+    second = table.assign(pdbx_PDB_model_num="2")
+    structure.set_atom_site_table(pd.concat([table, second]))
+    data = f"{structure.to_cif()}# {uuid.uuid4()}\n"
+
+    monkeypatch.setattr(services.cif_filter, "normalize", Structure.from_cif)
+    monkeypatch.setitem(services.config, "BATCH_WORKERS", 2)
+
+    results = services.run_batch_adapter(
+        services.run_cif_adapter, rnapolis_.analyze, data, None
+    )
+
+    assert list(results) == ["1", "2"]
+    for model in (1, 2):
+        expected = services.run_cif_adapter(rnapolis_.analyze, data, model)
+        assert results[str(model)] == expected
+
+
+def test_run_multi_adapter(monkeypatch):
+    with open("files/input/2z_74.cif") as f:
+        data = f"{f.read()}# {uuid.uuid4()}\n"
+
+    monkeypatch.setattr(services.cif_filter, "normalize", Structure.from_cif)
+    monkeypatch.setitem(services.config, "BATCH_WORKERS", 2)
+
+    adapters = {
+        "barnaba": (services.run_pdb_adapter, barnaba_.analyze),
+        "rnapolis": (services.run_cif_adapter, rnapolis_.analyze),
+    }
+    results = services.run_multi_adapter(adapters, data, 1)
+
+    assert list(results) == ["barnaba", "rnapolis"]
+    for tool, (runner, analyze) in adapters.items():
+        assert results[tool] == runner(analyze, data, 1)
+
+
+def test_run_structure_adapter(monkeypatch):
+    with open("files/input/2z_74.cif") as f:
+        data = f"{f.read()}# {uuid.uuid4()}\n"
+
+    monkeypatch.setattr(services.cif_filter, "normalize", Structure.from_cif)
+
+    from_structure = services.run_structure_adapter(barnaba_.analyze_structure, data, 1)
+    from_pdb = services.run_pdb_adapter(barnaba_.analyze, data, 1)
+
+    assert from_structure == from_pdb
+
+
+def test_run_parsed_adapter(monkeypatch):
+    with open("files/input/2z_74.cif") as f:
+        structure = Structure.from_cif(f.read())
+    table = structure.atom_site_table()
+    second = table.assign(pdbx_PDB_model_num="2")
+    structure.set_atom_site_table(pd.concat([table, second]))
+    data = f"{structure.to_cif()}# {uuid.uuid4()}\n"
+
+    monkeypatch.setattr(services.cif_filter, "normalize", Structure.from_cif)
+    monkeypatch.setitem(services.config, "BATCH_WORKERS", 1)
+    parse_calls = []
+
+    def parse(file_content):
+        parse_calls.append(file_content)
+        return parse.__wrapped__(file_content)
+
+    parse.__module__ = rnapolis_.parse.__module__
+    parse.__wrapped__ = rnapolis_.parse
+    monkeypatch.setattr(rnapolis_, "parse", parse)
+
+    results = services.run_batch_adapter(
+        services.run_parsed_adapter, rnapolis_.analyze_model, data, None
+    )
+
+    assert len(parse_calls) == 1
+    expected = services.run_cif_adapter(rnapolis_.analyze, data, 1)
+    assert results == {"1": expected, "2": expected}
+    assert services.run_parsed_adapter(rnapolis_.analyze_model, data, 3) == (
+        BaseInteractions([], [], [], [], [])
+    )
+
+
+def test_categories(monkeypatch):
+    with open("files/input/2z_74.cif") as f:
+        data = f"{f.read()}# {uuid.uuid4()}\n"
+
+    monkeypatch.setattr(services.cif_filter, "normalize", Structure.from_cif)
+
+    full = services.run_parsed_adapter(rnapolis_.analyze_model, data, 1)
+    stackings = services.run_parsed_adapter(
+        rnapolis_.analyze_model, data, 1, ("stackings",)
+    )
+
+    assert full["stackings"]
+    assert stackings == {
+        category: full[category] if category == "stackings" else [] for category in full
+    }
+
+
+def pool_task(value):
+    return value, os.getpid(), current_path.get()
+
+
+def test_run_in_pool(monkeypatch):
+    monkeypatch.setitem(services.config, "BATCH_WORKERS", 2)
+    tasks = {str(i): (pool_task, i) for i in range(4)}
+
+    with Workspace() as workspace:
+        first = workspace.path
+        results = services.run_in_pool(tasks)
+        executor = services.executor()
+    with Workspace() as workspace:
+        second = workspace.path
+        again = services.run_in_pool(tasks)
+
+    assert [value for value, *_ in results.values()] == [0, 1, 2, 3]
+    assert {path for *_, path in results.values()} == {first}
+    assert {path for *_, path in again.values()} == {second}
+    # the pool is reused by later requests
+    assert services.executor() is executor
+    assert os.getpid() not in {pid for _, pid, _ in results.values()}
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+# Packages which should be imported only when an adapter or filter uses them
+HEAVY_MODULES = (
+    "barnaba",
+    "mdtraj",
+    "pandas",
+    "rnapolis.annotator",
+    "svg_stack",
+    "weblogo",
+)
+
+
+def import_server():
+    script = (
+        "import sys, adapters.server; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    return subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        check=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+
+
+def test_heavy_modules_not_imported():
+    assert import_server().stdout.strip() == ""
@@ -0,0 +1,37 @@
+import pandas as pd
+
+from adapters.tools import cif_filter
+from adapters.tools.structure import Structure
+
+
+def test_leave_single_model():
+    table = pd.DataFrame(
+        {
+            "id": ["1", "2", "3", "4"],
+            "pdbx_PDB_model_num": ["1", "2", "2", "3"],
+        },
+        dtype=object,
+    )
+
+    filtered = cif_filter.leave_single_model(table, model=2)
+
+    assert filtered["id"].tolist() == ["2", "3"]
+    assert filtered["pdbx_PDB_model_num"].tolist() == ["1", "1"]
+
+
+def test_fix_occupancy():
+    table = pd.DataFrame({"occupancy": ["0.50", "?", ".", "1"]}, dtype=object)
+
+    fixed = cif_filter.fix_occupancy(table)
+
+    assert fixed["occupancy"].tolist() == ["0.50", "1.0", "1.0", "1"]
+
+
+def test_atom_site_table_round_trip():
+    with open("files/input/2z_74.cif") as f:
+        structure = Structure.from_cif(f.read())
+    rows = [list(row) for row in structure.atom_site.getRowList()]
+
+    structure.set_atom_site_table(structure.atom_site_table())
+
+    assert structure.atom_site.getRowList() == rows
@@ -0,0 +1,62 @@
+from adapters.tools import converter
+
+
+def coordinate_records(content: str):
+    return [
+        line
+        for line in content.splitlines()
+        if line.startswith(("ATOM  ", "HETATM", "TER   "))
+    ]
+
+
+def test_cif2pdb_same_as_maxit():
+    """Test if native conversion of 2z_74.cif gives the same atoms as MAXIT"""
+    with open("files/tools_output/2z_74.cif") as f:
+        cif_content = f.read()
+    with open("files/tools_output/2z_74_out.pdb") as f:
+        expected = f.read()
+
+    pdb_content = converter.cif2pdb(cif_content)
+
+    assert coordinate_records(pdb_content) == coordinate_records(expected)
+
+
+def test_cif2pdb_long_chain_name():
+    """Test if chain names longer than one character are left for MAXIT"""
+    with open("files/input/200d-assembly1.cif") as f:
+        content = f.read()
+
+    assert converter.cif2pdb(content) is None
+
+
+def test_pdb2cif_requires_annotation():
+    """Test if PDB files with SEQRES records are left for MAXIT"""
+    with open("files/input/R1107TS091_1.pdb") as f:
+        content = f.read()
+
+    assert converter.pdb2cif(content) is None
+
+
+def test_pdb2cif_round_trip():
+    """Test if PDB file without annotation survives conversion to mmCIF and back"""
+    with open("files/input/R1107TS091_1.pdb") as f:
+        content = "".join(line for line in f if not line.startswith("SEQRES"))
+
+    cif_content = converter.pdb2cif(content)
+    assert "_entity_poly.type            polyribonucleotide" in cif_content
+
+    pdb_content = converter.cif2pdb(cif_content)
+    assert [line[:66] for line in coordinate_records(pdb_content)] == [
+        line[:66] for line in coordinate_records(content)
+    ]
+
+
+def test_parse_atom_blank_occupancy_and_temperature():
+    """Test if blank (space padded) occupancy and B-factor get default values"""
+    line = "ATOM      1  P     G A   1      10.000  20.000  30.000" + " " * 22 + "P"
+
+    atom = converter.parse_atom(line, "1")
+
+    assert atom["occupancy"] == "1.00"
+    assert atom["temperature"] == "0.00"
+    assert atom["element"] == "P"
@@ -0,0 +1,45 @@
+import numpy as np
+from data import PDB_LINES
+
+from adapters.tools.pdb_table import AtomTable
+
+
+def test_atom_table():
+    table = AtomTable("\n".join(PDB_LINES))
+
+    assert table.line_numbers.tolist() == [0, 1, 2, 4, 5, 6, 7, 8]
+    assert table.chain.tolist() == ["X", "X", "X", "-", ".", "_", "9", "'"]
+    assert table.number.tolist() == [-1, 1, 403, -1, -1, -1, 2, 2]
+    assert table.icode.tolist() == ["A", "B", "X", "A", "A", "", "X", "X"]
+    assert table.residue_name.tolist()[:3] == ["DA", "G", "HOH"]
+    assert table.atom_name.tolist()[:3] == ["O5'", "C4'", "O"]
+    assert np.allclose(table.xyz[1], [43.568, 11.968, 18.795])
+
+
+def test_residues():
+    lines = [
+        "ATOM      1  N1    G A   1      0.000   0.000   0.000  1.00  0.00           N  ",
+        "ATOM      2  N1    G A   1      1.000   0.000   0.000  0.50  0.00           N  ",
+        "ATOM      3  N1    C A   2      0.000   0.000   0.000  1.00  0.00           N  ",
+        "ATOM      4  C2    G A   1      0.000   0.000   0.000  1.00  0.00           C  ",
+        "ATOM      5  N1    A A   1      0.000   0.000   0.000  1.00  0.00           N  ",
+    ]
+    table = AtomTable("\n".join(lines))
+
+    first, residue = table.residues()
+    assert first.tolist() == [0, 2]
+    assert residue.tolist() == [0, 0, 1, 0, 0]
+    assert table.last_atoms(residue, "N1").tolist() == [4, 2]
+    assert table.last_atoms(residue, "C6").tolist() == [-1, -1]
+
+    first, residue = table.residues(by_name=True)
+    assert first.tolist() == [0, 2, 4]
+    assert residue.tolist() == [0, 0, 1, 0, 2]
+
+
+def test_empty():
+    table = AtomTable("REMARK 465       C A    17")
+
+    assert len(table) == 0
+    assert table.xyz.shape == (0, 3)
+    assert [index.tolist() for index in table.residues()] == [[], []]
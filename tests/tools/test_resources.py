@@ -0,0 +1,89 @@
+import signal
+import subprocess
+import sys
+
+import orjson
+import pytest
+
+from adapters.config import config
+from adapters.tools.utils import run_external_cmd
+
+
+def test_usage_recorded(monkeypatch, tmp_path):
+    log = tmp_path / "usage.jsonl"
+    monkeypatch.setitem(config, "RESOURCE_LOG", str(log))
+
+    result = run_external_cmd(
+        [sys.executable, "-c", "print(sum(range(int(input()))))"],
+        cwd=str(tmp_path),
+        stdout=subprocess.PIPE,
+        cmd_input=b"1000000\n",
+        tool="counter",
+    )
+
+    assert result.stdout == b"499999500000\n"
+    usage = orjson.loads(log.read_text(encoding="utf-8"))
+    assert usage["tool"] == "counter"
+    assert usage["returncode"] == 0
+    assert not usage["timed_out"]
+    assert usage["user_time"] + usage["system_time"] > 0
+    assert usage["max_rss"] > 0
+
+
+def test_cpu_limit(monkeypatch, tmp_path):
+    monkeypatch.setitem(config, "TOOL_CPU_LIMITS", {"spinner": 1})
+
+    result = run_external_cmd(
+        [sys.executable, "-c", "while True: pass"],
+        cwd=str(tmp_path),
+        timeout=30,
+        tool="spinner",
+    )
+
+    assert result.returncode in (-signal.SIGXCPU, -signal.SIGKILL)
+
+
+def test_memory_limit(monkeypatch, tmp_path):
+    monkeypatch.setitem(config, "TOOL_MEMORY_LIMITS", {"allocator": 1 << 30})
+
+    result = run_external_cmd(
+        [sys.executable, "-c", "bytearray(2 << 30)"],
+        cwd=str(tmp_path),
+        tool="allocator",
+    )
+
+    assert result.returncode == 1
+    assert b"MemoryError" in result.stderr
+
+
+def test_limits_in_force_from_start(monkeypatch, tmp_path):
+    monkeypatch.setitem(config, "TOOL_MEMORY_LIMITS", {"sh": 1 << 30})
+    monkeypatch.setitem(config, "TOOL_CPU_LIMITS", {"sh": 60})
+
+    # a child forked right away inherits the limits
+    result = run_external_cmd(
+        ["sh", "-c", "sh -c 'ulimit -v; ulimit -t'"],
+        cwd=str(tmp_path),
+        stdout=subprocess.PIPE,
+    )
+
+    assert result.stdout.split() == [b"1048576", b"60"]
+
+
+def test_large_input_and_output(tmp_path):
+    data = b"x" * (4 << 20)
+
+    result = run_external_cmd(
+        ["cat"],
+        cwd=str(tmp_path),
+        stdout=subprocess.PIPE,
+        cmd_input=data,
+    )
+
+    assert result.stdout == data
+    assert result.returncode == 0
+
+
+def test_timeout(tmp_path):
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_external_cmd(["sleep", "10"], cwd=str(tmp_path), timeout=0.5)
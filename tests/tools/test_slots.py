@@ -0,0 +1,38 @@
+import pytest
+
+from adapters.config import config
+from adapters.exceptions import ToolBusyError
+from adapters.tools.slots import tool_slot
+
+
+@pytest.fixture
+def limits(monkeypatch, tmp_path):
+    monkeypatch.setitem(config, "LOCK_DIR", str(tmp_path))
+    monkeypatch.setitem(config, "TOOL_SLOTS", {"tool": 1})
+    monkeypatch.setitem(config, "TOOL_QUEUE_SIZE", 1)
+    monkeypatch.setitem(config, "TOOL_QUEUE_TIMEOUT", 0)
+
+
+def test_slot_released(limits):
+    with tool_slot("tool"):
+        pass
+    with tool_slot("tool"):
+        pass
+
+
+def test_slot_busy(limits, monkeypatch):
+    with tool_slot("tool"):
+        # waiting in the queue times out
+        with pytest.raises(ToolBusyError, match="waited too long"):
+            with tool_slot("tool"):
+                pass
+
+        # no place in the queue
+        monkeypatch.setitem(config, "TOOL_QUEUE_SIZE", 0)
+        with pytest.raises(ToolBusyError, match="queue is full"):
+            with tool_slot("tool"):
+                pass
+
+        # other tools are not limited
+        with tool_slot("other"):
+            pass
@@ -0,0 +1,23 @@
+from adapters.tools import pdb_filter
+from adapters.tools.structure import Structure
+
+
+def test_cif_round_trip():
+    """Test if parsed structure is serialized back without losing atoms"""
+    with open("files/input/2z_74.cif") as f:
+        structure = Structure.from_cif(f.read())
+
+    serialized = Structure.from_cif(structure.to_cif())
+
+    assert serialized.atom_site.getRowList() == structure.atom_site.getRowList()
+
+
+def test_pdb_filter_from_structure():
+    """Test if chains are renamed in memory before conversion to PDB"""
+    with open("files/input/2z_74.cif") as f:
+        structure = Structure.from_cif(f.read())
+
+    pdb_content, mapping = pdb_filter.from_structure(structure)
+
+    assert mapping == {"A": "X", "B": "Y"}
+    assert pdb_content.startswith("ATOM      1  O5'  DA A  -1A")
@@ -0,0 +1,59 @@
+import logging
+import os
+import time
+
+from adapters.config import config
+from adapters.tools import tracing
+from adapters.tools.tracing import trace
+
+logger = logging.getLogger("adapters.test_tracing")
+
+
+def test_payload_not_evaluated(caplog):
+    caplog.set_level(logging.INFO, logger=logger.name)
+    calls = []
+
+    trace(logger, "payload", lambda: calls.append(1))
+
+    assert calls == []
+    assert caplog.records == []
+
+
+def test_payload_logged(caplog):
+    caplog.set_level(logging.DEBUG, logger=logger.name)
+
+    trace(logger, "payload", lambda: "content")
+
+    assert caplog.messages == ["payload: content"]
+    assert caplog.records[0].filename == "test_tracing.py"
+
+
+def test_payload_written(caplog, monkeypatch, tmp_path):
+    caplog.set_level(logging.DEBUG, logger=logger.name)
+    monkeypatch.setitem(config, "TRACE_DIR", str(tmp_path))
+    monkeypatch.setitem(config, "TRACE_PREVIEW", 3)
+
+    trace(logger, "tool output", "x" * 100)
+
+    (path,) = tmp_path.iterdir()
+    assert path.name.endswith("-tool-output.log")
+    assert path.read_text(encoding="utf-8") == "x" * 100
+    assert caplog.messages == [f"tool output (100 characters, {path}): xxx"]
+
+
+def test_old_traces_pruned(caplog, monkeypatch, tmp_path):
+    caplog.set_level(logging.DEBUG, logger=logger.name)
+    monkeypatch.setitem(config, "TRACE_DIR", str(tmp_path))
+    monkeypatch.setitem(config, "TRACE_MAX_AGE", 60)
+    monkeypatch.setattr(tracing, "_next_prune", 0.0)
+    old, recent = tmp_path / "old.log", tmp_path / "recent.log"
+    for path in (old, recent):
+        path.write_text("payload", encoding="utf-8")
+    os.utime(old, (time.time() - 120, time.time() - 120))
+
+    trace(logger, "tool output", "content")
+
+    assert not old.exists()
+    assert recent.exists()
+    (written,) = tmp_path.glob("*-tool-output.log")
+    assert written.stat().st_mode & 0o777 == 0o600
@@ -0,0 +1,26 @@
+import subprocess
+import sys
+
+import pytest
+
+from adapters.tools.utils import stream_external_cmd
+
+
+def test_stream_external_cmd(tmp_path):
+    script = "for i in range(3): print(f'line {i}', flush=True)"
+
+    with stream_external_cmd([sys.executable, "-c", script], cwd=str(tmp_path)) as out:
+        lines = [line.rstrip("\n") for line in out]
+
+    assert lines == ["line 0", "line 1", "line 2"]
+
+
+def test_stream_external_cmd_timeout(tmp_path):
+    script = "import time\nprint('start', flush=True)\ntime.sleep(30)"
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        with stream_external_cmd(
+            [sys.executable, "-c", script], cwd=str(tmp_path), timeout=1
+        ) as out:
+            assert out.readline() == "start\n"
+            out.read()
@@ -0,0 +1,193 @@
+import logging
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import orjson
+import pytest
+
+from adapters.config import config
+from adapters.exceptions import ThirdPartySoftwareError
+from adapters.tools.workers import SharedWorkerPool, WorkerPool
+
+# A worker which echoes its pid, prints noise and misbehaves on request
+WORKER = """
+import json, os, sys, time
+for line in sys.stdin:
+    job = json.loads(line)
+    action = job.get("action")
+    if action == "crash":
+        sys.exit(1)
+    if action == "sleep":
+        time.sleep(10)
+    if action == "spin":
+        end = time.process_time() + job["seconds"]
+        while time.process_time() < end:
+            pass
+    if action == "fail":
+        print("failure details", file=sys.stderr, flush=True)
+    print("some tool output")
+    response = {"ok": action != "fail", "pid": os.getpid(), "error": "failed"}
+    print("@@adapters-worker " + json.dumps(response), flush=True)
+"""
+
+
+@pytest.fixture
+def pool():
+    worker_pool = WorkerPool(
+        [sys.executable, "-c", WORKER], size=1, max_jobs=3, startup_timeout=10
+    )
+    yield worker_pool
+    worker_pool.close()
+
+
+@pytest.fixture
+def shared_pool(monkeypatch, tmp_path):
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(sys.path))
+    monkeypatch.setitem(config, "LOCK_DIR", str(tmp_path))
+    monkeypatch.setitem(config, "WORKER_IDLE_TIMEOUT", 2)
+    worker_pool = SharedWorkerPool(
+        [sys.executable, "-c", WORKER], size=1, max_jobs=3, startup_timeout=10
+    )
+    yield worker_pool
+    worker_pool.close()
+    wait_for_removal(worker_pool.path)
+
+
+def wait_for_removal(path, timeout=10):
+    deadline = time.monotonic() + timeout
+    while os.path.exists(path):
+        assert time.monotonic() < deadline
+        time.sleep(0.1)
+
+
+def pid_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def run_in_child(worker_pool, queue):
+    queue.put(worker_pool.run({}, timeout=10)["pid"])
+
+
+def test_worker_reused(pool):
+    first = pool.run({}, timeout=10)
+    second = pool.run({}, timeout=10)
+
+    assert first["ok"]
+    assert first["pid"] == second["pid"]
+
+
+def test_worker_recycled(pool):
+    pids = [pool.run({}, timeout=10)["pid"] for _ in range(3)]
+
+    assert len(set(pids)) == 1
+    assert pool.run({}, timeout=10)["pid"] != pids[0]
+
+
+def test_worker_error(pool, caplog):
+    pid = pool.run({}, timeout=10)["pid"]
+
+    with pytest.raises(ThirdPartySoftwareError, match="failed"):
+        pool.run({"action": "fail"}, timeout=10)
+
+    assert any(
+        record.levelno == logging.WARNING and "failure details" in record.message
+        for record in caplog.records
+    )
+
+    assert pool.run({}, timeout=10)["pid"] == pid
+
+
+def test_worker_crash(pool):
+    pid = pool.run({}, timeout=10)["pid"]
+
+    with pytest.raises(ThirdPartySoftwareError):
+        pool.run({"action": "crash"}, timeout=10)
+
+    assert pool.run({}, timeout=10)["pid"] != pid
+
+
+def test_worker_timeout(pool):
+    pid = pool.run({}, timeout=10)["pid"]
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        pool.run({"action": "sleep"}, timeout=0.5)
+
+    assert pool.run({}, timeout=10)["pid"] != pid
+
+
+def test_worker_cpu_limit_per_job(monkeypatch, pool):
+    monkeypatch.setitem(config, "TOOL_CPU_LIMITS", {pool.tool: 1})
+
+    pids = {pool.run({"action": "spin", "seconds": 0.6}, timeout=10)["pid"]}
+    pids.add(pool.run({"action": "spin", "seconds": 0.6}, timeout=10)["pid"])
+
+    assert len(pids) == 1
+    with pytest.raises(ThirdPartySoftwareError):
+        pool.run({"action": "spin", "seconds": 30}, timeout=60)
+
+
+def test_worker_usage_recorded(monkeypatch, pool, tmp_path):
+    log = tmp_path / "usage.jsonl"
+    monkeypatch.setitem(config, "RESOURCE_LOG", str(log))
+
+    pool.run({}, timeout=10)
+    pool.close()
+
+    usage = orjson.loads(log.read_text(encoding="utf-8"))
+    assert usage["tool"] == pool.tool
+    assert usage["jobs"] == 1
+    assert usage["max_rss"] > 0
+
+
+def test_shared_worker_reused_across_processes(shared_pool):
+    pid = shared_pool.run({}, timeout=10)["pid"]
+
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    children = [
+        context.Process(target=run_in_child, args=(shared_pool, queue))
+        for _ in range(2)
+    ]
+    for child in children:
+        child.start()
+    for child in children:
+        child.join()
+
+    assert {queue.get(), queue.get()} == {pid}
+
+
+def test_shared_worker_errors(shared_pool):
+    with pytest.raises(ThirdPartySoftwareError, match="failed"):
+        shared_pool.run({"action": "fail"}, timeout=10)
+    with pytest.raises(subprocess.TimeoutExpired):
+        shared_pool.run({"action": "sleep"}, timeout=0.5)
+
+    assert shared_pool.run({}, timeout=10)["ok"]
+
+
+def test_shared_worker_server_idle(shared_pool):
+    pid = shared_pool.run({}, timeout=10)["pid"]
+
+    wait_for_removal(shared_pool.path)
+    deadline = time.monotonic() + 10
+    while pid_exists(pid):
+        assert time.monotonic() < deadline
+        time.sleep(0.1)
+
+    assert shared_pool.run({}, timeout=10)["pid"] != pid
+
+
+def test_shared_worker_server_killed(shared_pool):
+    pid = shared_pool.run({}, timeout=10)["pid"]
+    os.kill(shared_pool._server.pid, 9)  # pylint: disable=protected-access
+    shared_pool._server.wait()  # pylint: disable=protected-access
+
+    assert os.path.exists(shared_pool.path)
+    assert shared_pool.run({}, timeout=10)["pid"] != pid
@@ -0,0 +1,44 @@
+import os
+import stat
+
+from adapters.tools.workspace import (
+    Workspace,
+    current_path,
+    materialize,
+    temporary_directory,
+)
+
+
+def test_materialize_shared_within_workspace():
+    with Workspace() as workspace:
+        workspace_path = workspace.path
+        with temporary_directory() as first, temporary_directory() as second:
+            assert os.path.dirname(first) == workspace_path
+            first_path = materialize("ATOM", first, "input.pdb", shared=True)
+            second_path = materialize("ATOM", second, "input.pdb", shared=True)
+
+            assert os.path.samefile(first_path, second_path)
+            assert stat.S_IMODE(os.stat(second_path).st_mode) == 0o444
+            with open(second_path, encoding="utf-8") as file:
+                assert file.read() == "ATOM"
+
+    assert current_path.get() is None
+    assert not os.path.exists(workspace_path)
+
+
+def test_materialize_not_shared():
+    with Workspace():
+        with temporary_directory() as first, temporary_directory() as second:
+            first_path = materialize("ATOM", first, "input.pdb")
+            second_path = materialize("ATOM", second, "input.pdb")
+
+            assert not os.path.samefile(first_path, second_path)
+            assert os.access(second_path, os.W_OK)
+
+
+def test_materialize_without_workspace():
+    with temporary_directory() as directory:
+        path = materialize("ATOM", directory, "input.pdb")
+
+        assert path == os.path.join(directory, "input.pdb")
+        assert os.listdir(directory) == ["input.pdb"]